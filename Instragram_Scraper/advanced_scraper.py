@@ -6,104 +6,75 @@ for the last 3 posts including likes and comments count.
 """
 
 from instagram_scraper import InstagramFollowerScraper
-import instaloader
 import sys
-from datetime import datetime
-import json
+from response_cache import get_response_cache
+from engagement import EngagementAggregator
+from graphql_nodes import post_fields
+from records import ProfileRecord, PostRecord
+from transport import RequestCounter
+from instrumentation import trace, span, timed_iter
+from snapshot_store import SnapshotStore, sync_posts
+from streaming import NDJSONWriter
+from serializers import get_serializer
+from lazy_imports import lazy_import
+
+# Imported on first network use (see lazy_imports.py)
+instaloader = lazy_import('instaloader')
+
+# Post fetch modes of get_post_analytics
+FETCH_LAZY = 'lazy'
+FETCH_SINGLE_REQUEST = 'single_request'
 
 class AdvancedInstagramScraper(InstagramFollowerScraper):
-    def __init__(self):
-        """Initialize the advanced Instagram scraper."""
-        super().__init__()
+    def __init__(self, store=None, timeseries=None):
+        """
+        Initialize the advanced Instagram scraper.
+
+        Args:
+            store (SnapshotStore): Optional snapshot store; when set, only posts
+                published since the last run are fetched and the rest is read from it
+            timeseries (TimeSeriesStore): Optional store every fetched sample
+                (followers and analytics summary) is appended to
+        """
+        super().__init__(timeseries)
+        self.store = store
+        self._request_counter = None
+
+    def _build_loader(self):
+        loader = super()._build_loader()
 
         # Configure for minimal data download but enable post metadata
-        self.loader.save_metadata = True
-        self.loader.compress_json = False
+        loader.save_metadata = True
+        loader.compress_json = False
+
+        # Counts the HTTP requests each analytics run makes
+        self._request_counter = RequestCounter(loader.context)
+        return loader
+
+    @property
+    def request_counter(self):
+        """HTTP request counter of the scraper's loader."""
+        if self._request_counter is None:
+            self.loader  # Building the loader creates the counter
+        return self._request_counter
 
-    def get_post_analytics(self, username, post_count=3):
+    def get_post_analytics(self, username, post_count=3, fetch_mode=FETCH_LAZY):
         """
         Get analytics for the last N posts of a user.
 
         Args:
             username (str): Instagram username (without @)
             post_count (int): Number of recent posts to analyze (default: 3)
+            fetch_mode (str): FETCH_LAZY reads instaloader Post properties (which may
+                trigger per-post requests); FETCH_SINGLE_REQUEST fills every field from
+                the profile-info/timeline payload and only falls back for missing fields
 
         Returns:
             dict: Dictionary containing profile data and post analytics
         """
         try:
-            # Get profile first
-            profile = instaloader.Profile.from_username(self.loader.context, username)
-
-            # Basic profile data
-            profile_data = {
-                'username': profile.username,
-                'full_name': profile.full_name,
-                'followers': profile.followers,
-                'following': profile.followees,
-                'total_posts': profile.mediacount,
-                'is_private': profile.is_private,
-                'is_verified': profile.is_verified,
-                'biography': profile.biography,
-                'external_url': profile.external_url,
-                'timestamp': datetime.now().isoformat(),
-                'posts_analyzed': [],
-                'analytics_summary': {}
-            }
-
-            if profile.is_private:
-                print(f"⚠️  Profile @{username} is private. Post analytics may be limited.")
-                return profile_data
-
-            print(f"📊 Analyzing last {post_count} posts...")
-
-            # Get recent posts
-            posts = profile.get_posts()
-            analyzed_posts = []
-            total_likes = 0
-            total_comments = 0
-
-            for i, post in enumerate(posts):
-                if i >= post_count:
-                    break
-
-                print(f"  📱 Analyzing post {i+1}/{post_count}...")
-
-                post_data = {
-                    'post_number': i + 1,
-                    'shortcode': post.shortcode,
-                    'url': f"https://www.instagram.com/p/{post.shortcode}/",
-                    'date': post.date.isoformat(),
-                    'likes': post.likes,
-                    'comments': post.comments,
-                    'is_video': post.is_video,
-                    'caption': post.caption[:200] + "..." if post.caption and len(post.caption) > 200 else post.caption,
-                    'caption_hashtags': post.caption_hashtags if hasattr(post, 'caption_hashtags') else [],
-                    'location': post.location.name if post.location else None
-                }
-
-                analyzed_posts.append(post_data)
-                total_likes += post.likes
-                total_comments += post.comments
-
-            # Calculate analytics summary
-            if analyzed_posts:
-                avg_likes = total_likes / len(analyzed_posts)
-                avg_comments = total_comments / len(analyzed_posts)
-                engagement_rate = ((total_likes + total_comments) / len(analyzed_posts)) / profile.followers * 100 if profile.followers > 0 else 0
-
-                profile_data['analytics_summary'] = {
-                    'total_likes': total_likes,
-                    'total_comments': total_comments,
-                    'average_likes_per_post': round(avg_likes, 2),
-                    'average_comments_per_post': round(avg_comments, 2),
-                    'engagement_rate_percentage': round(engagement_rate, 2),
-                    'posts_analyzed_count': len(analyzed_posts)
-                }
-
-            profile_data['posts_analyzed'] = analyzed_posts
-
-            return profile_data
+            with trace('get_post_analytics'):
+                return self.lookup_post_analytics(username, post_count, fetch_mode)
 
         except instaloader.exceptions.ProfileNotExistsException:
             print(f"❌ Error: Profile '{username}' does not exist")
@@ -115,6 +86,146 @@ class AdvancedInstagramScraper(InstagramFollowerScraper):
             print(f"❌ Error getting post analytics: {e}")
             return None
 
+    def lookup_post_analytics(self, username, post_count=3, fetch_mode=FETCH_LAZY):
+        """Like get_post_analytics(), but raises instead of printing errors (cached, fetched on a miss)."""
+        return get_response_cache().get_or_fetch(
+            ('post_analytics', username.lower(), post_count, fetch_mode),
+            lambda: self._fetch_post_analytics(username, post_count, fetch_mode)
+        )
+
+    def _fetch_post_analytics(self, username, post_count, fetch_mode=FETCH_LAZY):
+        """Fetch profile and post analytics from Instagram, bypassing the cache."""
+        requests_before = self.request_counter.count
+
+        # Get profile first
+        with span('profile'):
+            profile = instaloader.Profile.from_username(self.loader.context, username)
+
+        # Basic profile data
+        profile_data = {
+            **self._profile_data(profile),
+            'posts_analyzed': [],
+            'analytics_summary': {}
+        }
+
+        if profile.is_private:
+            print(f"⚠️  Profile @{username} is private. Post analytics may be limited.")
+            return profile_data
+
+        print(f"📊 Analyzing last {post_count} posts...")
+
+        # Get recent posts
+        if self.store is not None:
+            # Only the delta since the last run is fetched; the rest comes from the store
+            profile_data['sync_stats'] = sync_posts(self.store, profile, depth=post_count)
+            print(f"  🗄️  {profile_data['sync_stats']['new_posts']} new, "
+                  f"{profile_data['sync_stats']['refreshed_posts']} refreshed posts")
+            posts = (
+                self._format_post(record, i + 1)
+                for i, record in enumerate(self.store.get_posts(profile.username, post_count))
+            )
+        else:
+            posts = self.iter_posts(profile, post_count, fetch_mode)
+        analyzed_posts = []
+        # The summary is updated as each post arrives
+        aggregator = EngagementAggregator()
+
+        for post_data in posts:
+            print(f"  📱 Analyzed post {post_data['post_number']}/{post_count}")
+            analyzed_posts.append(post_data)
+            aggregator.add_post(post_data)
+
+        profile_data['analytics_summary'] = aggregator.summary(profile.followers)
+
+        profile_data['posts_analyzed'] = analyzed_posts
+        if self.store is not None:
+            self.store.save_profile(profile.username, profile_data)
+        if self.timeseries is not None:
+            self.timeseries.add_sample(profile_data)
+        profile_data['fetch_stats'] = {
+            'fetch_mode': fetch_mode,
+            'http_requests': self.request_counter.count - requests_before
+        }
+
+        return profile_data
+
+    def stream_post_analytics(self, username, post_count=None, fetch_mode=FETCH_LAZY, summary_every=None):
+        """
+        Yield the analytics of a profile record by record instead of returning one dict.
+
+        Posts are yielded as soon as they are fetched and never collected, so
+        memory stays flat however many posts are requested.
+
+        Args:
+            username (str): Instagram username (without @)
+            post_count (int): Number of recent posts (None = the whole history)
+            fetch_mode (str): FETCH_LAZY or FETCH_SINGLE_REQUEST
+            summary_every (int): Also yield a partial summary after every N posts
+
+        Yields:
+            dict: A 'profile' record, one 'post' record per post, then a
+            'summary' record with the analytics_summary and the
+            engagement_distribution (distinguished by 'type'; partial
+            summaries have 'partial': True)
+        """
+        profile = instaloader.Profile.from_username(self.loader.context, username)
+        yield {'type': 'profile', **self._profile_data(profile)}
+        if profile.is_private:
+            return
+
+        aggregator = EngagementAggregator()
+        for post_data in self.iter_posts(profile, post_count, fetch_mode):
+            yield {'type': 'post', **post_data}
+            aggregator.add_post(post_data)
+            if summary_every and aggregator.count % summary_every == 0:
+                yield self._summary_record(aggregator, profile.followers, partial=True)
+
+        yield self._summary_record(aggregator, profile.followers)
+
+    def _summary_record(self, aggregator, followers, partial=False):
+        record = {
+            'type': 'summary',
+            'analytics_summary': aggregator.summary(followers),
+            'engagement_distribution': aggregator.distribution()
+        }
+        if partial:
+            record['partial'] = True
+        return record
+
+    def iter_posts(self, profile, post_count=None, fetch_mode=FETCH_LAZY):
+        """
+        Yield the analyzed posts of a profile one at a time, newest first.
+
+        Args:
+            profile (instaloader.Profile): Profile whose posts to read
+            post_count (int): Maximum number of posts (None = all)
+            fetch_mode (str): FETCH_LAZY or FETCH_SINGLE_REQUEST
+
+        Yields:
+            dict: Post data, as in get_post_analytics()['posts_analyzed']
+        """
+        if post_count is not None and post_count <= 0:
+            return
+
+        # Page requests happen inside the get_posts iterator, per-post requests in lazy properties
+        for i, post in enumerate(timed_iter(profile.get_posts(), 'get_posts')):
+            with span('post_properties'):
+                if fetch_mode == FETCH_SINGLE_REQUEST:
+                    post_data = self._format_post(post_fields(post), i + 1)
+                else:
+                    post_data = PostRecord.from_post(post, i + 1, with_location=True).to_analytics_dict()
+            yield post_data
+            if post_count is not None and i + 1 >= post_count:
+                break
+
+    def _profile_data(self, profile):
+        """Basic profile fields reported with the post analytics."""
+        return ProfileRecord.from_profile(profile).to_dict()
+
+    def _format_post(self, fields, post_number):
+        """Shape post fields (see graphql_nodes.post_fields, or a stored post) like the lazy-mode post_data."""
+        return PostRecord.from_fields(fields, post_number).to_analytics_dict()
+
     def display_analytics(self, data):
         """
         Display comprehensive analytics in a formatted way.
@@ -162,6 +273,9 @@ class AdvancedInstagramScraper(InstagramFollowerScraper):
                     print(f"   📝 Caption: {post['caption'][:100]}...")
                 print(f"   🔗 URL: {post['url']}")
 
+        if data.get('fetch_stats'):
+            print(f"\n🌐 HTTP requests: {data['fetch_stats']['http_requests']} ({data['fetch_stats']['fetch_mode']} mode)")
+
         print(f"\n⏰ Data retrieved: {data['timestamp']}")
         print("="*60)
 
@@ -180,14 +294,48 @@ class AdvancedInstagramScraper(InstagramFollowerScraper):
             filename = f"{data['username']}_analytics.json"
 
         try:
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            with open(filename, 'wb') as f:
+                f.write(get_serializer().dumps(data, pretty=True))
 
             print(f"📄 Analytics data saved to: {filename}")
 
         except Exception as e:
             print(f"❌ Error saving analytics to file: {e}")
 
+    def save_analytics_to_ndjson(self, username, post_count=None, filename=None, fetch_mode=FETCH_LAZY):
+        """
+        Stream analytics to an NDJSON file, one record per line, as they are fetched.
+
+        Args:
+            username (str): Instagram username (without @)
+            post_count (int): Number of recent posts (None = the whole history)
+            filename (str): Optional filename (default: username_analytics.ndjson)
+            fetch_mode (str): FETCH_LAZY or FETCH_SINGLE_REQUEST
+
+        Returns:
+            int: Number of records written, or None on error
+        """
+        if not filename:
+            filename = f"{username}_analytics.ndjson"
+
+        try:
+            with NDJSONWriter(filename) as writer:
+                for record in self.stream_post_analytics(username, post_count, fetch_mode):
+                    writer.write(record)
+                    if record['type'] == 'post' and record['post_number'] % 500 == 0:
+                        print(f"  📱 {record['post_number']} posts written...")
+
+            print(f"📄 {writer.count} records streamed to: {filename}")
+            return writer.count
+
+        except instaloader.exceptions.ProfileNotExistsException:
+            print(f"❌ Error: Profile '{username}' does not exist")
+        except instaloader.exceptions.LoginRequiredException:
+            print("❌ Error: Login required to access this profile's posts")
+        except Exception as e:
+            print(f"❌ Error streaming analytics: {e}")
+        return None
+
     def save_analytics_to_text(self, data, filename=None):
         """
         Save analytics data to a readable text file.
@@ -251,21 +399,34 @@ def main():
     print("Fetches profile data + likes/comments for recent posts")
     print("Note: Works best with public profiles\n")
 
+    # --single-request: fill post fields from the profile payload (fewer HTTP calls)
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    fetch_mode = FETCH_SINGLE_REQUEST if '--single-request' in sys.argv else FETCH_LAZY
+
     # Get username
-    if len(sys.argv) > 1:
-        username = sys.argv[1]
+    if args:
+        username = args[0]
     else:
         username = input("Enter Instagram username: ").strip()
         if not username:
             print("No username provided. Exiting.")
             sys.exit(1)
 
+    # --ndjson: stream any number of posts straight to a file instead of collecting them
+    if '--ndjson' in sys.argv:
+        username = username.lstrip('@')
+        post_count = input("Number of recent posts to stream (default: all): ").strip()
+        scraper = AdvancedInstagramScraper()
+        scraper.save_analytics_to_ndjson(username, int(post_count) if post_count.isdigit() else None,
+                                         fetch_mode=fetch_mode)
+        return
+
     # Get number of posts to analyze
     try:
         post_count = input("Number of recent posts to analyze (default: 3): ").strip()
         post_count = int(post_count) if post_count else 3
         if post_count < 1 or post_count > 10:
-            print("Setting to 3 posts (valid range: 1-10)")
+            print("Setting to 3 posts (valid range: 1-10; use resumable_crawl.py for full histories)")
             post_count = 3
     except ValueError:
         print("Invalid input. Using default: 3 posts")
@@ -274,14 +435,14 @@ def main():
     # Remove @ if present
     username = username.lstrip('@')
 
-    # Initialize advanced scraper
-    scraper = AdvancedInstagramScraper()
+    # Initialize advanced scraper (--store keeps snapshots so later runs only fetch new posts)
+    scraper = AdvancedInstagramScraper(store=SnapshotStore() if '--store' in sys.argv else None)
 
     print(f"\n🔍 Analyzing @{username}...")
     print("This may take a moment as we fetch post data...\n")
 
     # Get analytics data
-    analytics_data = scraper.get_post_analytics(username, post_count)
+    analytics_data = scraper.get_post_analytics(username, post_count, fetch_mode)
 
     if analytics_data:
         # Display analytics
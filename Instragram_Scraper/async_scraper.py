@@ -0,0 +1,218 @@
+"""
+Async Instagram Scraper
+
+An asyncio-native scraping engine. It talks to Instagram's web_profile_info
+and timeline GraphQL endpoints over one pooled aiohttp session and builds
+the same dictionaries as scrape_full_profile (app.py) and
+AdvancedInstagramScraper.get_post_analytics, so a single process can keep
+hundreds of lookups in flight.
+"""
+
+import json
+import os
+import pickle
+
+import aiohttp
+import instaloader
+from instaloader.instaloadercontext import default_iphone_headers, default_user_agent
+
+from engagement import EngagementAggregator
+from records import ProfileRecord, PostRecord
+from rate_limiter import get_rate_limiter
+
+TIMELINE_QUERY_HASH = '003056d32c2554def87228bc3fd9668a'
+TIMELINE_PAGE_LENGTH = 50
+
+
+def load_session_cookies(username):
+    """
+    Read the cookies of an instaloader session file.
+
+    Args:
+        username (str): Instagram login whose session file to read
+
+    Returns:
+        dict or None: Session cookies, or None if there is no session file
+    """
+    filename = instaloader.instaloader.get_default_session_filename(username)
+    if not os.path.exists(filename):
+        return None
+    with open(filename, 'rb') as f:
+        return pickle.load(f)
+
+
+class AsyncInstagramScraper:
+    def __init__(self, cookies=None, session_key='anonymous', limiter=None, max_connections=100,
+                 timeout=30, max_attempts=3, api_url='https://i.instagram.com',
+                 web_url='https://www.instagram.com'):
+        """
+        Configure the async scraper (call start() or use `async with`).
+
+        Args:
+            cookies (dict): Session cookies of a logged-in account (None = anonymous)
+            session_key (str): Name of this session at the rate limiter
+            limiter (RateLimiter): Rate limiter (default: the shared one)
+            max_connections (int): Size of the HTTP connection pool
+            timeout (float): Per-request timeout in seconds
+            max_attempts (int): Attempts per request before giving up on 429s
+            api_url (str): Base URL of the profile-info API (overridable for testing)
+            web_url (str): Base URL of the GraphQL endpoint (overridable for testing)
+        """
+        self.cookies = cookies
+        self.session_key = session_key
+        self.limiter = limiter or get_rate_limiter()
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.api_url = api_url.rstrip('/')
+        self.web_url = web_url.rstrip('/')
+        self._session = None
+
+    async def start(self):
+        headers = {'User-Agent': default_user_agent()}
+        if self.cookies and 'csrftoken' in self.cookies:
+            headers['X-CSRFToken'] = self.cookies['csrftoken']
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_connections),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers=headers,
+            cookies=self.cookies,
+        )
+        return self
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def _get_json(self, url, params, headers=None):
+        for attempt in range(1, self.max_attempts + 1):
+            await self.limiter.acquire_async(self.session_key)
+            async with self._session.get(url, params=params, headers=headers, allow_redirects=False) as resp:
+                self.limiter.observe_status(self.session_key, resp.status)
+                if resp.status == 429 and attempt < self.max_attempts:
+                    continue
+                if 300 <= resp.status < 400 and 'accounts/login' in resp.headers.get('location', ''):
+                    raise instaloader.exceptions.LoginRequiredException("Redirected to login page.")
+                if resp.status == 404:
+                    raise instaloader.exceptions.QueryReturnedNotFoundException("404 Not Found")
+                if resp.status != 200:
+                    raise instaloader.exceptions.ConnectionException(f"HTTP error code {resp.status}.")
+                return await resp.json(content_type=None)
+
+    async def fetch_profile(self, username):
+        """
+        Fetch the web_profile_info user node (profile header + first timeline page).
+
+        Raises:
+            instaloader.exceptions.ProfileNotExistsException: If the profile does not exist
+        """
+        try:
+            data = await self._get_json(f"{self.api_url}/api/v1/users/web_profile_info/",
+                                        {'username': username.lower()}, headers=default_iphone_headers())
+        except instaloader.exceptions.QueryReturnedNotFoundException:
+            data = {'data': {'user': None}}
+        user = data['data']['user']
+        if user is None:
+            raise instaloader.exceptions.ProfileNotExistsException(f"Profile {username} does not exist.")
+        return user
+
+    async def iter_post_nodes(self, user, count):
+        """
+        Yield up to `count` timeline post nodes, paging through GraphQL as needed.
+
+        Args:
+            user (dict): User node returned by fetch_profile()
+            count (int): Maximum number of posts
+        """
+        page = user['edge_owner_to_timeline_media']
+        yielded = 0
+        while yielded < count:
+            for edge in page['edges']:
+                if yielded >= count:
+                    return
+                yield edge['node']
+                yielded += 1
+            if not page['page_info']['has_next_page']:
+                return
+
+            variables = {'id': user['id'], 'first': TIMELINE_PAGE_LENGTH,
+                         'after': page['page_info']['end_cursor']}
+            data = await self._get_json(f"{self.web_url}/graphql/query/", {
+                'query_hash': TIMELINE_QUERY_HASH,
+                'variables': json.dumps(variables, separators=(',', ':')),
+            })
+            page = data['data']['user']['edge_owner_to_timeline_media']
+
+    async def scrape_full_profile(self, username, number_of_posts=3):
+        """
+        Async counterpart of scrape_full_profile() in app.py.
+
+        Returns:
+            dict: Profile info and recent posts, or {'error': ...}
+        """
+        username = username.lstrip('@')
+
+        try:
+            user = await self.fetch_profile(username)
+
+            if user['is_private'] and not user.get('followed_by_viewer'):
+                return {"error": "Private profile. You must follow the account to access posts."}
+
+            record = ProfileRecord.from_node(user, details=False)
+            record.posts = [PostRecord.from_node(node, caption_limit=100)
+                            async for node in self.iter_post_nodes(user, number_of_posts)]
+            return record.to_api_dict()
+
+        except instaloader.exceptions.ProfileNotExistsException:
+            return {"error": "Profile does not exist"}
+        except instaloader.exceptions.LoginRequiredException:
+            return {"error": "Login required. Credentials may be invalid or blocked."}
+        except Exception as e:
+            return {"error": str(e)}
+
+    async def get_post_analytics(self, username, post_count=3):
+        """
+        Async counterpart of AdvancedInstagramScraper.get_post_analytics().
+
+        Returns:
+            dict: Profile data and post analytics, or None on error
+        """
+        try:
+            user = await self.fetch_profile(username)
+            record = ProfileRecord.from_node(user)
+            profile_data = {
+                **record.to_dict(),
+                'posts_analyzed': [],
+                'analytics_summary': {}
+            }
+
+            if user['is_private']:
+                return profile_data
+
+            analyzed_posts = []
+            aggregator = EngagementAggregator()
+            async for node in self.iter_post_nodes(user, post_count):
+                post = PostRecord.from_node(node, len(analyzed_posts) + 1)
+                analyzed_posts.append(post.to_analytics_dict())
+                aggregator.add(post.likes, post.comments, post.is_video)
+
+            profile_data['analytics_summary'] = aggregator.summary(record.followers)
+            profile_data['posts_analyzed'] = analyzed_posts
+            return profile_data
+
+        except instaloader.exceptions.ProfileNotExistsException:
+            print(f"❌ Error: Profile '{username}' does not exist")
+            return None
+        except instaloader.exceptions.LoginRequiredException:
+            print("❌ Error: Login required to access this profile's posts")
+            return None
+        except Exception as e:
+            print(f"❌ Error getting post analytics: {e}")
+            return None
@@ -0,0 +1,50 @@
+"""
+Batch Helpers
+
+Fan a lookup out over a bounded thread pool and stream results back in
+completion order, keeping each item's error separate from the rest.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+
+def run_concurrently(func, items, max_workers=8):
+    """
+    Call func(item) for every item on a thread pool.
+
+    Only a bounded number of calls are queued at once, so very long input
+    lists (or generators) are consumed lazily.
+
+    Args:
+        func (callable): Function called with one item
+        items (iterable): Items to process
+        max_workers (int): Number of worker threads
+
+    Yields:
+        tuple: (item, result, error) as each call finishes; exactly one of
+        result/error is set
+    """
+    items = iter(items)
+    max_pending = max_workers * 2
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {}
+
+        def submit_next():
+            for item in items:
+                pending[executor.submit(func, item)] = item
+                return True
+            return False
+
+        while len(pending) < max_pending and submit_next():
+            pass
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = pending.pop(future)
+                try:
+                    yield item, future.result(), None
+                except Exception as e:
+                    yield item, None, e
+                submit_next()
@@ -0,0 +1,219 @@
+"""
+Batch Engagement Analytics
+
+Engagement statistics for many profiles at once. Post records are held as
+NumPy columns (one entry per post plus a profile index), and every metric
+-- totals, averages, engagement rate, median and percentiles, likes per
+follower, the video/photo split and outlier posts -- is computed for all
+profiles in one vectorized pass instead of a Python loop per profile.
+"""
+
+import numpy as np
+
+# Percentiles of per-post engagement (likes + comments) reported for each profile
+PERCENTILES = (25, 50, 75, 90)
+
+# A post is an outlier when its engagement exceeds Q3 + OUTLIER_IQR_FACTOR * IQR of its profile
+OUTLIER_IQR_FACTOR = 1.5
+
+
+def columns_from_results(results):
+    """
+    Turn scraper results into post columns.
+
+    Args:
+        results (list): Dictionaries from get_post_analytics() ('posts_analyzed')
+            or scrape_posts_analytics() ('posts'); None entries are skipped
+
+    Returns:
+        dict: 'usernames' and 'followers' (one entry per profile) and 'profile',
+        'likes', 'comments' and 'is_video' (one entry per post)
+    """
+    usernames, followers = [], []
+    profile, likes, comments, is_video = [], [], [], []
+
+    for data in results:
+        if not data or 'error' in data:
+            continue
+        index = len(usernames)
+        usernames.append(data['username'])
+        followers.append(data['followers'])
+        for post in data.get('posts_analyzed', data.get('posts', [])):
+            profile.append(index)
+            likes.append(post['likes'])
+            comments.append(post['comments'])
+            is_video.append(post['is_video'])
+
+    return {
+        'usernames': usernames,
+        'followers': np.asarray(followers, dtype=np.int64),
+        'profile': np.asarray(profile, dtype=np.int64),
+        'likes': np.asarray(likes, dtype=np.int64),
+        'comments': np.asarray(comments, dtype=np.int64),
+        'is_video': np.asarray(is_video, dtype=bool),
+    }
+
+
+def _group_percentile(sorted_values, starts, counts, q):
+    """Linear-interpolated percentile of every group of a group-sorted array (NaN for empty groups)."""
+    position = starts + (counts - 1) * (q / 100)
+    lower = np.floor(position).astype(np.int64)
+    upper = np.ceil(position).astype(np.int64)
+    empty = counts == 0
+    lower[empty] = upper[empty] = 0
+
+    fraction = position - lower
+    values = sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * fraction
+    values[empty] = np.nan
+    return values
+
+
+def engagement_columns(profile, likes, comments, is_video, followers):
+    """
+    Compute engagement metrics of every profile in one vectorized pass.
+
+    Args:
+        profile (array): Profile index (0..P-1) of each post
+        likes (array): Likes of each post
+        comments (array): Comments of each post
+        is_video (array): Whether each post is a video
+        followers (array): Follower count of each profile (length P)
+
+    Returns:
+        dict: One array per metric, indexed by profile, plus 'outlier' (a
+        boolean array over the posts marking engagement outliers)
+    """
+    profile = np.asarray(profile, dtype=np.int64)
+    likes = np.asarray(likes, dtype=np.int64)
+    comments = np.asarray(comments, dtype=np.int64)
+    is_video = np.asarray(is_video, dtype=bool)
+    followers = np.asarray(followers, dtype=np.int64)
+    profiles = len(followers)
+    engagement = likes + comments
+
+    counts = np.bincount(profile, minlength=profiles)
+    total_likes = np.bincount(profile, weights=likes, minlength=profiles).astype(np.int64)
+    total_comments = np.bincount(profile, weights=comments, minlength=profiles).astype(np.int64)
+    video_posts = np.bincount(profile, weights=is_video, minlength=profiles).astype(np.int64)
+    video_engagement = np.bincount(profile, weights=engagement * is_video, minlength=profiles)
+    photo_posts = counts - video_posts
+    photo_engagement = np.bincount(profile, weights=engagement * ~is_video, minlength=profiles)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        average_likes = total_likes / counts
+        average_comments = total_comments / counts
+        engagement_rate = np.where(
+            followers > 0, ((total_likes + total_comments) / counts) / followers * 100, 0.0
+        )
+        likes_per_follower = np.where(followers > 0, average_likes / followers, 0.0)
+        video_average = video_engagement / video_posts
+        photo_average = photo_engagement / photo_posts
+
+    # Sort posts by profile, then engagement, so each profile's posts form a sorted run.
+    # Packing both into one int64 key lets a plain np.sort replace a slower lexsort.
+    starts = np.cumsum(counts) - counts
+    span = int(engagement.max()) + 1 if len(engagement) else 1
+    if engagement.min(initial=0) >= 0 and span * max(profiles, 1) < 2 ** 62:
+        sorted_profile = np.repeat(np.arange(profiles, dtype=np.int64), counts)
+        sorted_engagement = (np.sort(profile * span + engagement) - sorted_profile * span).astype(np.float64)
+    else:
+        sorted_engagement = engagement[np.lexsort((engagement, profile))].astype(np.float64)
+    percentiles = {q: _group_percentile(sorted_engagement, starts, counts, q) for q in PERCENTILES}
+
+    iqr = percentiles[75] - percentiles[25]
+    threshold = percentiles[75] + OUTLIER_IQR_FACTOR * iqr
+    outlier = engagement > threshold[profile]
+
+    return {
+        'posts': counts,
+        'total_likes': total_likes,
+        'total_comments': total_comments,
+        'average_likes': average_likes,
+        'average_comments': average_comments,
+        'engagement_rate': engagement_rate,
+        'likes_per_follower': likes_per_follower,
+        'median_engagement': percentiles[50],
+        'percentiles': percentiles,
+        'video_posts': video_posts,
+        'photo_posts': photo_posts,
+        'video_average_engagement': video_average,
+        'photo_average_engagement': photo_average,
+        'outlier_posts': np.bincount(profile, weights=outlier, minlength=profiles).astype(np.int64),
+        'outlier': outlier,
+    }
+
+
+def _rounded(value, digits):
+    return None if value != value else round(value, digits)  # NaN -> None
+
+
+def summarize_profiles(columns):
+    """
+    Build per-profile summaries from post columns.
+
+    The keys of analytics_summary() (get_post_analytics) and of
+    calculate_engagement_stats() (posts_analytics.py) are both included,
+    rounded the same way, next to the batch-only metrics.
+
+    Args:
+        columns (dict): Post columns as returned by columns_from_results()
+
+    Returns:
+        dict: Username -> summary ({} for profiles without posts)
+    """
+    metrics = engagement_columns(columns['profile'], columns['likes'], columns['comments'],
+                                 columns['is_video'], columns['followers'])
+    # Convert every column to Python values once; indexing NumPy arrays per profile is slow
+    values = {name: metrics[name].tolist() for name in metrics if name not in ('percentiles', 'outlier')}
+    percentiles = {q: metrics['percentiles'][q].tolist() for q in PERCENTILES}
+    summaries = {}
+
+    for i, username in enumerate(columns['usernames']):
+        count = values['posts'][i]
+        if not count:
+            summaries[username] = {}
+            continue
+
+        summaries[username] = {
+            # analytics_summary() keys
+            'total_likes': values['total_likes'][i],
+            'total_comments': values['total_comments'][i],
+            'average_likes_per_post': round(values['average_likes'][i], 2),
+            'average_comments_per_post': round(values['average_comments'][i], 2),
+            'engagement_rate_percentage': round(values['engagement_rate'][i], 2),
+            'posts_analyzed_count': count,
+            # calculate_engagement_stats() keys
+            'average_likes': round(values['average_likes'][i], 1),
+            'average_comments': round(values['average_comments'][i], 1),
+            'engagement_rate': round(values['engagement_rate'][i], 2),
+            # Batch-only metrics
+            'median_engagement': _rounded(values['median_engagement'][i], 1),
+            'engagement_percentiles': {f"p{q}": _rounded(percentiles[q][i], 1) for q in PERCENTILES},
+            'likes_per_follower': round(values['likes_per_follower'][i], 6),
+            'video_posts': values['video_posts'][i],
+            'photo_posts': values['photo_posts'][i],
+            'video_average_engagement': _rounded(values['video_average_engagement'][i], 1),
+            'photo_average_engagement': _rounded(values['photo_average_engagement'][i], 1),
+            'outlier_posts': values['outlier_posts'][i],
+        }
+
+    return summaries
+
+
+def outlier_posts(results):
+    """
+    Find posts whose engagement is far above their profile's usual level.
+
+    Args:
+        results (list): Scraper results, as for columns_from_results()
+
+    Returns:
+        list: (username, post dict) pairs of every outlier post
+    """
+    results = [data for data in results if data and 'error' not in data]
+    posts = [(data['username'], post) for data in results
+             for post in data.get('posts_analyzed', data.get('posts', []))]
+    columns = columns_from_results(results)
+    outlier = engagement_columns(columns['profile'], columns['likes'], columns['comments'],
+                                 columns['is_video'], columns['followers'])['outlier']
+    return [pair for pair, flagged in zip(posts, outlier) if flagged]
@@ -0,0 +1,410 @@
+"""
+Batch CLI
+
+Runs one of the scrapers over a list of usernames without any prompts, so
+it can be used in shell pipelines and cron jobs:
+
+    python batch_cli.py usernames.txt --mode=analytics --posts=5 --workers=8 --output=results.ndjson
+    cat usernames.txt | python batch_cli.py --format=csv --output=- > followers.csv
+
+Modes:
+    followers   follower data (simple_scraper.py, instagram_scraper.py)
+    posts       posts engagement report (posts_analytics.py)
+    analytics   post analytics (advanced_scraper.py)
+
+The input has one username per line, with or without @. Blank lines, lines
+starting with # and repeated usernames are skipped. Lookups run on --workers
+threads. They share one session, the response cache and the rate limiter.
+
+Output formats:
+    ndjson    one JSON object per account, posts included
+    csv       one flat row per account: profile fields and engagement summary
+    parquet   same rows as csv (needs pyarrow)
+
+When a lookup fails, the account's row has an `error` field.
+
+Every finished username is appended to a done file, by default the output
+path plus ".done". A rerun with the same output skips those usernames and
+adds to the output. For Parquet, a rerun that has rows to write puts them in a
+new numbered file next to the first one. Accounts that do not exist or need a login count as finished.
+Other errors, such as rate limits or network failures, are retried by the
+next run. A username is only marked done after its row is written. A crash
+can therefore repeat a row, but never lose one. Progress and scraper output
+go to stderr.
+
+Usage:
+    python batch_cli.py [FILE|-] [--mode=followers] [--posts=3] [--workers=8]
+                        [--format=ndjson|csv|parquet] [--output=FILE|-] [--done=FILE]
+                        [--login] [--single-request] [--store]
+"""
+
+import contextlib
+import csv
+import os
+import sys
+import time
+
+from advanced_scraper import AdvancedInstagramScraper, FETCH_LAZY, FETCH_SINGLE_REQUEST
+from batch import run_concurrently
+from instagram_scraper import get_scraper
+from lazy_imports import lazy_import
+from posts_analytics import lookup_posts_analytics
+from snapshot_store import SnapshotStore
+from streaming import NDJSONWriter
+
+# Imported on first use (see lazy_imports.py); pyarrow is only needed for Parquet output
+instaloader = lazy_import('instaloader')
+pyarrow = lazy_import('pyarrow', optional=True)
+
+DEFAULTS = {
+    'mode': 'followers',
+    'posts': 3,
+    'workers': 8,
+    'format': '',           # default: from the output file extension, else ndjson
+    'output': '',           # default: batch_<mode>.<format>
+    'done': '',             # default: <output>.done (no resume when writing to stdout)
+    'login': False,         # log in with INSTAGRAM_USERNAME/INSTAGRAM_PASSWORD
+    'single-request': False,  # analytics: fill post fields from the profile payload
+    'store': False,         # posts/analytics: only fetch posts missing from the snapshot store
+}
+
+FORMATS = ('ndjson', 'csv', 'parquet')
+
+# Flat CSV/Parquet columns of each mode as (name, type). Values come from the
+# result dict, or from its summary dict (second element) for the engagement fields.
+MODES = {
+    'followers': ((
+        ('username', 'str'), ('full_name', 'str'), ('followers', 'int'), ('following', 'int'),
+        ('posts', 'int'), ('is_private', 'bool'), ('is_verified', 'bool'), ('biography', 'str'),
+        ('external_url', 'str'), ('timestamp', 'str'), ('error', 'str'),
+    ), None),
+    'posts': ((
+        ('username', 'str'), ('full_name', 'str'), ('followers', 'int'), ('following', 'int'),
+        ('total_posts', 'int'), ('is_private', 'bool'), ('is_verified', 'bool'), ('timestamp', 'str'),
+        ('total_likes', 'int'), ('total_comments', 'int'), ('average_likes', 'float'),
+        ('average_comments', 'float'), ('engagement_rate', 'float'), ('error', 'str'),
+    ), 'engagement_stats'),
+    'analytics': ((
+        ('username', 'str'), ('full_name', 'str'), ('followers', 'int'), ('following', 'int'),
+        ('total_posts', 'int'), ('is_private', 'bool'), ('is_verified', 'bool'), ('biography', 'str'),
+        ('external_url', 'str'), ('timestamp', 'str'), ('total_likes', 'int'), ('total_comments', 'int'),
+        ('average_likes_per_post', 'float'), ('average_comments_per_post', 'float'),
+        ('engagement_rate_percentage', 'float'), ('posts_analyzed_count', 'int'), ('error', 'str'),
+    ), 'analytics_summary'),
+}
+
+# Rows buffered per Parquet row group
+ROW_GROUP_SIZE = 5000
+
+# Print a progress line every this many finished accounts
+PROGRESS_EVERY = 100
+
+
+def parse_options(argv):
+    """Read --name=value options (see DEFAULTS) and return (options, positional args)."""
+    options = dict(DEFAULTS)
+    args = []
+    for arg in argv:
+        if not arg.startswith('--'):
+            args.append(arg)
+            continue
+        name, _, value = arg[2:].partition('=')
+        if name not in DEFAULTS:
+            raise SystemExit(f"Unknown option: {arg} (options: {', '.join('--' + name for name in DEFAULTS)})")
+        default = DEFAULTS[name]
+        if isinstance(default, bool):
+            options[name] = value.lower() not in ('0', 'false', 'no')
+        else:
+            options[name] = type(default)(value)
+    return options, args
+
+
+def read_usernames(lines, skip, counts):
+    """
+    Yield the usernames of an input, one per line.
+
+    Args:
+        lines (iterable): Input lines
+        skip (set): Lowercased usernames to leave out (already done)
+        counts (dict): 'skipped' is incremented for every username found in skip
+
+    Yields:
+        str: Username without @, each one at most once
+    """
+    seen = set()
+    for line in lines:
+        username = line.strip().lstrip('@')
+        if not username or username.startswith('#'):
+            continue
+        key = username.lower()
+        if key in seen:
+            continue
+        seen.add(key)
+        if key in skip:
+            counts['skipped'] += 1
+            continue
+        yield username
+
+
+def read_done(path):
+    """Return the lowercased usernames listed in a done file (empty if there is none)."""
+    if not path or not os.path.exists(path):
+        return set()
+    with open(path, encoding='utf-8') as f:
+        return {line.strip().lower() for line in f if line.strip()}
+
+
+def mark_done(done_log, usernames):
+    """Append usernames to the open done file and flush it."""
+    done_log.write(''.join(f"{username}\n" for username in usernames))
+    done_log.flush()
+
+
+def describe_error(username, error):
+    """
+    Turn a lookup exception into a message.
+
+    Returns:
+        tuple: (message, permanent); permanent errors are not retried by later runs
+    """
+    if isinstance(error, instaloader.exceptions.ProfileNotExistsException):
+        return f"Profile '{username}' does not exist", True
+    if isinstance(error, instaloader.exceptions.LoginRequiredException):
+        return "Login required to access this profile (private account)", True
+    return str(error) or type(error).__name__, False
+
+
+def flat_row(record, mode):
+    """Pick the CSV/Parquet columns of a mode out of a result (or error) dict."""
+    columns, summary_key = MODES[mode]
+    summary = (record.get(summary_key) or {}) if summary_key else {}
+    return {name: record[name] if name in record else summary.get(name) for name, _ in columns}
+
+
+def make_lookup(options):
+    """Return a function username -> result dict (raising on errors) for the selected mode."""
+    mode = options['mode']
+    store = SnapshotStore() if options['store'] else None
+    if mode == 'analytics':
+        scraper = AdvancedInstagramScraper(store=store)
+    else:
+        scraper = get_scraper()
+    if options['login'] and not scraper.login():
+        raise SystemExit("❌ Login failed (check INSTAGRAM_USERNAME/INSTAGRAM_PASSWORD)")
+
+    if mode == 'followers':
+        return scraper.lookup_follower_count
+    if mode == 'posts':
+        return lambda username: lookup_posts_analytics(username, options['posts'], store)
+    fetch_mode = FETCH_SINGLE_REQUEST if options['single-request'] else FETCH_LAZY
+    return lambda username: scraper.lookup_post_analytics(username, options['posts'], fetch_mode)
+
+
+class CSVRowWriter:
+    def __init__(self, target, columns, append=False):
+        """
+        Open a CSV output with a fixed header.
+
+        Args:
+            target (str or file): Path to write to, or an open text file (e.g. sys.stdout)
+            columns (tuple): (name, type) pairs; only the names are used
+            append (bool): Add rows to an existing file (the header is not repeated)
+        """
+        self._owns_file = isinstance(target, str)
+        write_header = True
+        if self._owns_file:
+            write_header = not (append and os.path.exists(target) and os.path.getsize(target))
+            self._file = open(target, 'a' if append else 'w', encoding='utf-8', newline='')
+        else:
+            self._file = target
+        self._writer = csv.DictWriter(self._file, fieldnames=[name for name, _ in columns])
+        if write_header:
+            self._writer.writeheader()
+
+    def write(self, row):
+        """Write one row and flush it."""
+        self._writer.writerow(row)
+        self._file.flush()
+
+    def close(self):
+        if self._owns_file:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ParquetRowWriter:
+    PYARROW_TYPES = {'str': 'string', 'int': 'int64', 'float': 'float64', 'bool': 'bool_'}
+
+    def __init__(self, path, columns, keep_existing=False):
+        """
+        Prepare a Parquet file. It is only created when the first row group is
+        written, so a run without rows leaves no empty file behind. Rows are
+        buffered and written in row groups of ROW_GROUP_SIZE; `buffered` is
+        the number of rows not yet on disk.
+
+        Args:
+            path (str): File to write
+            columns (tuple): (name, type) pairs of the schema
+            keep_existing (bool): If the file exists, write to a numbered sibling
+                (see next_free_path) instead of replacing it
+        """
+        self.path = path
+        self.keep_existing = keep_existing
+        self._schema = pyarrow.schema([
+            (name, getattr(pyarrow, self.PYARROW_TYPES[kind])()) for name, kind in columns
+        ])
+        self._writer = None
+        self._rows = []
+
+    def _open(self):
+        import pyarrow.parquet
+
+        if self.keep_existing:
+            path = next_free_path(self.path)
+            if path != self.path:
+                print(f"📁 {self.path} exists, writing this run to {path}")
+            self.path = path
+        self._writer = pyarrow.parquet.ParquetWriter(self.path, self._schema)
+
+    @property
+    def buffered(self):
+        return len(self._rows)
+
+    def write(self, row):
+        self._rows.append(row)
+        if len(self._rows) >= ROW_GROUP_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self._rows:
+            if self._writer is None:
+                self._open()
+            self._writer.write_table(pyarrow.Table.from_pylist(self._rows, schema=self._schema))
+            self._rows = []
+
+    def close(self):
+        self.flush()
+        if self._writer is not None:
+            self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def next_free_path(path):
+    """Return path, or path with a number before the extension (results.1.parquet, ...) if it exists."""
+    stem, extension = os.path.splitext(path)
+    candidate, number = path, 0
+    while os.path.exists(candidate):
+        number += 1
+        candidate = f"{stem}.{number}{extension}"
+    return candidate
+
+
+def open_writer(output_format, output, columns, resume, stdout):
+    """Open the output; resumed NDJSON/CSV files are appended to."""
+    target = stdout if output == '-' else output
+    if output_format == 'ndjson':
+        return NDJSONWriter(target, append=resume)
+    if output_format == 'csv':
+        return CSVRowWriter(target, columns, append=resume)
+    return ParquetRowWriter(output, columns, keep_existing=resume)
+
+
+def run(options, source, stdout):
+    """Look up every username of the input and write the results. Returns the counts."""
+    mode = options['mode']
+    output = options['output']
+    columns, _ = MODES[mode]
+    done_path = options['done'] or (None if output == '-' else output + '.done')
+    done = read_done(done_path)
+    counts = {'written': 0, 'failed': 0, 'retry': 0, 'skipped': 0}
+
+    lookup = make_lookup(options)
+    lines = sys.stdin if source == '-' else open(source, encoding='utf-8')
+    done_log = open(done_path, 'a', encoding='utf-8') if done_path else None
+    writer = open_writer(options['format'], output, columns, bool(done), stdout)
+    # Usernames whose rows were handed to the writer but may still be buffered (Parquet)
+    pending = []
+    started = time.perf_counter()
+
+    try:
+        for username, data, error in run_concurrently(lookup, read_usernames(lines, done, counts), options['workers']):
+            if error is None:
+                record = data
+                counts['written'] += 1
+            else:
+                message, permanent = describe_error(username, error)
+                record = {'username': username, 'error': message}
+                print(f"❌ @{username}: {message}")
+                counts['failed'] += 1
+                if not permanent:
+                    # Neither written nor marked done, so the next run tries it again
+                    counts['retry'] += 1
+                    continue
+
+            writer.write(record if options['format'] == 'ndjson' else flat_row(record, mode))
+            pending.append(username)
+            if done_log is not None and not getattr(writer, 'buffered', 0):
+                mark_done(done_log, pending)
+                pending = []
+
+            finished = counts['written'] + counts['failed']
+            if finished % PROGRESS_EVERY == 0:
+                rate = finished / (time.perf_counter() - started)
+                print(f"⏳ {finished:,} accounts done ({rate:.1f}/s), {counts['failed']:,} failed")
+    finally:
+        # Closing the writer flushes buffered rows, so the rest can be marked done
+        writer.close()
+        if done_log is not None:
+            mark_done(done_log, pending)
+            done_log.close()
+        if lines is not sys.stdin:
+            lines.close()
+
+    counts['seconds'] = time.perf_counter() - started
+    return counts
+
+
+def main():
+    options, args = parse_options(sys.argv[1:])
+    if options['mode'] not in MODES:
+        raise SystemExit(f"Unknown mode '{options['mode']}' (choose from: {', '.join(MODES)})")
+    source = args[0] if args else '-'
+    if source == '-' and sys.stdin.isatty():
+        raise SystemExit(__doc__.split('Usage:')[1].rstrip())
+
+    if not options['format']:
+        extension = os.path.splitext(options['output'])[1].lstrip('.').lower()
+        options['format'] = extension if extension in FORMATS else 'ndjson'
+    if options['format'] not in FORMATS:
+        raise SystemExit(f"Unknown format '{options['format']}' (choose from: {', '.join(FORMATS)})")
+    if options['format'] == 'parquet':
+        if pyarrow is None:
+            raise SystemExit("❌ Parquet output needs pyarrow (pip install pyarrow)")
+        if options['output'] == '-':
+            raise SystemExit("❌ Parquet cannot be written to stdout, pass --output=FILE")
+    if not options['output']:
+        options['output'] = f"batch_{options['mode']}.{options['format']}"
+
+    # Scraper messages go to stderr, so results can be written to stdout
+    stdout = sys.stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        destination = 'stdout' if options['output'] == '-' else options['output']
+        print(f"🚀 {options['mode']} lookups with {options['workers']} workers -> {destination}")
+        counts = run(options, source, stdout)
+        print(f"\n✅ {counts['written']:,} written, {counts['failed']:,} failed "
+              f"({counts['retry']:,} left for the next run), {counts['skipped']:,} already done "
+              f"in {counts['seconds']:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
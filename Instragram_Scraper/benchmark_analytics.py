@@ -0,0 +1,81 @@
+"""
+Batch Analytics Benchmark
+
+Compares the per-profile Python math used today (sum() over lists of post
+dicts, one profile at a time) with the vectorized batch module, from 10 to
+1M posts (12 posts per profile).
+
+Usage:
+    python benchmark_analytics.py [max_posts]
+"""
+
+import random
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from batch_analytics import columns_from_results, engagement_columns, summarize_profiles
+from posts_analytics import calculate_engagement_stats
+
+POSTS_PER_PROFILE = 12
+
+
+def make_results(post_count):
+    rng = random.Random(post_count)
+    results = []
+    for i in range(0, post_count, POSTS_PER_PROFILE):
+        posts = [{'likes': rng.randint(0, 100000), 'comments': rng.randint(0, 2000), 'is_video': rng.random() < 0.3}
+                 for _ in range(min(POSTS_PER_PROFILE, post_count - i))]
+        results.append({'username': f"user{i}", 'followers': rng.randint(1, 10 ** 7), 'posts': posts})
+    return results
+
+
+def run_python(results):
+    """Today's approach, extended with the same extra metrics using the statistics module."""
+    summaries = {}
+    for data in results:
+        posts = data['posts']
+        stats = calculate_engagement_stats(posts, data['followers'])
+        engagement = [post['likes'] + post['comments'] for post in posts]
+        stats['median_engagement'] = statistics.median(engagement)
+        quartiles = statistics.quantiles(engagement, n=4, method='inclusive') if len(engagement) > 1 else engagement * 3
+        threshold = quartiles[2] + 1.5 * (quartiles[2] - quartiles[0])
+        stats['outlier_posts'] = sum(1 for value in engagement if value > threshold)
+        stats['video_posts'] = sum(1 for post in posts if post['is_video'])
+        summaries[data['username']] = stats
+    return summaries
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    max_posts = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    print(f"{'posts':>10} {'python':>10} {'columns':>10} {'summaries':>10} {'vector pass':>12} {'speedup':>8}")
+    post_count = 10
+    while post_count <= max_posts:
+        results = make_results(post_count)
+        _, python_time = timed(run_python, results)
+        columns, columns_time = timed(columns_from_results, results)
+        _, summary_time = timed(summarize_profiles, columns)
+        _, pass_time = timed(engagement_columns, columns['profile'], columns['likes'], columns['comments'],
+                             columns['is_video'], columns['followers'])
+
+        print(f"{post_count:>10,} {python_time * 1000:>8.1f}ms {columns_time * 1000:>8.1f}ms "
+              f"{summary_time * 1000:>8.1f}ms {pass_time * 1000:>10.1f}ms "
+              f"{python_time / pass_time:>7.1f}x")
+        post_count *= 10
+
+    print("\ncolumns = building NumPy columns from result dicts; summaries = vector pass + "
+          "per-profile dicts; speedup = python / vector pass")
+
+
+if __name__ == "__main__":
+    np.seterr(all='ignore')
+    main()
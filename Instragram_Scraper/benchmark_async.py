@@ -0,0 +1,84 @@
+"""
+Async vs Sync Benchmark
+
+Compares profile+posts lookups per second of the current sync path
+(instaloader on a thread pool, like a threaded WSGI server) with the
+asyncio engine, both against the local fake Instagram backend.
+
+Usage:
+    python benchmark_async.py [lookups] [latency_seconds]
+"""
+
+import asyncio
+import contextlib
+import io
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from advanced_scraper import AdvancedInstagramScraper
+from async_scraper import AsyncInstagramScraper
+from fake_instagram import FakeInstagramServer, route_to_fake
+from rate_limiter import RateLimiter
+import rate_limiter
+
+SYNC_WORKERS = 8
+ASYNC_CONCURRENCY = 200
+POSTS_PER_LOOKUP = 12
+
+
+def run_sync(server, usernames):
+    scraper = AdvancedInstagramScraper()
+    scraper.loader.context.sleep = False
+    scraper.loader.context.quiet = True
+    route_to_fake(scraper.loader.context, server)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=SYNC_WORKERS) as executor:
+        results = list(executor.map(lambda name: scraper._fetch_post_analytics(name, POSTS_PER_LOOKUP), usernames))
+    return results, time.perf_counter() - started
+
+
+async def run_async(server, usernames):
+    semaphore = asyncio.Semaphore(ASYNC_CONCURRENCY)
+
+    async with AsyncInstagramScraper(api_url=server.base_url, web_url=server.base_url,
+                                     max_connections=ASYNC_CONCURRENCY) as scraper:
+        async def lookup(name):
+            async with semaphore:
+                return await scraper.get_post_analytics(name, POSTS_PER_LOOKUP)
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(lookup(name) for name in usernames))
+        return results, time.perf_counter() - started
+
+
+def main():
+    lookups = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.05
+
+    # Measure the engines, not the limiter
+    rate_limiter._default_limiter = RateLimiter(rate=10**6, burst=10**6, max_rate=10**6)
+
+    server = FakeInstagramServer(latency=latency).start()
+    usernames = [f"bench_user_{i}" for i in range(lookups)]
+
+    print(f"Benchmark: {lookups} lookups x {POSTS_PER_LOOKUP} posts, {latency * 1000:.0f} ms upstream latency")
+    print("-" * 60)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        sync_results, sync_time = run_sync(server, usernames)
+    print(f"sync  ({SYNC_WORKERS} threads):      {lookups / sync_time:8.1f} lookups/s  ({sync_time:.2f}s)")
+
+    async_results, async_time = asyncio.run(run_async(server, usernames))
+    print(f"async ({ASYNC_CONCURRENCY} in flight):   {lookups / async_time:8.1f} lookups/s  ({async_time:.2f}s)")
+
+    assert [r['analytics_summary'] for r in sync_results] == [r['analytics_summary'] for r in async_results]
+    print("-" * 60)
+    print(f"Speedup: {sync_time / async_time:.1f}x (results identical)")
+
+    server.stop()
+
+
+if __name__ == "__main__":
+    main()
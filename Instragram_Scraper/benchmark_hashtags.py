@@ -0,0 +1,90 @@
+"""
+Hashtag Index Benchmark
+
+Builds the hashtag index (hashtag_index.py) over synthetic captions, from
+1K to 1M posts (12 posts per account, Zipf-distributed hashtags), and
+compares its top-K queries with re-scanning every caption per query.
+
+Usage:
+    python benchmark_hashtags.py [max_posts]
+"""
+
+import random
+import sys
+import time
+from collections import defaultdict
+
+from graphql_nodes import caption_hashtags
+from hashtag_index import HashtagIndex
+
+POSTS_PER_PROFILE = 12
+VOCABULARY = 50_000
+WORDS = "sunset beach coffee morning friends travel weekend family city light summer adventure".split()
+
+
+def make_posts(post_count):
+    rng = random.Random(post_count)
+    weights = [1 / rank for rank in range(1, VOCABULARY + 1)]
+    tags = rng.choices(range(VOCABULARY), weights, k=post_count * 4)
+    for i in range(post_count):
+        caption = (f"{' '.join(rng.sample(WORDS, 3))} with @friend{rng.randrange(1000)} "
+                   + ' '.join(f"#tag{tag}" for tag in tags[i * 4:i * 4 + rng.randint(1, 4)]))
+        yield (f"user{i // POSTS_PER_PROFILE}", f"post{i}", caption,
+               rng.randint(0, 100000), rng.randint(0, 2000))
+
+
+def scan_top(posts, k):
+    """Today's option: count every caption's hashtags again for each query."""
+    totals = defaultdict(lambda: [0, 0])
+    for _, _, caption, likes, comments in posts:
+        for tag in set(caption_hashtags(caption)):
+            total = totals[tag]
+            total[0] += 1
+            total[1] += likes + comments
+    ranked = sorted(((engagement / count, tag) for tag, (count, engagement) in totals.items() if count >= 3),
+                    reverse=True)
+    return ranked[:k]
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+def index_bytes(index):
+    """Bytes held by the postings and per-post arrays (the part that grows with the post count)."""
+    arrays = [*index._postings, index._likes, index._comments, index._owners]
+    return sum(len(values) * values.itemsize for values in arrays)
+
+
+def main():
+    max_posts = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    print(f"{'posts':>10} {'terms':>8} {'build':>9} {'arrays':>9} {'top-20':>9} {'by account':>11} "
+          f"{'rescan':>9} {'speedup':>8}")
+    post_count = 1000
+    while post_count <= max_posts:
+        posts = list(make_posts(post_count))
+        index = HashtagIndex(keywords=False)
+
+        def build():
+            for post in posts:
+                index.add_post(*post)
+        _, build_time = timed(build)
+        index.top(k=20, min_posts=3)  # First query flattens the postings
+        _, top_time = timed(index.top, 'hashtag', 'engagement', 20, 3)
+        _, account_time = timed(index.top, 'hashtag', 'engagement', 20, 3, ['user0', 'user1', 'user2'])
+        _, scan_time = timed(scan_top, posts, 20)
+
+        print(f"{post_count:>10,} {index.term_count:>8,} {build_time:>8.2f}s "
+              f"{index_bytes(index) / 2 ** 20:>7.1f}MB {top_time * 1000:>7.1f}ms {account_time * 1000:>9.1f}ms "
+              f"{scan_time * 1000:>7.0f}ms {scan_time / top_time:>7.0f}x")
+        post_count *= 10
+
+    print("\nbuild = indexing every caption; arrays = postings + per-post counters; "
+          "rescan = counting hashtags over all captions per query; speedup = rescan / top-20")
+
+
+if __name__ == "__main__":
+    main()
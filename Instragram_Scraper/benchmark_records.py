@@ -0,0 +1,64 @@
+"""
+Record Memory Benchmark
+
+Compares the memory held by cached posts as per-post output dicts (what the
+API server used to cache) with PostRecord objects, and the time to build
+them, for a growing number of posts.
+
+Usage:
+    python benchmark_records.py [max_posts]
+"""
+
+import gc
+import sys
+import time
+import tracemalloc
+
+from fake_instagram import make_post_node
+from graphql_nodes import node_caption, node_comments, node_date, node_likes, post_url
+from records import PostRecord
+
+
+def post_dict(node):
+    """The post dict the API server cached before records existed."""
+    caption = node_caption(node)
+    return {
+        'shortcode': node['shortcode'],
+        'url': post_url(node['shortcode']),
+        'likes': node_likes(node),
+        'comments': node_comments(node),
+        'caption': caption[:100] if caption else "",
+        'is_video': node['is_video'],
+        'date': node_date(node).isoformat()[:10]
+    }
+
+
+def measure(build, nodes):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    posts = [build(node) for node in nodes]
+    seconds = time.perf_counter() - started
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del posts
+    return size, seconds
+
+
+def main():
+    max_posts = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    print(f"{'posts':>9} {'dicts MB':>9} {'records MB':>11} {'saved':>6} {'dicts s':>8} {'records s':>10}")
+    count = 1000
+    while count <= max_posts:
+        # Fake post dates run out of range past ~100k posts, so the indexes repeat
+        nodes = [make_post_node('bench_records', 1, i % 50_000) for i in range(count)]
+        dict_size, dict_time = measure(post_dict, nodes)
+        record_size, record_time = measure(lambda node: PostRecord.from_node(node, caption_limit=100), nodes)
+        print(f"{count:>9} {dict_size / 2**20:>9.1f} {record_size / 2**20:>11.1f} "
+              f"{1 - record_size / dict_size:>6.0%} {dict_time:>8.2f} {record_time:>10.2f}")
+        count *= 10
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Serializer Benchmark
+
+Compares the JSON paths used before the serializer layer with every
+installed serializers.py backend, on two payloads:
+
+- api: a /instaData response (profile + posts), compact. The old path
+  formats each post date with isoformat() and encodes with Flask's jsonify
+  settings (sorted keys, ASCII escapes).
+- analytics: a get_post_analytics() result saved with 2-space indents, as
+  save_analytics_to_json() does. The old path is json.dump(indent=2).
+
+Every backend's output is checked to decode to the same data.
+
+Usage:
+    python benchmark_serializers.py [max_posts]
+"""
+
+import json
+import sys
+import time
+
+from engagement import analytics_summary
+from fake_instagram import make_post_node
+from records import ProfileRecord, PostRecord
+from serializers import available_serializers, get_serializer
+
+REPEAT = 5
+
+
+def make_records(post_count):
+    profile = ProfileRecord('bench_serializers', 'Bench Serializers ✨', 123456, 321, post_count)
+    # Fake post dates run out of range past ~100k posts, so the indexes repeat
+    posts = [PostRecord.from_node(make_post_node('bench_serializers', 1, i % 50_000), i + 1)
+             for i in range(post_count)]
+    return profile.with_posts(posts)
+
+
+def api_before(profile):
+    """The /instaData path before: isoformat() per post, then jsonify's json.dumps settings."""
+    data = profile.to_dict(details=False)
+    data['posts'] = [{**post.to_api_dict(), 'date': post.date.isoformat()[:10]} for post in profile.posts]
+    return json.dumps(data, separators=(',', ':'), sort_keys=True).encode('utf-8')
+
+
+def api_with(serializer):
+    return lambda profile: serializer.dumps(profile.to_api_dict())
+
+
+def analytics_data(profile):
+    posts = [post.to_analytics_dict() for post in profile.posts]
+    likes = sum(post['likes'] for post in posts)
+    comments = sum(post['comments'] for post in posts)
+    return {**profile.to_dict(), 'posts_analyzed': posts,
+            'summary': analytics_summary(likes, comments, len(posts), profile.followers)}
+
+
+def analytics_before(data):
+    return json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+
+
+def analytics_with(serializer):
+    return lambda data: serializer.dumps(data, pretty=True)
+
+
+def best_time(func, value):
+    best, output = None, None
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        output = func(value)
+        seconds = time.perf_counter() - started
+        best = seconds if best is None else min(best, seconds)
+    return best, output
+
+
+def compare(payload, value, paths):
+    timings = {}
+    decoded = None
+    for name, func in paths:
+        seconds, output = best_time(func, value)
+        timings[name] = seconds
+        if decoded is None:
+            decoded = json.loads(output)
+        elif json.loads(output) != decoded:
+            raise SystemExit(f"❌ {payload}: {name} output differs from the baseline")
+    return timings
+
+
+def main():
+    max_posts = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    backends = available_serializers()
+    print(f"Backends: {', '.join(backends)} (best of {REPEAT})\n")
+
+    names = ['before'] + backends
+    print(f"{'payload':>10} {'posts':>8} " + ' '.join(f"{name + ' ms':>11}" for name in names) + f" {'speedup':>8}")
+    count = 100
+    while count <= max_posts:
+        profile = make_records(count)
+        serializers = [get_serializer(name) for name in backends]
+        runs = [
+            ('api', profile, [('before', api_before)] + [(s.name, api_with(s)) for s in serializers]),
+            ('analytics', analytics_data(profile),
+             [('before', analytics_before)] + [(s.name, analytics_with(s)) for s in serializers]),
+        ]
+        for payload, value, paths in runs:
+            timings = compare(payload, value, paths)
+            fastest = min(timings[name] for name in backends)
+            print(f"{payload:>10} {count:>8} " + ' '.join(f"{timings[name] * 1000:>11.2f}" for name in names)
+                  + f" {timings['before'] / fastest:>7.1f}x")
+        count *= 10
+
+    print("\n✅ All backends produced the same data")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Multi-Account Throughput Benchmark
+
+Measures profile lookups per second through the SessionManager with 1, 2, 4
+and 8 accounts against the local fake Instagram backend, which rate-limits
+each session separately (like Instagram does per account). Then checks that
+an account hitting a checkpoint is quarantined and comes back after its
+cooldown.
+
+Usage:
+    python benchmark_sessions.py [per_session_rps] [seconds]
+"""
+
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import instaloader
+
+from fake_instagram import FakeInstagramServer, route_to_fake
+from rate_limiter import RateLimiter, rate_limited_loader
+from session_manager import SessionManager
+
+
+def fake_factory(server, limiter):
+    """Loader factory that 'logs in' by setting a per-account session cookie on the fake backend."""
+    def factory(username, password, force_login=False):
+        loader = rate_limited_loader(limiter, quiet=True)
+        loader.context.sleep = False
+        loader.context.username = username
+        loader.context._session.cookies.set('sessionid', username)
+        route_to_fake(loader.context, server)
+        return loader
+    return factory
+
+
+def lookup(manager, name):
+    with manager.lease() as lease:
+        instaloader.Profile.from_username(lease.loader.context, name)
+
+
+def measure(server, accounts, rps, seconds):
+    limiter = RateLimiter(rate=rps, burst=1, max_rate=rps)
+    manager = SessionManager([(f"account{i}", '') for i in range(accounts)],
+                             factory=fake_factory(server, limiter), hourly_budget=10 ** 6).fill()
+    lookups = int(rps * seconds * accounts)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=accounts) as executor:
+        list(executor.map(lambda i: lookup(manager, f"user{i}"), range(lookups)))
+    return lookups / (time.perf_counter() - started)
+
+
+def check_quarantine(server, rps):
+    limiter = RateLimiter(rate=rps, burst=1, max_rate=rps)
+    manager = SessionManager([('healthy', ''), ('flagged', '')], factory=fake_factory(server, limiter),
+                             cooldown=1).fill()
+    server.require_checkpoint('flagged')
+
+    failures = 0
+    for i in range(20):
+        try:
+            lookup(manager, f"user{i}")
+        except instaloader.exceptions.InstaloaderException:
+            failures += 1
+    quarantined = manager.stats()['accounts']['flagged']['quarantines']
+
+    server.clear_checkpoint('flagged')
+    time.sleep(1.1)
+    for i in range(20):
+        lookup(manager, f"user{i}")
+    back = manager.stats()['accounts']['flagged']['leases']
+    return failures, quarantined, back
+
+
+def main():
+    rps = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    server = FakeInstagramServer(rate_limit=rps * 1.2).start()
+    try:
+        print(f"Fake backend allows {rps * 1.2:g} requests/s per account\n")
+        print(f"{'accounts':>8} {'lookups/s':>10} {'scaling':>8}")
+        baseline = None
+        for accounts in (1, 2, 4, 8):
+            throughput = measure(server, accounts, rps, seconds)
+            baseline = baseline or throughput
+            print(f"{accounts:>8} {throughput:>10.1f} {throughput / baseline:>7.2f}x")
+
+        failures, quarantined, leases = check_quarantine(server, rps)
+        print(f"\nCheckpointed account: {failures} failed lookup(s), quarantined {quarantined} time(s), "
+              f"{leases} lease(s) in total after its cooldown")
+        print(f"Upstream 429s: {server.throttled}")
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
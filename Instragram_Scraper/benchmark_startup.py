@@ -0,0 +1,62 @@
+"""
+Startup Benchmark
+
+Measures the cold start of the CLI entry points, each as the median of
+several fresh processes:
+
+- first output: time from launching `python <script>` until it prints
+  its first line
+- import: time to `import` the script's module, minus the bare
+  interpreter start (measured the same way)
+
+Usage:
+    python benchmark_startup.py [runs]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+SCRIPTS = ('simple_scraper.py', 'instagram_scraper.py', 'posts_analytics.py', 'advanced_scraper.py')
+
+# Unbuffered, so the first line arrives as soon as it is printed
+ENV = dict(os.environ, PYTHONUNBUFFERED='1')
+
+
+def time_to_first_output(script):
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, script], cwd=HERE, env=ENV, stdin=subprocess.PIPE,
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    process.stdout.readline()
+    seconds = time.perf_counter() - started
+    process.kill()
+    process.wait()
+    return seconds
+
+
+def time_to_run(code):
+    started = time.perf_counter()
+    subprocess.run([sys.executable, '-c', code], cwd=HERE, env=ENV, check=True)
+    return time.perf_counter() - started
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 15
+
+    interpreter = statistics.median(time_to_run('pass') for _ in range(runs))
+    print(f"Interpreter start: {interpreter * 1000:.1f} ms (median of {runs} runs)\n")
+
+    print(f"{'script':<24} {'first output ms':>16} {'import ms':>10}")
+    for script in SCRIPTS:
+        first_output = statistics.median(time_to_first_output(script) for _ in range(runs))
+        module = script[:-3]
+        imported = statistics.median(time_to_run(f"import {module}") for _ in range(runs)) - interpreter
+        print(f"{script:<24} {first_output * 1000:>16.1f} {imported * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
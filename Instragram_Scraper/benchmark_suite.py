@@ -0,0 +1,369 @@
+"""
+Benchmark Suite
+
+Offline benchmarks of the scrape paths against the local fake Instagram
+backend, which generates profiles or replays recorded ones (see
+fake_instagram.record_profile). Every scenario runs in its own process, so
+caches start cold and the API server modules (repository root) and the CLI
+scrapers (this directory) - which both define an instagram_scraper module -
+never share an interpreter.
+
+Scenarios:
+    single      scrape_full_profile lookups, one after another
+    batch       scrape_profiles over many usernames at once
+    deep        get_post_analytics over hundreds of posts (deep pagination)
+    engagement  calculate_engagement_stats on long post lists (no network)
+    flask       GET /instaData on a threaded server under concurrent load
+    throttled   single lookups with 429 responses injected
+
+Each scenario reports p50/p95/p99 latency, lookups/s and upstream requests/s.
+Save a run with --save and pass it to a later run with --compare: scenarios
+whose p95 or throughput got worse by more than --tolerance are flagged and
+the exit code is 1.
+
+Usage:
+    python benchmark_suite.py [--scenarios=single,flask] [--lookups=50] [--latency=0.01]
+                              [--throttle=0.05] [--page-size=12] [--concurrency=16]
+                              [--recordings=DIR] [--save=FILE] [--compare=FILE] [--tolerance=0.2]
+    python benchmark_suite.py record <username> [...] [--recordings=DIR] [--posts=12]
+"""
+
+import contextlib
+import io
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import rate_limiter
+from fake_instagram import FakeInstagramServer, route_to_fake, record_profile
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = ('single', 'batch', 'deep', 'engagement', 'flask', 'throttled')
+
+DEFAULTS = {
+    'scenarios': ','.join(SCENARIOS),
+    'lookups': 50,
+    'latency': 0.01,
+    'throttle': 0.05,
+    'page-size': 12,
+    'concurrency': 16,
+    'posts': 12,
+    'deep-posts': 500,
+    'recordings': None,
+    'save': None,
+    'compare': None,
+    'tolerance': 0.2,
+}
+
+POOL_SIZE = 8
+
+
+def parse_options(argv):
+    """Read --name=value options (see DEFAULTS) and return (options, positional args)."""
+    options = dict(DEFAULTS)
+    args = []
+    for arg in argv:
+        if not arg.startswith('--'):
+            args.append(arg)
+            continue
+        name, _, value = arg[2:].partition('=')
+        default = DEFAULTS.get(name)
+        options[name] = type(default)(value) if isinstance(default, (int, float)) else value
+    return options, args
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def _report(name, latencies, seconds, errors=0, server=None):
+    latencies = sorted(latencies)
+    upstream = server.requests if server is not None else 0
+    return {
+        'scenario': name,
+        'lookups': len(latencies),
+        'errors': errors,
+        'seconds': round(seconds, 3),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'lookups_per_second': round(len(latencies) / seconds, 1) if seconds else 0,
+        'upstream_requests': upstream,
+        'upstream_requests_per_second': round(upstream / seconds, 1) if seconds else 0,
+        'throttled': server.throttled if server is not None else 0,
+    }
+
+
+def _timed(func, latencies):
+    def call(*args):
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            latencies.append(time.perf_counter() - started)
+    return call
+
+
+def _start_server(options, **overrides):
+    settings = {
+        'latency': options['latency'],
+        'page_size': options['page-size'],
+        'timeline_page_size': options['page-size'],
+        'posts_per_profile': max(options['posts'], options['page-size']),
+        'recordings': options['recordings'],
+        **overrides,
+    }
+    return FakeInstagramServer(**settings).start()
+
+
+def _fast_limiter():
+    # Measure the scrapers, not the pacing; an injected 429 only costs a short pause
+    rate_limiter._default_limiter = rate_limiter.RateLimiter(
+        rate=10 ** 6, burst=10 ** 6, max_rate=10 ** 6, base_backoff=0.05, max_backoff=0.5
+    )
+
+
+def _root_scraper(server):
+    """Import the API server's scraper module with a loader pool routed to the fake backend."""
+    sys.path.insert(0, ROOT_DIR)
+    import instagram_scraper as root
+    from loader_pool import LoaderPool
+
+    def factory(force_login=False):
+        loader = rate_limiter.rate_limited_loader(quiet=True)
+        loader.context.sleep = False
+        route_to_fake(loader.context, server)
+        return loader
+
+    root._loader_pool = LoaderPool(factory, size=POOL_SIZE).fill()
+    return root
+
+
+def _lookup_errors(results):
+    return sum(1 for data in results if data is None or 'error' in data)
+
+
+def run_single(options, throttle=0.0):
+    server = _start_server(options, throttle_probability=throttle)
+    root = _root_scraper(server)
+    latencies = []
+    lookup = _timed(root.scrape_full_profile, latencies)
+
+    started = time.perf_counter()
+    results = [lookup(f"bench_single_{i}", options['posts']) for i in range(options['lookups'])]
+    seconds = time.perf_counter() - started
+    server.stop()
+    return _report('throttled' if throttle else 'single', latencies, seconds, _lookup_errors(results), server)
+
+
+def run_batch(options):
+    server = _start_server(options)
+    root = _root_scraper(server)
+    latencies = []
+    root.scrape_full_profile = _timed(root.scrape_full_profile, latencies)
+
+    started = time.perf_counter()
+    results = [data for _, data in root.scrape_profiles(
+        [f"bench_batch_{i}" for i in range(options['lookups'])], options['posts'], max_workers=POOL_SIZE)]
+    seconds = time.perf_counter() - started
+    server.stop()
+    return _report('batch', latencies, seconds, _lookup_errors(results), server)
+
+
+def run_deep(options):
+    from advanced_scraper import AdvancedInstagramScraper
+
+    deep_posts = options['deep-posts']
+    server = _start_server(options, posts_per_profile=deep_posts)
+    scraper = AdvancedInstagramScraper()
+    scraper.loader.context.sleep = False
+    scraper.loader.context.quiet = True
+    route_to_fake(scraper.loader.context, server)
+    latencies = []
+    lookup = _timed(scraper.get_post_analytics, latencies)
+
+    started = time.perf_counter()
+    results = [lookup(f"bench_deep_{i}", deep_posts) for i in range(max(1, options['lookups'] // 10))]
+    seconds = time.perf_counter() - started
+    server.stop()
+    return _report('deep', latencies, seconds, _lookup_errors(results), server)
+
+
+def run_engagement(options):
+    from fake_instagram import make_post_node
+    from posts_analytics import calculate_engagement_stats
+
+    posts = [
+        {'likes': node['edge_media_preview_like']['count'], 'comments': node['edge_media_to_comment']['count']}
+        for node in (make_post_node('bench_engagement', 1, i) for i in range(options['deep-posts']))
+    ]
+    latencies = []
+    stats = _timed(calculate_engagement_stats, latencies)
+
+    started = time.perf_counter()
+    for _ in range(options['lookups'] * 20):
+        stats(posts, 1_000_000)
+    return _report('engagement', latencies, time.perf_counter() - started)
+
+
+def run_flask(options):
+    import requests
+    from werkzeug.serving import make_server
+
+    server = _start_server(options)
+    _root_scraper(server)
+    os.environ.setdefault('JOBS_DB', os.path.join(tempfile.mkdtemp(), 'jobs.db'))
+    import app
+
+    httpd = make_server('127.0.0.1', 0, app.app, threaded=True)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{httpd.server_port}/instaData"
+    local = threading.local()
+
+    def get(i):
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        response = local.session.get(url, params={'username': f"bench_flask_{i}",
+                                                  'number_of_posts': options['posts']})
+        return response.json() if response.status_code == 200 else None
+
+    latencies = []
+    request_profile = _timed(get, latencies)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+        results = list(executor.map(request_profile, range(options['lookups'] * 2)))
+    seconds = time.perf_counter() - started
+
+    httpd.shutdown()
+    server.stop()
+    return _report('flask', latencies, seconds, _lookup_errors(results), server)
+
+
+def run_scenario(name, options):
+    """Run one scenario in this process and return its report."""
+    _fast_limiter()
+    runners = {
+        'single': run_single,
+        'batch': run_batch,
+        'deep': run_deep,
+        'engagement': run_engagement,
+        'flask': run_flask,
+        'throttled': lambda opts: run_single(opts, throttle=opts['throttle']),
+    }
+    # The scrapers print progress; keep the report on stdout clean
+    with contextlib.redirect_stdout(io.StringIO()):
+        return runners[name](options)
+
+
+def run_in_subprocess(name, argv):
+    """Run a scenario in a fresh interpreter and return its report."""
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), f"--run={name}", *argv],
+        capture_output=True, text=True, cwd=tempfile.mkdtemp()
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Scenario {name} failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def compare(reports, baseline, tolerance):
+    """
+    Compare reports with a saved run.
+
+    Returns:
+        list: Names of the scenarios that regressed beyond the tolerance
+    """
+    previous = {report['scenario']: report for report in baseline}
+    regressions = []
+    print(f"\n{'scenario':<11} {'p95 before':>11} {'p95 now':>9} {'lookups/s before':>17} {'now':>8}")
+    for report in reports:
+        before = previous.get(report['scenario'])
+        if before is None:
+            continue
+        slower = report['p95_ms'] > before['p95_ms'] * (1 + tolerance)
+        fewer = report['lookups_per_second'] < before['lookups_per_second'] / (1 + tolerance)
+        flag = '  ⚠️  regression' if slower or fewer else ''
+        if flag:
+            regressions.append(report['scenario'])
+        print(f"{report['scenario']:<11} {before['p95_ms']:>9.1f}ms {report['p95_ms']:>7.1f}ms "
+              f"{before['lookups_per_second']:>17.1f} {report['lookups_per_second']:>8.1f}{flag}")
+    return regressions
+
+
+def record(usernames, options):
+    """Record live profiles for replay (uses INSTAGRAM_USERNAME/PASSWORD if set)."""
+    from instagram_scraper import InstagramFollowerScraper
+
+    directory = options['recordings'] or 'recordings'
+    scraper = InstagramFollowerScraper()
+    scraper.login()
+    for username in usernames:
+        path = record_profile(scraper.loader.context, username.lstrip('@'), directory, options['posts'])
+        print(f"💾 Recorded @{username} to {path}")
+
+
+def main():
+    argv = sys.argv[1:]
+    options, args = parse_options(argv)
+
+    if 'run' in options:
+        print(json.dumps(run_scenario(options['run'], options)))
+        return
+
+    if args and args[0] == 'record':
+        if len(args) < 2:
+            print("Usage: python benchmark_suite.py record <username> [...] [--recordings=DIR] [--posts=12]")
+            sys.exit(1)
+        record(args[1:], options)
+        return
+
+    names = [name for name in options['scenarios'].split(',') if name]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        print(f"Unknown scenario(s): {', '.join(unknown)} (available: {', '.join(SCENARIOS)})")
+        sys.exit(1)
+    if options['recordings']:
+        argv = [arg for arg in argv if not arg.startswith('--recordings=')]
+        argv.append(f"--recordings={os.path.abspath(options['recordings'])}")
+
+    source = f"recordings in {options['recordings']}" if options['recordings'] else "generated profiles"
+    print(f"Benchmark: {options['lookups']} lookups per scenario, {options['latency'] * 1000:.0f} ms upstream "
+          f"latency, {options['page-size']} posts per page, {source}")
+    print(f"\n{'scenario':<11} {'lookups':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'lookups/s':>10} {'upstream/s':>11} {'429s':>5} {'errors':>6}")
+
+    reports = []
+    for name in names:
+        report = run_in_subprocess(name, argv)
+        reports.append(report)
+        print(f"{name:<11} {report['lookups']:>7} {report['p50_ms']:>8.2f} {report['p95_ms']:>8.2f} "
+              f"{report['p99_ms']:>8.2f} {report['lookups_per_second']:>10.1f} "
+              f"{report['upstream_requests_per_second']:>11.1f} {report['throttled']:>5} {report['errors']:>6}")
+
+    if options['save']:
+        with open(options['save'], 'w', encoding='utf-8') as f:
+            json.dump(reports, f, indent=2)
+        print(f"\n💾 Results saved to {options['save']}")
+
+    if options['compare']:
+        with open(options['compare'], encoding='utf-8') as f:
+            regressions = compare(reports, json.load(f), options['tolerance'])
+        if regressions:
+            print(f"\n❌ Regressions: {', '.join(regressions)}")
+            sys.exit(1)
+        print("\n✅ No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Configuration
+
+Reads the .env file once per process and keeps the settings the CLI scrapers
+need. Scrapers constructed later reuse the parsed values instead of calling
+load_dotenv() again.
+"""
+
+import os
+import threading
+
+
+class Config:
+    __slots__ = ('instagram_username', 'instagram_password', 'target_account')
+
+    def __init__(self, instagram_username=None, instagram_password=None, target_account=None):
+        self.instagram_username = instagram_username
+        self.instagram_password = instagram_password
+        self.target_account = target_account
+
+    @classmethod
+    def from_env(cls):
+        """Read the settings from the environment (after loading .env)."""
+        return cls(
+            instagram_username=os.getenv('INSTAGRAM_USERNAME'),
+            instagram_password=os.getenv('INSTAGRAM_PASSWORD'),
+            target_account=os.getenv('TARGET_ACCOUNT'),
+        )
+
+
+_config = None
+_config_lock = threading.Lock()
+
+
+def get_config():
+    """
+    Return the process-wide configuration. The first call loads .env into
+    the environment (existing variables win, as with load_dotenv()).
+    """
+    global _config
+    with _config_lock:
+        if _config is None:
+            from dotenv import load_dotenv
+            load_dotenv()
+            _config = Config.from_env()
+    return _config
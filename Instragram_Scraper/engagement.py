@@ -0,0 +1,255 @@
+"""
+Engagement Helpers
+
+Engagement math shared by the sync and async scrapers.
+
+EngagementAggregator keeps the summary of a profile's posts up to date one
+post at a time, as pages arrive. It holds running sums, the mean and
+variance of per-post engagement (Welford's method) and a quantile sketch.
+It never holds the posts themselves, its summary can be read at any point
+of a stream, and aggregators built on separate shards or workers merge into
+the same result as one aggregator fed every post.
+"""
+
+import math
+
+
+def analytics_summary(total_likes, total_comments, post_count, followers):
+    """
+    Build the analytics_summary block reported by get_post_analytics.
+
+    Args:
+        total_likes (int): Sum of likes over the analyzed posts
+        total_comments (int): Sum of comments over the analyzed posts
+        post_count (int): Number of analyzed posts
+        followers (int): Follower count of the profile
+
+    Returns:
+        dict: Totals, averages and engagement rate ({} if no posts were analyzed)
+    """
+    if not post_count:
+        return {}
+
+    avg_likes = total_likes / post_count
+    avg_comments = total_comments / post_count
+    engagement_rate = ((total_likes + total_comments) / post_count) / followers * 100 if followers > 0 else 0
+
+    return {
+        'total_likes': total_likes,
+        'total_comments': total_comments,
+        'average_likes_per_post': round(avg_likes, 2),
+        'average_comments_per_post': round(avg_comments, 2),
+        'engagement_rate_percentage': round(engagement_rate, 2),
+        'posts_analyzed_count': post_count
+    }
+
+
+def engagement_stats(total_likes, total_comments, post_count, followers):
+    """
+    Build the engagement_stats block reported by posts_analytics.py.
+
+    Args:
+        total_likes (int): Sum of likes over the analyzed posts
+        total_comments (int): Sum of comments over the analyzed posts
+        post_count (int): Number of analyzed posts
+        followers (int): Follower count of the profile
+
+    Returns:
+        dict: Totals, averages and engagement rate ({} if no posts were analyzed)
+    """
+    if not post_count:
+        return {}
+
+    avg_likes = total_likes / post_count
+    avg_comments = total_comments / post_count
+
+    # Calculate engagement rate (likes + comments) / followers
+    engagement_rate = 0
+    if followers > 0:
+        engagement_rate = ((total_likes + total_comments) / post_count) / followers * 100
+
+    return {
+        'total_likes': total_likes,
+        'total_comments': total_comments,
+        'average_likes': round(avg_likes, 1),
+        'average_comments': round(avg_comments, 1),
+        'engagement_rate': round(engagement_rate, 2)
+    }
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch for non-negative values (DDSketch). Values are
+    counted in logarithmic buckets, so every quantile is within
+    relative_accuracy of the exact one. Memory depends on the value range,
+    not the number of values. Engagement counts from 1 to 10^9 need at most
+    about 1,000 buckets.
+    """
+
+    __slots__ = ('relative_accuracy', '_log_gamma', '_buckets', 'zero_count', 'count')
+
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self._log_gamma = math.log((1 + relative_accuracy) / (1 - relative_accuracy))
+        self._buckets = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value, count=1):
+        """Count a value (values below 1 are counted as 0)."""
+        if value < 1:
+            self.zero_count += count
+        else:
+            index = math.ceil(math.log(value) / self._log_gamma)
+            self._buckets[index] = self._buckets.get(index, 0) + count
+        self.count += count
+
+    def merge(self, other):
+        """Add another sketch's values (both must have the same relative_accuracy)."""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative_accuracy")
+        for index, count in other._buckets.items():
+            self._buckets[index] = self._buckets.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def quantile(self, q):
+        """
+        Estimate a quantile.
+
+        Args:
+            q (float): Between 0 and 1 (0.5 = median)
+
+        Returns:
+            float or None: Estimate, or None if nothing was added
+        """
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self._buckets):
+            seen += self._buckets[index]
+            if rank < seen:
+                break
+        # Value in bucket (gamma^(i-1), gamma^i] with the same relative error to both ends
+        return 2 * math.exp(index * self._log_gamma) / (1 + math.exp(self._log_gamma))
+
+    def to_state(self):
+        """JSON-friendly state, for sending the sketch to another process."""
+        return {'relative_accuracy': self.relative_accuracy, 'zero_count': self.zero_count,
+                'buckets': {str(index): count for index, count in self._buckets.items()}}
+
+    @classmethod
+    def from_state(cls, state):
+        sketch = cls(state['relative_accuracy'])
+        sketch._buckets = {int(index): count for index, count in state['buckets'].items()}
+        sketch.zero_count = state['zero_count']
+        sketch.count = sketch.zero_count + sum(sketch._buckets.values())
+        return sketch
+
+
+# Engagement quantiles reported by EngagementAggregator.distribution()
+DISTRIBUTION_QUANTILES = (0.25, 0.5, 0.75, 0.9)
+
+
+class EngagementAggregator:
+    """
+    Running engagement summary of a stream of posts.
+
+    Feed it with add() as posts arrive, read summary(), stats() or
+    distribution() at any time, and combine aggregators of different shards
+    with merge().
+    """
+
+    __slots__ = ('count', 'total_likes', 'total_comments', 'video_posts', '_mean', '_m2', 'sketch')
+
+    def __init__(self, relative_accuracy=0.01):
+        self.count = 0
+        self.total_likes = 0
+        self.total_comments = 0
+        self.video_posts = 0
+        # Welford's running mean and sum of squared deviations of per-post engagement
+        self._mean = 0.0
+        self._m2 = 0.0
+        self.sketch = QuantileSketch(relative_accuracy)
+
+    def add(self, likes, comments, is_video=False):
+        """Add one post."""
+        self.count += 1
+        self.total_likes += likes
+        self.total_comments += comments
+        if is_video:
+            self.video_posts += 1
+        engagement = likes + comments
+        delta = engagement - self._mean
+        self._mean += delta / self.count
+        self._m2 += delta * (engagement - self._mean)
+        self.sketch.add(engagement)
+
+    def add_post(self, post):
+        """Add a post dict with 'likes', 'comments' and optionally 'is_video'."""
+        self.add(post['likes'], post['comments'], post.get('is_video', False))
+
+    def merge(self, other):
+        """Add the posts of another aggregator (e.g. another shard of the same profile)."""
+        if not other.count:
+            return
+        count = self.count + other.count
+        delta = other._mean - self._mean
+        self._m2 += other._m2 + delta * delta * self.count * other.count / count
+        self._mean += delta * other.count / count
+        self.count = count
+        self.total_likes += other.total_likes
+        self.total_comments += other.total_comments
+        self.video_posts += other.video_posts
+        self.sketch.merge(other.sketch)
+
+    @property
+    def variance(self):
+        """Population variance of per-post engagement (0.0 with fewer than two posts)."""
+        return self._m2 / self.count if self.count > 1 else 0.0
+
+    def summary(self, followers):
+        """The analytics_summary block of the posts added so far."""
+        return analytics_summary(self.total_likes, self.total_comments, self.count, followers)
+
+    def stats(self, followers):
+        """The engagement_stats block (posts_analytics.py) of the posts added so far."""
+        return engagement_stats(self.total_likes, self.total_comments, self.count, followers)
+
+    def distribution(self):
+        """
+        Spread of per-post engagement (likes + comments).
+
+        Returns:
+            dict: Mean, standard deviation and quantiles p25/p50/p75/p90
+            (estimated within the sketch's relative accuracy), plus the video
+            post count; {} if no posts were added
+        """
+        if not self.count:
+            return {}
+        return {
+            'mean_engagement': round(self._mean, 1),
+            'stddev_engagement': round(math.sqrt(self.variance), 1),
+            **{f"p{round(q * 100)}_engagement": round(self.sketch.quantile(q), 1) for q in DISTRIBUTION_QUANTILES},
+            'video_posts': self.video_posts,
+        }
+
+    def to_state(self):
+        """JSON-friendly state, for merging aggregators built in other processes."""
+        return {'count': self.count, 'total_likes': self.total_likes, 'total_comments': self.total_comments,
+                'video_posts': self.video_posts, 'mean': self._mean, 'm2': self._m2, 'sketch': self.sketch.to_state()}
+
+    @classmethod
+    def from_state(cls, state):
+        aggregator = cls(state['sketch']['relative_accuracy'])
+        aggregator.count = state['count']
+        aggregator.total_likes = state['total_likes']
+        aggregator.total_comments = state['total_comments']
+        aggregator.video_posts = state['video_posts']
+        aggregator._mean = state['mean']
+        aggregator._m2 = state['m2']
+        aggregator.sketch = QuantileSketch.from_state(state['sketch'])
+        return aggregator
@@ -35,12 +35,12 @@ def example_multiple_accounts():
 
     accounts = ["instagram", "nasa", "natgeo"]
 
-    for account in accounts:
-        print(f"\nProcessing @{account}...")
-        follower_data = scraper.get_follower_count(account)
-
-        if follower_data:
-            print(f"@{account}: {follower_data['followers']:,} followers")
+    # Accounts are fetched concurrently; results arrive as each one finishes
+    for result in scraper.get_follower_counts(accounts, max_workers=4):
+        if result['data']:
+            print(f"@{result['username']}: {result['data']['followers']:,} followers")
+        else:
+            print(f"@{result['username']}: {result['error']}")
 
 if __name__ == "__main__":
     # Run the basic example
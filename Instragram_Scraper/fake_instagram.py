@@ -0,0 +1,345 @@
+"""
+Fake Instagram Backend
+
+A local HTTP server that answers the profile-info and timeline GraphQL
+endpoints used by instaloader with generated data, or replays profiles
+recorded from live Instagram with record_profile(). It can add latency and
+inject 429 and checkpoint responses, so the rate limiter and the scrapers
+can be exercised without touching live Instagram.
+
+Example:
+    server = FakeInstagramServer(rate_limit=5).start()
+    scraper = InstagramFollowerScraper()
+    route_to_fake(scraper.loader.context, server)
+    scraper.get_follower_count('nasa')
+    server.stop()
+"""
+
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import islice
+from urllib.parse import parse_qs, urlsplit
+
+import instaloader
+from requests.adapters import HTTPAdapter
+
+from transport import mount_adapter
+
+TIMELINE_QUERY_HASH = '003056d32c2554def87228bc3fd9668a'
+
+
+def _seed(username):
+    return int(hashlib.md5(username.encode()).hexdigest()[:8], 16)
+
+
+def make_post_node(username, user_id, index):
+    """Generate the GraphQL node of a user's index-th most recent post."""
+    rng = random.Random(_seed(username) + index)
+    shortcode = hashlib.md5(f"{username}/{index}".encode()).hexdigest()[:11]
+    return {
+        '__typename': 'GraphVideo' if index % 4 == 0 else 'GraphImage',
+        'id': str(user_id * 10000 + index),
+        'shortcode': shortcode,
+        'taken_at_timestamp': 1700000000 - index * 86400,
+        'is_video': index % 4 == 0,
+        'edge_media_preview_like': {'count': rng.randint(100, 50000)},
+        'edge_media_to_comment': {'count': rng.randint(0, 2000)},
+        'edge_media_to_caption': {'edges': [{'node': {'text': f"Post {index} by @{username} #fake #post{index % 7}"}}]},
+        'location': None,
+        'owner': {'id': str(user_id), 'username': username},
+    }
+
+
+def make_timeline_page(username, user_id, post_count, first, after=None):
+    """Generate one page of edge_owner_to_timeline_media."""
+    start = int(after) if after else 0
+    end = min(start + first, post_count)
+    return {
+        'count': post_count,
+        'page_info': {'has_next_page': end < post_count, 'end_cursor': str(end) if end < post_count else None},
+        'edges': [{'node': make_post_node(username, user_id, i)} for i in range(start, end)],
+    }
+
+
+def make_profile_node(username, post_count, page_size):
+    """Generate the web_profile_info user node, including the first timeline page."""
+    rng = random.Random(_seed(username))
+    user_id = _seed(username) % 10**9
+    return {
+        'id': str(user_id),
+        'username': username,
+        'full_name': username.title(),
+        'biography': f"Fake profile for {username}",
+        'external_url': None,
+        'is_private': False,
+        'is_verified': rng.random() < 0.3,
+        'followed_by_viewer': False,
+        'edge_followed_by': {'count': rng.randint(1000, 10**7)},
+        'edge_follow': {'count': rng.randint(10, 5000)},
+        'edge_owner_to_timeline_media': make_timeline_page(username, user_id, post_count, page_size),
+    }
+
+
+def record_profile(context, username, directory, max_posts=50):
+    """
+    Save a live profile and its most recent post nodes for replay by the fake server.
+
+    Args:
+        context: instaloader.InstaloaderContext to fetch with
+        username (str): Profile to record
+        directory (str): Recordings directory; the profile is saved as <username>.json
+        max_posts (int): Number of timeline post nodes to keep
+
+    Returns:
+        str: Path of the recording
+    """
+    profile = instaloader.Profile.from_username(context, username)
+    user = {key: value for key, value in profile._node.items() if key != 'edge_owner_to_timeline_media'}
+    posts = [post._node for post in islice(profile.get_posts(), max_posts)]
+
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{profile.username.lower()}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'user': user, 'posts': posts}, f)
+    return path
+
+
+def load_recordings(directory):
+    """
+    Load every recording in a directory.
+
+    Returns:
+        dict: username -> {'user': profile node, 'posts': [post nodes]}
+    """
+    recordings = {}
+    for name in sorted(os.listdir(directory)):
+        if name.endswith('.json'):
+            with open(os.path.join(directory, name), encoding='utf-8') as f:
+                recordings[name[:-len('.json')]] = json.load(f)
+    return recordings
+
+
+def _page_of(nodes, first, after):
+    start = int(after) if after else 0
+    end = min(start + first, len(nodes))
+    return {
+        'count': len(nodes),
+        'page_info': {'has_next_page': end < len(nodes), 'end_cursor': str(end) if end < len(nodes) else None},
+        'edges': [{'node': node} for node in nodes[start:end]],
+    }
+
+
+class _Server(ThreadingHTTPServer):
+    # Benchmarks open hundreds of connections at once
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+class FakeInstagramServer:
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, rate_limit=None,
+                 throttle_probability=0.0, posts_per_profile=60, page_size=12, timeline_page_size=None,
+                 recordings=None):
+        """
+        Configure the fake backend.
+
+        Args:
+            host (str): Interface to bind
+            port (int): Port to bind (0 = pick a free one)
+            latency (float): Seconds added to every response
+            rate_limit (float): Requests/second allowed per session before answering 429 (None = unlimited)
+            throttle_probability (float): Chance of answering any request with 429
+            posts_per_profile (int): Number of posts every generated profile has
+            page_size (int): Posts per timeline page in the profile-info response
+            timeline_page_size (int): Posts per page of follow-up timeline queries
+                (None = as many as the client asks for)
+            recordings (str or dict): Recordings directory or load_recordings() result;
+                profiles are then replayed from it instead of generated (usernames
+                without a recording get one of the recorded profiles, renamed)
+        """
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.throttle_probability = throttle_probability
+        self.posts_per_profile = posts_per_profile
+        self.page_size = page_size
+        self.timeline_page_size = timeline_page_size
+        self.recordings = load_recordings(recordings) if isinstance(recordings, str) else recordings
+        self._recorded_posts = {}
+
+        self.requests = 0
+        self.throttled = 0
+        self.checkpoint_sessions = set()
+        self._windows = {}
+        self._usernames = {}
+        self._lock = threading.Lock()
+
+        self._httpd = _Server((host, port), self._make_handler())
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def require_checkpoint(self, session):
+        """Answer every request of a session with checkpoint_required until clear_checkpoint()."""
+        self.checkpoint_sessions.add(session)
+
+    def clear_checkpoint(self, session):
+        self.checkpoint_sessions.discard(session)
+
+    def _should_throttle(self, session):
+        with self._lock:
+            self.requests += 1
+            throttle = random.random() < self.throttle_probability
+            if self.rate_limit and not throttle:
+                # Sliding one-second window per session
+                now = time.monotonic()
+                window = [t for t in self._windows.get(session, []) if t > now - 1.0]
+                throttle = len(window) >= self.rate_limit
+                if not throttle:
+                    window.append(now)
+                self._windows[session] = window
+            if throttle:
+                self.throttled += 1
+            return throttle
+
+    def handle(self, path, query, session):
+        """
+        Answer one request.
+
+        Returns:
+            tuple: (status code, JSON body)
+        """
+        if self.latency:
+            time.sleep(self.latency)
+        if session in self.checkpoint_sessions:
+            return 400, {'message': 'checkpoint_required', 'checkpoint_url': '/challenge/', 'status': 'fail'}
+        if self._should_throttle(session):
+            return 429, {'message': 'Please wait a few minutes before you try again.', 'status': 'fail'}
+
+        if path.endswith('/web_profile_info/'):
+            username = query.get('username', [''])[0].lower()
+            if not username or username.startswith('missing'):
+                return 200, {'data': {'user': None}, 'status': 'ok'}
+            if self.recordings:
+                user = self._replay_profile(username)
+            else:
+                user = make_profile_node(username, self.posts_per_profile, self.page_size)
+            self._usernames[int(user['id'])] = username
+            return 200, {'data': {'user': user}, 'status': 'ok'}
+
+        if path.endswith('/graphql/query/') or path.endswith('/graphql/query'):
+            if query.get('query_hash', [''])[0] == TIMELINE_QUERY_HASH:
+                variables = json.loads(query['variables'][0])
+                user_id = int(variables['id'])
+                username = self._usernames.get(user_id, f"user{user_id}")
+                first = self.timeline_page_size or variables.get('first', 12)
+                if user_id in self._recorded_posts:
+                    page = _page_of(self._recorded_posts[user_id], first, variables.get('after'))
+                else:
+                    page = make_timeline_page(username, user_id, self.posts_per_profile, first, variables.get('after'))
+                return 200, {'data': {'user': {'edge_owner_to_timeline_media': page}}, 'status': 'ok'}
+
+        if path.endswith('/topsearch/'):
+            return 200, {'users': [], 'places': [], 'hashtags': [], 'status': 'ok'}
+
+        return 404, {'message': 'not found', 'status': 'fail'}
+
+    def _replay_profile(self, username):
+        """Profile node of a recording, renamed to the requested username."""
+        recording = self.recordings.get(username)
+        if recording is None:
+            names = sorted(self.recordings)
+            recording = self.recordings[names[_seed(username) % len(names)]]
+
+        user_id = _seed(username) % 10**9
+        owner = {'id': str(user_id), 'username': username}
+        posts = [{**node, 'owner': owner} for node in recording['posts']]
+        with self._lock:
+            self._recorded_posts[user_id] = posts
+        return {
+            **recording['user'],
+            'id': str(user_id),
+            'username': username,
+            'edge_owner_to_timeline_media': _page_of(posts, self.page_size, None),
+        }
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlsplit(self.path)
+                session = 'anonymous'
+                for cookie in self.headers.get('Cookie', '').split(';'):
+                    name, _, value = cookie.strip().partition('=')
+                    if name == 'sessionid' and value:
+                        session = value
+                status, body = server.handle(url.path, parse_qs(url.query), session)
+                payload = json.dumps(body).encode()
+                # Validators, so conditional requests (If-None-Match) can be answered with 304
+                etag = f'"{hashlib.sha1(payload).hexdigest()[:16]}"'
+                if status == 200 and self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                if status == 200:
+                    self.send_header('ETag', etag)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+class FakeInstagramAdapter(HTTPAdapter):
+    """Transport adapter that sends Instagram requests to a local fake server instead."""
+
+    def __init__(self, base_url):
+        super().__init__()
+        self.base_url = base_url.rstrip('/')
+
+    def send(self, request, **kwargs):
+        url = urlsplit(request.url)
+        request.url = f"{self.base_url}{url.path}" + (f"?{url.query}" if url.query else "")
+        return super().send(request, **kwargs)
+
+
+def route_to_fake(context, server):
+    """
+    Send every JSON request of an instaloader context to the fake server.
+
+    Args:
+        context: instaloader.InstaloaderContext (e.g. loader.context)
+        server (FakeInstagramServer or str): Running server or its base URL
+    """
+    base_url = server if isinstance(server, str) else server.base_url
+    mount_adapter(context, 'https://', FakeInstagramAdapter(base_url))
+
+
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    fake = FakeInstagramServer(port=port)
+    print(f"Fake Instagram backend listening on {fake.base_url}")
+    fake._httpd.serve_forever()
@@ -0,0 +1,120 @@
+"""
+GraphQL Node Helpers
+
+Read profile and post fields straight from the JSON nodes Instagram returns
+(web_profile_info users and timeline edges), the same way instaloader's
+Profile and Post properties do, without creating instaloader objects.
+"""
+
+import re
+from datetime import datetime
+
+# Same patterns instaloader uses for Post.caption_hashtags and Post.caption_mentions
+HASHTAG_REGEX = re.compile(r"(?:#)((?:\w){1,150})")
+MENTION_REGEX = re.compile(r"(?:^|[^\w\n]|_)(?:@)(\w(?:(?:\w|(?:\.(?!\.))){0,28}(?:\w))?)")
+
+
+def post_url(shortcode):
+    """Public URL of a post."""
+    return f"https://www.instagram.com/p/{shortcode}/"
+
+
+def node_caption(node):
+    """Caption text of a post node, or None."""
+    edges = node.get('edge_media_to_caption', {}).get('edges')
+    if edges:
+        return edges[0]['node']['text']
+    return node.get('caption')
+
+
+def caption_hashtags(caption):
+    """Lowercased hashtags (without #) found in a caption."""
+    if not caption:
+        return []
+    return HASHTAG_REGEX.findall(caption.lower())
+
+
+def caption_mentions(caption):
+    """Lowercased profiles (without @) mentioned in a caption."""
+    if not caption:
+        return []
+    return MENTION_REGEX.findall(caption.lower())
+
+
+def node_date(node):
+    """UTC creation time of a post node (like instaloader's Post.date)."""
+    return datetime.utcfromtimestamp(node.get('taken_at_timestamp') or node['date'])
+
+
+def node_likes(node):
+    """Like count of a post node, or None if the node does not carry it."""
+    for key in ('edge_media_preview_like', 'edge_liked_by'):
+        if key in node:
+            return node[key]['count']
+    return None
+
+
+def node_comments(node):
+    """Comment count of a post node, or None if the node does not carry it."""
+    for key in ('edge_media_to_comment', 'edge_media_to_parent_comment'):
+        if key in node:
+            return node[key]['count']
+    return None
+
+
+def node_location_name(node):
+    """Location name of a post node, or None (also when only the location id is present)."""
+    location = node.get('location')
+    return location.get('name') if location else None
+
+
+def profile_counts(user):
+    """
+    Counters of a web_profile_info user node.
+
+    Returns:
+        dict: followers, following and total_posts
+    """
+    return {
+        'followers': user['edge_followed_by']['count'],
+        'following': user['edge_follow']['count'],
+        'total_posts': user['edge_owner_to_timeline_media']['count'],
+    }
+
+
+_MISSING = object()
+
+
+def post_fields(post):
+    """
+    Read all analytics fields of an instaloader Post from the node it was created from.
+
+    The node comes from the profile-info response or the timeline page that
+    yielded the post, so no extra request is needed. Lazy Post properties
+    (which may trigger per-post requests) are only used for fields the node
+    lacks, e.g. a location without a name.
+
+    Returns:
+        dict: shortcode, date, likes, comments, is_video, caption, caption_hashtags, location
+    """
+    node = post._node
+    caption = node_caption(node)
+    likes = node_likes(node)
+    comments = node_comments(node)
+
+    location = node.get('location', _MISSING)
+    if location is _MISSING or (location and 'name' not in location):
+        location = post.location.name if post.location else None
+    else:
+        location = node_location_name(node)
+
+    return {
+        'shortcode': node['shortcode'],
+        'date': node_date(node),
+        'likes': likes if likes is not None else post.likes,
+        'comments': comments if comments is not None else post.comments,
+        'is_video': node['is_video'],
+        'caption': caption,
+        'caption_hashtags': caption_hashtags(caption),
+        'location': location,
+    }
@@ -0,0 +1,383 @@
+"""
+Hashtag Index
+
+An inverted index of the hashtags, mentions and caption keywords of every
+post in the snapshot store (snapshot_store.py). It answers questions like
+"which hashtags drive engagement across our tracked accounts" without
+scraping again.
+
+Every post gets a dense integer id. For each term, the ids of the posts
+that use it are kept in an array('I') postings list, 4 bytes per
+occurrence. Likes, comments and owners are parallel arrays indexed by post
+id. update_from_store() only reads posts stored or refreshed since the last
+update. A top-K query aggregates every postings list in one vectorized
+NumPy pass.
+
+Terms carry their kind as a prefix: '#travel', '@nasa', 'sunset'.
+
+Posts deleted from the store (e.g. by hand) stay in the index, and a
+refreshed post keeps the terms of the caption it was first indexed with;
+--rebuild starts over from what the store holds.
+
+The index is saved with pickle, so only load index files you wrote
+yourself.
+
+Usage:
+    python hashtag_index.py [--kind=hashtag|mention|keyword] [--by=posts|likes|comments|engagement]
+                            [--top=20] [--min-posts=3] [--accounts=nasa,natgeo] [--term=#travel]
+                            [--index=FILE] [--db=FILE] [--rebuild]
+"""
+
+import os
+import pickle
+import re
+import sys
+import time
+from array import array
+
+import numpy as np
+
+from graphql_nodes import caption_hashtags, caption_mentions, post_url
+from snapshot_store import SnapshotStore
+
+DEFAULT_INDEX_PATH = 'hashtag_index.pkl'
+
+# Term kinds, by the prefix their terms carry
+KINDS = {'hashtag': '#', 'mention': '@', 'keyword': ''}
+KIND_CODES = {kind: code for code, kind in enumerate(KINDS)}
+
+# Ranking of top(): post count, or average likes / comments / likes + comments per post
+METRICS = ('posts', 'likes', 'comments', 'engagement')
+
+# Caption words of 3+ characters starting with a letter, not part of a hashtag, mention or other word
+KEYWORD_REGEX = re.compile(r"(?<![#@\w.])[^\W\d_]\w{2,}")
+
+# Words too common to say anything about a post
+STOPWORDS = frozenset("""
+    the and for are but not you all any can had her was one our out has him his how its may new now
+    see two who did get let put say she too use via this that with from have your just what when will
+    more been they them than then into over only also some here there their about would which could
+    these those while where after before other every being very much most many such each
+""".split())
+
+INDEX_VERSION = 2
+
+
+def caption_terms(caption, keywords=True):
+    """
+    Distinct index terms of a caption.
+
+    Args:
+        caption (str): Post caption (may be None)
+        keywords (bool): Also return plain caption words
+
+    Returns:
+        set: '#hashtag', '@mention' and keyword terms, lowercased
+    """
+    if not caption:
+        return set()
+    terms = {'#' + tag for tag in caption_hashtags(caption)}
+    terms.update('@' + name for name in caption_mentions(caption))
+    if keywords:
+        terms.update(word for word in KEYWORD_REGEX.findall(caption.lower()) if word not in STOPWORDS)
+    return terms
+
+
+class HashtagIndex:
+    def __init__(self, keywords=True):
+        """
+        Create an empty index.
+
+        Args:
+            keywords (bool): Index plain caption words next to hashtags and mentions
+        """
+        self.keywords = keywords
+        self._term_ids = {}           # term -> term id
+        self._terms = []              # term id -> term
+        self._term_kinds = array('b')  # term id -> KIND_CODES value
+        self._postings = []           # term id -> array('I') of post ids, ascending
+        self._post_ids = {}           # shortcode -> post id
+        self._shortcodes = []         # post id -> shortcode
+        self._likes = array('q')      # post id -> likes
+        self._comments = array('q')   # post id -> comments
+        self._owners = array('I')     # post id -> owner id
+        self._owner_ids = {}          # username -> owner id
+        self._owner_names = []        # owner id -> username
+        # Change sequence number (see SnapshotStore.changed_posts) of the last post read
+        self.position = 0
+        # Flattened postings, rebuilt after posts are added
+        self._flat = None
+
+    def __len__(self):
+        return len(self._shortcodes)
+
+    @property
+    def term_count(self):
+        return len(self._terms)
+
+    def add_post(self, username, shortcode, caption, likes, comments):
+        """
+        Index a post, or refresh the counters of an indexed one.
+
+        The caption of an indexed post is not read again (captions are
+        stored once, when the post is first seen).
+
+        Returns:
+            bool: True if the post was new
+        """
+        post_id = self._post_ids.get(shortcode)
+        if post_id is not None:
+            self._likes[post_id] = likes
+            self._comments[post_id] = comments
+            return False
+
+        post_id = len(self._shortcodes)
+        self._post_ids[shortcode] = post_id
+        self._shortcodes.append(shortcode)
+        self._likes.append(likes)
+        self._comments.append(comments)
+        username = username.lower()
+        owner_id = self._owner_ids.get(username)
+        if owner_id is None:
+            owner_id = self._owner_ids[username] = len(self._owner_names)
+            self._owner_names.append(username)
+        self._owners.append(owner_id)
+
+        for term in caption_terms(caption, self.keywords):
+            term_id = self._term_ids.get(term)
+            if term_id is None:
+                term_id = self._term_ids[term] = len(self._terms)
+                self._terms.append(term)
+                self._term_kinds.append(KIND_CODES['hashtag' if term[0] == '#' else
+                                                   'mention' if term[0] == '@' else 'keyword'])
+                self._postings.append(array('I'))
+            self._postings[term_id].append(post_id)
+        self._flat = None
+        return True
+
+    def update_from_store(self, store, batch_size=5000):
+        """
+        Read the posts stored or refreshed since the last update.
+
+        Args:
+            store (SnapshotStore): Snapshot store to read
+            batch_size (int): Rows read per query
+
+        Returns:
+            dict: Number of new and refreshed posts
+        """
+        new = refreshed = 0
+        for position, record in store.changed_posts(self.position, batch_size):
+            if self.add_post(record['username'], record['shortcode'], record.get('caption'),
+                             record['likes'], record['comments']):
+                new += 1
+            else:
+                refreshed += 1
+            self.position = position
+        return {'new_posts': new, 'refreshed_posts': refreshed}
+
+    def _flat_postings(self):
+        """All postings lists back to back, plus where each term's list starts (cached)."""
+        if self._flat is None:
+            flat = np.frombuffer(b''.join(self._postings), dtype=np.uint32)
+            lengths = np.fromiter((len(postings) for postings in self._postings), dtype=np.int64,
+                                  count=len(self._postings))
+            starts = np.zeros(len(lengths), dtype=np.int64)
+            np.cumsum(lengths[:-1], out=starts[1:])
+            self._flat = (flat, starts, lengths)
+        return self._flat
+
+    def top(self, kind='hashtag', by='engagement', k=20, min_posts=1, accounts=None):
+        """
+        Top-K terms of a kind.
+
+        Args:
+            kind (str): 'hashtag', 'mention' or 'keyword'
+            by (str): 'posts' (frequency) or average 'likes', 'comments' or
+                'engagement' (likes + comments) per post
+            k (int): Number of terms to return
+            min_posts (int): Ignore terms used by fewer posts (averages over
+                one or two posts are mostly noise)
+            accounts (iterable): Only count posts of these usernames (None = all)
+
+        Returns:
+            list: Dicts with term, posts, accounts, average_likes,
+            average_comments and average_engagement, best first
+        """
+        if kind not in KINDS:
+            raise ValueError(f"Unknown kind '{kind}' (choose from: {', '.join(KINDS)})")
+        if by not in METRICS:
+            raise ValueError(f"Unknown metric '{by}' (choose from: {', '.join(METRICS)})")
+        if not self._terms:
+            return []
+
+        flat, starts, counts = self._flat_postings()
+        likes = np.frombuffer(self._likes, dtype=np.int64)[flat]
+        comments = np.frombuffer(self._comments, dtype=np.int64)[flat]
+        if accounts is not None:
+            owner_ids = [self._owner_ids[name.lower()] for name in accounts if name.lower() in self._owner_ids]
+            selected = np.isin(np.frombuffer(self._owners, dtype=np.uint32)[flat], owner_ids)
+            counts = np.add.reduceat(selected.astype(np.int64), starts)
+            likes = np.where(selected, likes, 0)
+            comments = np.where(selected, comments, 0)
+        like_sums = np.add.reduceat(likes, starts)
+        comment_sums = np.add.reduceat(comments, starts)
+
+        candidates = np.flatnonzero((np.frombuffer(self._term_kinds, dtype=np.int8) == KIND_CODES[kind])
+                                    & (counts >= max(1, min_posts)))
+        posts = counts[candidates]
+        if by == 'posts':
+            values = posts.astype(np.float64)
+        else:
+            sums = {'likes': like_sums, 'comments': comment_sums,
+                    'engagement': like_sums + comment_sums}[by][candidates]
+            values = sums / posts
+
+        if len(candidates) > k:
+            best = np.argpartition(-values, k - 1)[:k]
+        else:
+            best = np.arange(len(candidates))
+        best = best[np.lexsort((candidates[best], -values[best]))]
+
+        results = []
+        for i in best:
+            term_id = candidates[i]
+            n = int(posts[i])
+            postings = np.frombuffer(self._postings[term_id], dtype=np.uint32)
+            owners = np.frombuffer(self._owners, dtype=np.uint32)[postings]
+            if accounts is not None:
+                owners = owners[np.isin(owners, owner_ids)]
+            results.append({
+                'term': self._terms[term_id],
+                'posts': n,
+                'accounts': int(len(np.unique(owners))),
+                'average_likes': round(float(like_sums[term_id]) / n, 1),
+                'average_comments': round(float(comment_sums[term_id]) / n, 1),
+                'average_engagement': round(float(like_sums[term_id] + comment_sums[term_id]) / n, 1),
+            })
+        return results
+
+    def posts_with(self, term, k=10, by='engagement'):
+        """
+        Best posts using a term.
+
+        Args:
+            term (str): Term with its prefix, e.g. '#travel' or '@nasa'
+            k (int): Number of posts to return
+            by (str): 'likes', 'comments' or 'engagement'
+
+        Returns:
+            list: Dicts with username, shortcode, url, likes and comments, best first
+        """
+        term_id = self._term_ids.get(term.lower())
+        if term_id is None:
+            return []
+        postings = np.frombuffer(self._postings[term_id], dtype=np.uint32)
+        likes = np.frombuffer(self._likes, dtype=np.int64)[postings]
+        comments = np.frombuffer(self._comments, dtype=np.int64)[postings]
+        values = {'likes': likes, 'comments': comments, 'engagement': likes + comments}[by]
+        best = np.argsort(-values, kind='stable')[:k]
+        return [{
+            'username': self._owner_names[self._owners[post_id]],
+            'shortcode': self._shortcodes[post_id],
+            'url': post_url(self._shortcodes[post_id]),
+            'likes': int(likes[i]),
+            'comments': int(comments[i]),
+        } for i, post_id in ((i, int(postings[i])) for i in best)]
+
+    def save(self, path=None):
+        """Write the index to a file (replaced atomically)."""
+        path = path or os.getenv('HASHTAG_INDEX') or DEFAULT_INDEX_PATH
+        state = {name: getattr(self, name) for name in (
+            'keywords', '_terms', '_term_kinds', '_postings', '_shortcodes', '_likes', '_comments',
+            '_owners', '_owner_names', 'position')}
+        state['version'] = INDEX_VERSION
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + '.tmp', path)
+
+    @classmethod
+    def load(cls, path=None):
+        """
+        Read an index written by save().
+
+        Returns:
+            HashtagIndex or None: None if the file does not exist or was written by an incompatible version
+        """
+        path = path or os.getenv('HASHTAG_INDEX') or DEFAULT_INDEX_PATH
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+        if state.pop('version', None) != INDEX_VERSION:
+            return None
+        index = cls(state.pop('keywords'))
+        for name, value in state.items():
+            setattr(index, name, value)
+        index._term_ids = {term: term_id for term_id, term in enumerate(index._terms)}
+        index._post_ids = {shortcode: post_id for post_id, shortcode in enumerate(index._shortcodes)}
+        index._owner_ids = {name: owner_id for owner_id, name in enumerate(index._owner_names)}
+        return index
+
+
+DEFAULTS = {
+    'kind': 'hashtag',
+    'by': 'engagement',
+    'top': 20,
+    'min-posts': 3,
+    'accounts': '',     # comma-separated usernames (default: every stored account)
+    'term': '',         # show the best posts of one term instead of the top terms
+    'index': '',        # default: HASHTAG_INDEX env variable or hashtag_index.pkl
+    'db': '',           # default: SNAPSHOT_DB env variable or snapshots.db
+    'rebuild': False,   # build the index from scratch instead of updating it
+}
+
+
+def parse_options(argv):
+    """Read --name=value options (see DEFAULTS)."""
+    options = dict(DEFAULTS)
+    for arg in argv:
+        name, _, value = arg.lstrip('-').partition('=')
+        if name not in DEFAULTS:
+            raise SystemExit(f"Unknown option: {arg} (options: {', '.join('--' + name for name in DEFAULTS)})")
+        default = DEFAULTS[name]
+        if isinstance(default, bool):
+            options[name] = value.lower() not in ('0', 'false', 'no')
+        else:
+            options[name] = type(default)(value)
+    return options
+
+
+def main():
+    options = parse_options(sys.argv[1:])
+    index_path = options['index'] or None
+
+    index = None if options['rebuild'] else HashtagIndex.load(index_path)
+    if index is None:
+        index = HashtagIndex()
+    started = time.perf_counter()
+    store = SnapshotStore(options['db'] or None)
+    update = index.update_from_store(store)
+    store.close()
+    index.save(index_path)
+    print(f"🗂️  {len(index):,} posts, {index.term_count:,} terms "
+          f"({update['new_posts']:,} new, {update['refreshed_posts']:,} refreshed posts "
+          f"in {time.perf_counter() - started:.2f}s)\n")
+
+    if options['term']:
+        print(f"🏆 Best posts with {options['term']}:")
+        for post in index.posts_with(options['term'], options['top']):
+            print(f"  @{post['username']:<20} {post['likes']:>10,} likes {post['comments']:>8,} comments  {post['url']}")
+        return
+
+    accounts = [name.strip().lstrip('@') for name in options['accounts'].split(',') if name.strip()] or None
+    results = index.top(options['kind'], options['by'], options['top'], options['min-posts'], accounts)
+    print(f"🏆 Top {options['kind']}s by {options['by']} (at least {options['min-posts']} posts):")
+    print(f"  {'term':<30} {'posts':>8} {'accounts':>9} {'avg likes':>12} {'avg comments':>13}")
+    for row in results:
+        print(f"  {row['term']:<30} {row['posts']:>8,} {row['accounts']:>9,} "
+              f"{row['average_likes']:>12,.1f} {row['average_comments']:>13,.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,401 @@
+"""
+HTTP Cache
+
+On-disk cache of raw Instagram responses, kept below the instaloader
+context. Entries are keyed by URL, query parameters and the logged-in user.
+They are stored zlib-compressed in a SQLite file, so every process and every
+restart using the same file shares them.
+
+- Profile payloads and post/timeline pages have their own TTLs. Other
+  endpoints, such as login or search, are never cached.
+- The file is kept under a size limit by evicting the least recently used
+  entries.
+- A fresh entry is answered before instaloader's rate controller and sleep,
+  so cache hits do not use up the request budget. Misses are stored by a
+  transport adapter as they come off the wire.
+- An expired entry whose response carried an ETag or Last-Modified is
+  revalidated with a conditional request. A 304 answer refreshes it without
+  downloading the body again.
+- In offline mode every stored entry is served however old it is. A request
+  that is not in the cache fails instead of going to the network, so traffic
+  captured earlier can be replayed offline.
+
+Enabled for every loader built by rate_limited_loader() when HTTP_CACHE_DB
+names the SQLite file. TTLs are tuned with HTTP_CACHE_PROFILE_TTL and
+HTTP_CACHE_POSTS_TTL (seconds), the size with HTTP_CACHE_MAX_MB, and
+HTTP_CACHE_OFFLINE=1 turns on offline mode. Session cookies and the
+ig-set-* auth headers are never written to the file.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from lazy_imports import lazy_import
+from transport import on_session
+
+# Imported on first use (see lazy_imports.py)
+requests = lazy_import('requests')
+
+DEFAULT_DB_PATH = 'http_cache.db'
+
+# Hosts whose responses are cached
+CACHED_PREFIXES = ('https://www.instagram.com/', 'https://i.instagram.com/')
+
+# Endpoint type of a URL path, checked in order; paths matching none are not cached
+ENDPOINT_KINDS = (
+    ('profile', re.compile(r'^/api/v1/users/(web_profile_info/|\d+/info/)')),
+    ('posts', re.compile(r'^/(graphql/query/?|api/v1/feed/user/|api/v1/media/\d+/info/)')),
+)
+
+# The logged-in user's own profile (used by test_login); caching it would hide an expired session
+UNCACHED_QUERY_HASHES = frozenset({'d6f4427fbe92d846298cf93df0b937d3'})
+
+# Response headers that are not stored: they describe the transfer or carry credentials
+DROPPED_HEADERS = frozenset({'content-encoding', 'content-length', 'transfer-encoding', 'set-cookie'})
+
+# Entries are evicted down to this fraction of max_bytes, so eviction does not run on every store
+EVICT_TO = 0.9
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    stored_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_by_use ON responses (used_at);
+"""
+
+
+def endpoint_kind(url):
+    """Return 'profile', 'posts' or None (not cacheable) for a request URL."""
+    parts = urlsplit(url)
+    for kind, pattern in ENDPOINT_KINDS:
+        if pattern.match(parts.path):
+            if kind == 'posts' and dict(parse_qsl(parts.query)).get('query_hash') in UNCACHED_QUERY_HASHES:
+                return None
+            return kind
+    return None
+
+
+def cache_key(url, user_id=None):
+    """
+    Key of a GET request: host, path and sorted query parameters, plus the
+    logged-in user id, because some responses depend on who is asking.
+    """
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return hashlib.sha256(f"{user_id or ''}|{parts.netloc}{parts.path}?{query}".encode()).hexdigest()
+
+
+def _cookie_user_id(cookie_header):
+    """ds_user_id from a Cookie request header (None when not logged in)."""
+    for cookie in (cookie_header or '').split(';'):
+        name, _, value = cookie.strip().partition('=')
+        if name == 'ds_user_id':
+            return value
+    return None
+
+
+class HTTPCache:
+    def __init__(self, path=None, profile_ttl=600, posts_ttl=1800, max_bytes=256 * 1024 * 1024,
+                 offline=False, compress_level=6):
+        """
+        Open (or create) the cache file.
+
+        Args:
+            path (str): SQLite file (default: HTTP_CACHE_DB env variable or http_cache.db)
+            profile_ttl (float): Seconds a profile payload stays fresh
+            posts_ttl (float): Seconds a post or timeline page stays fresh
+            max_bytes (int): Compressed size above which least recently used entries are evicted
+            offline (bool): Serve entries whatever their age and never go to the network
+            compress_level (int): zlib level of the stored bodies (1 = fastest, 9 = smallest)
+        """
+        self.path = path or os.getenv('HTTP_CACHE_DB') or DEFAULT_DB_PATH
+        self.ttls = {'profile': profile_ttl, 'posts': posts_ttl}
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.compress_level = compress_level
+        # Autocommit mode, like shared_state.SharedStore; WAL lets other processes read while one writes
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'revalidations': 0, 'stores': 0, 'evictions': 0, 'bytes_saved': 0}
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+            # Estimate of the file's size, kept up to date by this process; _evict() recounts it
+            self._bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, url, user_id=None):
+        """
+        Return a stored response if it is fresh (or in offline mode, if it exists).
+
+        Returns:
+            tuple or None: (status, headers dict, body bytes)
+        """
+        key = cache_key(url, user_id)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, headers, body, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (row[3] <= now and not self.offline):
+                self._counters['misses'] += 1
+                return None
+            self._conn.execute("UPDATE responses SET used_at = ? WHERE key = ?", (now, key))
+            body = zlib.decompress(row[2])
+            self._counters['hits'] += 1
+            self._counters['bytes_saved'] += len(body)
+        return row[0], json.loads(row[1]), body
+
+    def put(self, url, status, headers, body, user_id=None):
+        """
+        Store a response if its endpoint is cacheable.
+
+        Args:
+            url (str): Full request URL (including the query string)
+            status (int): HTTP status (only 200 is stored)
+            headers (mapping): Response headers
+            body (bytes): Decoded response body
+
+        Returns:
+            bool: True if the response was stored
+        """
+        kind = endpoint_kind(url)
+        if kind is None or status != 200 or not self.ttls[kind]:
+            return False
+        headers = {name: value for name, value in headers.items()
+                   if name.lower() not in DROPPED_HEADERS and not name.lower().startswith('ig-set-')}
+        key = cache_key(url, user_id)
+        compressed = zlib.compress(body, self.compress_level)
+        now = time.time()
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, url, kind, status, headers, body, size, stored_at, "
+                "expires_at, used_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, url, kind, status, json.dumps(headers), compressed, len(compressed),
+                 now, now + self.ttls[kind], now)
+            )
+            self._counters['stores'] += 1
+            self._bytes += len(compressed) - (previous[0] if previous else 0)
+            if self._bytes > self.max_bytes:
+                self._evict()
+        return True
+
+    def _evict(self):
+        """Drop least recently used entries until the file is below EVICT_TO * max_bytes (lock held)."""
+        # Other processes may have added or evicted entries since the last count
+        self._bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        target = self.max_bytes * EVICT_TO
+        if self._bytes <= target:
+            return
+        freed, keys = 0, []
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY used_at"):
+            if self._bytes - freed <= target:
+                break
+            keys.append((key,))
+            freed += size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", keys)
+        self._bytes -= freed
+        self._counters['evictions'] += len(keys)
+
+    def validators(self, url, user_id=None):
+        """
+        Conditional request headers for a stored response, whatever its age.
+
+        Returns:
+            dict: If-None-Match / If-Modified-Since built from the stored
+            ETag / Last-Modified (empty if there is no stored response or no validator)
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT headers FROM responses WHERE key = ?", (cache_key(url, user_id),)
+            ).fetchone()
+        if row is None:
+            return {}
+        headers = {name.lower(): value for name, value in json.loads(row[0]).items()}
+        conditions = {}
+        if 'etag' in headers:
+            conditions['If-None-Match'] = headers['etag']
+        if 'last-modified' in headers:
+            conditions['If-Modified-Since'] = headers['last-modified']
+        return conditions
+
+    def revalidated(self, url, user_id=None):
+        """
+        Mark a stored response fresh again after the server answered 304 Not Modified.
+
+        Returns:
+            tuple or None: (status, headers dict, body bytes), or None if it was evicted meanwhile
+        """
+        key = cache_key(url, user_id)
+        kind = endpoint_kind(url)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, headers, body FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET expires_at = ?, used_at = ? WHERE key = ?",
+                               (now + self.ttls[kind], now, key))
+            body = zlib.decompress(row[2])
+            self._counters['revalidations'] += 1
+            self._counters['bytes_saved'] += len(body)
+        return row[0], json.loads(row[1]), body
+
+    def clear(self):
+        """Remove every stored response."""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._bytes = 0
+
+    def stats(self):
+        """
+        Report cache counters.
+
+        Returns:
+            dict: Hits, misses, 304 revalidations, stores, evictions and body
+            bytes not downloaded (this process), plus entries and compressed
+            bytes in the file
+        """
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+            return {**self._counters, 'entries': entries, 'bytes': size}
+
+
+class HTTPCacheAdapter:
+    """
+    requests transport adapter for one session. It sends requests with the
+    session's regular 'https://' adapter (which may itself be replaced, e.g.
+    by fake_instagram.route_to_fake) and stores the raw responses. Fresh hits
+    are answered earlier, in install_http_cache's get_json. An expired entry
+    with an ETag or Last-Modified is revalidated with a conditional request,
+    and a 304 answer is served from the stored body. In offline mode nothing
+    reaches the network.
+    """
+
+    def __init__(self, cache, session):
+        self.cache = cache
+        self.session = session
+
+    def send(self, request, **kwargs):
+        # Read before sending: adapters further down may rewrite request.url
+        url = request.url
+        if self.cache.offline:
+            raise requests.exceptions.ConnectionError(f"{url} is not in the HTTP cache (offline mode)")
+
+        user_id = _cookie_user_id(request.headers.get('Cookie'))
+        cacheable = request.method == 'GET' and endpoint_kind(url) is not None
+        if cacheable:
+            request.headers.update(self.cache.validators(url, user_id))
+
+        response = self.session.adapters['https://'].send(request, **kwargs)
+        if cacheable and response.status_code == 304:
+            cached = self.cache.revalidated(url, user_id)
+            if cached is not None:
+                return self._build_response(request, url, *cached)
+        elif cacheable and response.status_code == 200 and _is_ok_json(response.content):
+            self.cache.put(url, response.status_code, response.headers, response.content, user_id)
+        return response
+
+    def _build_response(self, request, url, status, headers, body):
+        """A requests Response carrying a stored body."""
+        response = requests.models.Response()
+        response.status_code = status
+        response.reason = 'OK'
+        response.headers = requests.structures.CaseInsensitiveDict(headers)
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response._content = body
+        response._content_consumed = True
+        response.url = url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def _is_ok_json(body):
+    """True if a body is a JSON object without a failed 'status' (instaloader retries those)."""
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return False
+    return isinstance(data, dict) and data.get('status', 'ok') == 'ok'
+
+
+def install_http_cache(context, cache):
+    """
+    Cache the JSON requests of an instaloader context on disk.
+
+    Args:
+        context: instaloader.InstaloaderContext (e.g. loader.context)
+        cache (HTTPCache): Cache to use
+    """
+
+    def setup(session):
+        # instaloader copies its session for most queries; each copy gets its own adapter
+        for prefix in CACHED_PREFIXES:
+            adapter = session.adapters.get(prefix)
+            if not (isinstance(adapter, HTTPCacheAdapter) and adapter.session is session):
+                session.mount(prefix, HTTPCacheAdapter(cache, session))
+
+    on_session(context, setup)
+
+    # Fresh entries are answered here, before instaloader's sleep and rate controller
+    send_json = context.get_json
+
+    def get_json(path, params, host='www.instagram.com', session=None, **kwargs):
+        url = requests.Request('GET', f'https://{host}/{path}', params=params).prepare().url
+        if endpoint_kind(url) is not None:
+            sess = session if session is not None else context._session
+            cached = cache.get(url, requests.utils.dict_from_cookiejar(sess.cookies).get('ds_user_id'))
+            if cached is not None:
+                status, headers, body = cached
+                response_headers = kwargs.get('response_headers')
+                if response_headers is not None:
+                    response_headers.clear()
+                    response_headers.update(headers)
+                return json.loads(body)
+        return send_json(path, params, host=host, session=session, **kwargs)
+
+    context.get_json = get_json
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_http_cache():
+    """
+    Return the process-wide HTTP cache, or None if HTTP_CACHE_DB is not set.
+    Limits can be tuned with HTTP_CACHE_* environment variables.
+    """
+    global _default_cache
+    if not os.getenv('HTTP_CACHE_DB'):
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = HTTPCache(
+                profile_ttl=float(os.getenv('HTTP_CACHE_PROFILE_TTL', 600)),
+                posts_ttl=float(os.getenv('HTTP_CACHE_POSTS_TTL', 1800)),
+                max_bytes=int(float(os.getenv('HTTP_CACHE_MAX_MB', 256)) * 1024 * 1024),
+                offline=os.getenv('HTTP_CACHE_OFFLINE', '').lower() in ('1', 'true', 'yes'),
+            )
+    return _default_cache
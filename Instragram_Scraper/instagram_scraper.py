@@ -5,31 +5,58 @@ A Python script that uses instaloader to fetch the number of followers
 for a specified Instagram account.
 """
 
-import instaloader
-import os
-from dotenv import load_dotenv
 import sys
-from datetime import datetime
+import threading
+from response_cache import get_response_cache
+from batch import run_concurrently
+from rate_limiter import rate_limited_loader
+from instrumentation import trace, span
+from records import ProfileRecord
+from config import get_config
+from lazy_imports import lazy_import
+
+# Imported on first network use (see lazy_imports.py)
+instaloader = lazy_import('instaloader')
 
 class InstagramFollowerScraper:
-    def __init__(self):
-        """Initialize the Instagram scraper with instaloader."""
-        self.loader = instaloader.Instaloader()
-
-        # Load environment variables
-        load_dotenv()
+    def __init__(self, timeseries=None):
+        """
+        Initialize the Instagram scraper. The instaloader object is only
+        built on first use, so creating a scraper costs next to nothing.
 
-        # Optional: Login credentials for accessing private accounts
-        self.username = os.getenv('INSTAGRAM_USERNAME')
-        self.password = os.getenv('INSTAGRAM_PASSWORD')
+        Args:
+            timeseries (TimeSeriesStore): Optional store every fetched sample is appended to
+        """
+        self.timeseries = timeseries
+        self._loader = None
+        self._loader_lock = threading.Lock()
+
+        # Optional: Login credentials for accessing private accounts (.env is read once per process)
+        config = get_config()
+        self.username = config.instagram_username
+        self.password = config.instagram_password
+
+    @property
+    def loader(self):
+        """The scraper's rate-limited Instaloader, built on first use."""
+        if self._loader is None:
+            with self._loader_lock:
+                if self._loader is None:
+                    self._loader = self._build_loader()
+        return self._loader
+
+    def _build_loader(self):
+        # All requests are paced by the shared rate limiter
+        loader = rate_limited_loader()
 
         # Configure instaloader settings
-        self.loader.download_pictures = False
-        self.loader.download_videos = False
-        self.loader.download_video_thumbnails = False
-        self.loader.download_geotags = False
-        self.loader.download_comments = False
-        self.loader.save_metadata = False
+        loader.download_pictures = False
+        loader.download_videos = False
+        loader.download_video_thumbnails = False
+        loader.download_geotags = False
+        loader.download_comments = False
+        loader.save_metadata = False
+        return loader
 
     def login(self):
         """
@@ -56,35 +83,23 @@ class InstagramFollowerScraper:
             print(f"Login error: {e}")
             return False
 
-    def get_follower_count(self, username):
+    def get_follower_count(self, username, fresh=False):
         """
         Get the follower count for a specific Instagram account.
 
         Args:
             username (str): Instagram username (without @)
+            fresh (bool): Always fetch from Instagram instead of serving a
+                (possibly stale) cached copy; the cache is updated with the result
 
         Returns:
             dict: Dictionary containing follower data and metadata
         """
         try:
-            # Get profile
-            profile = instaloader.Profile.from_username(self.loader.context, username)
-
-            # Extract follower information
-            follower_data = {
-                'username': profile.username,
-                'full_name': profile.full_name,
-                'followers': profile.followers,
-                'following': profile.followees,
-                'posts': profile.mediacount,
-                'is_private': profile.is_private,
-                'is_verified': profile.is_verified,
-                'biography': profile.biography,
-                'external_url': profile.external_url,
-                'timestamp': datetime.now().isoformat()
-            }
-
-            return follower_data
+            with trace('get_follower_count'):
+                if fresh:
+                    return self._refresh_follower_count(username)
+                return self.lookup_follower_count(username)
 
         except instaloader.exceptions.ProfileNotExistsException:
             print(f"Error: Profile '{username}' does not exist")
@@ -96,6 +111,61 @@ class InstagramFollowerScraper:
             print(f"Error getting follower count: {e}")
             return None
 
+    def get_follower_counts(self, usernames, max_workers=8):
+        """
+        Get follower data for many accounts concurrently.
+
+        All lookups share this scraper's (optionally logged-in) session.
+        Results are yielded as soon as each one finishes, so callers can
+        process them while the rest are still in flight.
+
+        Args:
+            usernames (iterable): Instagram usernames (with or without @)
+            max_workers (int): Number of lookups to run at the same time
+
+        Yields:
+            dict: {'username', 'data', 'error'} for each account; 'data' is the
+            follower data dictionary or None, 'error' a message or None
+        """
+        usernames = (username.lstrip('@') for username in usernames)
+
+        for username, follower_data, error in run_concurrently(self.lookup_follower_count, usernames, max_workers):
+            if isinstance(error, instaloader.exceptions.ProfileNotExistsException):
+                error = f"Profile '{username}' does not exist"
+            elif isinstance(error, instaloader.exceptions.LoginRequiredException):
+                error = "Login required to access this profile (private account)"
+            elif error is not None:
+                error = str(error)
+
+            yield {'username': username, 'data': follower_data, 'error': error}
+
+    def lookup_follower_count(self, username):
+        """Like get_follower_count(), but raises instead of printing errors (cached, fetched on a miss)."""
+        return get_response_cache().get_or_fetch(
+            ('followers', username.lower()),
+            lambda: self._fetch_follower_count(username),
+            kind='profile'
+        )
+
+    def _refresh_follower_count(self, username):
+        """Fetch follower data from Instagram and update the cache with it (raises on errors)."""
+        follower_data = self._fetch_follower_count(username)
+        get_response_cache().put(('followers', username.lower()), follower_data, kind='profile')
+        return follower_data
+
+    def _fetch_follower_count(self, username):
+        """Fetch follower data from Instagram, bypassing the cache."""
+        # Get profile
+        with span('profile'):
+            profile = instaloader.Profile.from_username(self.loader.context, username)
+
+        # Extract follower information
+        follower_data = ProfileRecord.from_profile(profile).to_dict(posts_key='posts')
+
+        if self.timeseries is not None:
+            self.timeseries.add_sample(follower_data)
+        return follower_data
+
     def display_follower_info(self, follower_data):
         """
         Display follower information in a formatted way.
@@ -156,6 +226,22 @@ class InstagramFollowerScraper:
             print(f"Error saving to file: {e}")
 
 
+_default_scraper = None
+_default_scraper_lock = threading.Lock()
+
+
+def get_scraper():
+    """
+    Return the process-wide scraper, so every lookup in a process (and every
+    CLI helper) shares one loader and session instead of building its own.
+    """
+    global _default_scraper
+    with _default_scraper_lock:
+        if _default_scraper is None:
+            _default_scraper = InstagramFollowerScraper()
+    return _default_scraper
+
+
 def main():
     """Main function to run the Instagram follower scraper."""
     print("Instagram Follower Counter")
@@ -164,10 +250,10 @@ def main():
     print("Login is only required for private accounts.\n")
 
     # Initialize scraper
-    scraper = InstagramFollowerScraper()
+    scraper = get_scraper()
 
     # Get target account from environment or user input
-    target_account = os.getenv('TARGET_ACCOUNT')
+    target_account = get_config().target_account
 
     if not target_account:
         target_account = input("Enter Instagram username to analyze: ").strip()
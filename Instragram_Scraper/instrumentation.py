@@ -0,0 +1,329 @@
+"""
+Instrumentation
+
+Structured timing for scrape calls. A trace covers one call (e.g.
+scrape_full_profile) and collects the time spent in each of its phases
+(spans such as 'session_lease', 'profile', 'get_posts', 'post_properties' or
+'serialize') plus the HTTP requests and response bytes it caused. Everything
+is also aggregated into a process-wide registry that renders in the
+Prometheus text format, and recent traces are kept for inspection.
+
+Spans may nest (rate-limiter waits happen inside the 'profile' span, for
+example), so their times can overlap. Profiling a call with cProfile is
+opt-in and writes a .prof file per call.
+"""
+
+import cProfile
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+from transport import add_response_hook
+
+DEFAULT_PROFILE_DIR = 'profiles'
+
+# Histogram buckets (seconds), as used by the Prometheus client libraries
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _labels_text(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels
+    )
+    return '{' + pairs + '}'
+
+
+class Metrics:
+    """Thread-safe registry of counters, gauges and histograms."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._families = {}  # name -> (type, help text)
+        self._values = {}  # (name, labels) -> number, or [bucket counts, sum, count] for histograms
+
+    def _family(self, name, kind, help_text):
+        if name not in self._families:
+            self._families[name] = (kind, help_text or name.replace('_', ' '))
+
+    def inc(self, name, value=1, help_text=None, **labels):
+        """Add to a counter."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._family(name, 'counter', help_text)
+            self._values[key] = self._values.get(key, 0) + value
+
+    def set(self, name, value, help_text=None, **labels):
+        """Set a gauge."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._family(name, 'gauge', help_text)
+            self._values[key] = value
+
+    def observe(self, name, value, help_text=None, **labels):
+        """Record a value (e.g. a duration in seconds) in a histogram."""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._family(name, 'histogram', help_text)
+            histogram = self._values.get(key)
+            if histogram is None:
+                histogram = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram[0][i] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def render(self):
+        """
+        Render every metric in the Prometheus text exposition format.
+
+        Returns:
+            str: The metrics page
+        """
+        with self._lock:
+            families = dict(self._families)
+            values = {key: (list(value[0]), value[1], value[2]) if isinstance(value, list) else value
+                      for key, value in self._values.items()}
+
+        lines = []
+        for name in sorted(families):
+            kind, help_text = families[name]
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for (metric, labels), value in sorted(values.items(), key=lambda item: item[0]):
+                if metric != name:
+                    continue
+                if kind != 'histogram':
+                    lines.append(f"{name}{_labels_text(labels)} {value}")
+                    continue
+                counts, total, count = value
+                for bound, bucket_count in zip(self.buckets, counts):
+                    lines.append(f"{name}_bucket{_labels_text(labels + (('le', bound),))} {bucket_count}")
+                lines.append(f"{name}_bucket{_labels_text(labels + (('le', '+Inf'),))} {count}")
+                lines.append(f"{name}_sum{_labels_text(labels)} {total}")
+                lines.append(f"{name}_count{_labels_text(labels)} {count}")
+        return '\n'.join(lines) + '\n'
+
+
+_default_metrics = None
+_default_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    """Return the process-wide metrics registry."""
+    global _default_metrics
+    with _default_metrics_lock:
+        if _default_metrics is None:
+            _default_metrics = Metrics()
+    return _default_metrics
+
+
+class Trace:
+    """Timing and traffic of one instrumented call."""
+
+    def __init__(self, call):
+        self.call = call
+        self.started_at = datetime.now().isoformat()
+        self.seconds = 0.0
+        self.spans = {}  # span name -> [total seconds, count]
+        self.http_requests = 0
+        self.http_bytes = 0
+        self.profile_file = None
+
+    def add_span(self, name, seconds):
+        span = self.spans.setdefault(name, [0.0, 0])
+        span[0] += seconds
+        span[1] += 1
+
+    def server_timing(self):
+        """Format the spans as a Server-Timing header value (durations in ms)."""
+        parts = [f"{name};dur={seconds * 1000:.1f}" for name, (seconds, _) in self.spans.items()]
+        parts.append(f"total;dur={self.seconds * 1000:.1f}")
+        return ', '.join(parts)
+
+    def to_dict(self):
+        return {
+            'call': self.call,
+            'started_at': self.started_at,
+            'duration_ms': round(self.seconds * 1000, 2),
+            'spans': {
+                name: {'duration_ms': round(seconds * 1000, 2), 'count': count}
+                for name, (seconds, count) in self.spans.items()
+            },
+            'http_requests': self.http_requests,
+            'http_bytes': self.http_bytes,
+            'profile_file': self.profile_file,
+        }
+
+
+_local = threading.local()
+_recent_traces = deque(maxlen=int(os.getenv('TRACE_HISTORY', 100)))
+_recent_traces_lock = threading.Lock()
+
+
+def _active_traces():
+    stack = getattr(_local, 'traces', None)
+    if stack is None:
+        stack = _local.traces = []
+    return stack
+
+
+def current_trace():
+    """Return the innermost trace of the current thread, or None."""
+    stack = _active_traces()
+    return stack[-1] if stack else None
+
+
+@contextmanager
+def trace(call):
+    """
+    Trace a call for the duration of a `with` block.
+
+    Traces nest: the spans and requests of an inner call are reported in the
+    outer trace as well. Only outermost traces are kept in recent_traces().
+
+    Args:
+        call (str): Name of the call, e.g. 'scrape_full_profile'
+
+    Yields:
+        Trace: The trace, complete once the block has exited
+    """
+    metrics = get_metrics()
+    stack = _active_traces()
+    current = Trace(call)
+    stack.append(current)
+    started = time.perf_counter()
+    error = False
+    try:
+        yield current
+    except Exception:
+        error = True
+        raise
+    finally:
+        current.seconds = time.perf_counter() - started
+        # Not necessarily the top of the stack when a traced generator is closed late
+        stack.remove(current)
+        metrics.inc('scrape_calls_total', help_text='Instrumented scrape calls', call=call, error=str(error).lower())
+        metrics.observe('scrape_call_seconds', current.seconds, help_text='Duration of scrape calls', call=call)
+        metrics.inc('scrape_call_http_requests_total', current.http_requests,
+                    help_text='HTTP requests made by scrape calls', call=call)
+        if not stack:
+            with _recent_traces_lock:
+                _recent_traces.append(current.to_dict())
+
+
+@contextmanager
+def span(name):
+    """
+    Time one phase of a call; recorded in every active trace and in the
+    scrape_phase_seconds histogram.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        for active in _active_traces():
+            active.add_span(name, seconds)
+        get_metrics().observe('scrape_phase_seconds', seconds, help_text='Duration of scrape phases', phase=name)
+
+
+def timed_iter(iterable, name):
+    """
+    Yield from an iterable, timing every step under the given span name.
+
+    Useful for lazy iterators such as Profile.get_posts(), whose page
+    requests happen inside next().
+    """
+    iterator = iter(iterable)
+    while True:
+        with span(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+def recent_traces(limit=None):
+    """Return the most recent outermost traces, newest first."""
+    with _recent_traces_lock:
+        traces = list(reversed(_recent_traces))
+    return traces[:limit] if limit is not None else traces
+
+
+def instrument_context(context):
+    """
+    Count the HTTP requests and response bytes of an instaloader context,
+    per active trace and in the process-wide metrics.
+
+    Args:
+        context: instaloader.InstaloaderContext (e.g. loader.context)
+    """
+    if context.__dict__.get('_instrumented'):
+        return
+    context._instrumented = True
+    metrics = get_metrics()
+
+    def on_response(response, *args, **kwargs):
+        size = response.headers.get('content-length')
+        if size is not None:
+            size = int(size)
+        elif not kwargs.get('stream'):
+            size = len(response.content)
+        else:
+            size = 0
+
+        for active in _active_traces():
+            active.http_requests += 1
+            active.http_bytes += size
+        metrics.inc('instagram_http_requests_total', help_text='HTTP requests sent to Instagram',
+                    status=response.status_code)
+        metrics.inc('instagram_http_response_bytes_total', size, help_text='Response bytes received from Instagram')
+
+    add_response_hook(context, on_response)
+
+
+def profiling_enabled():
+    """Whether per-call cProfile dumps may be requested (PROFILING_ENABLED=1)."""
+    return os.getenv('PROFILING_ENABLED', '').lower() in ('1', 'true', 'yes')
+
+
+@contextmanager
+def profiled(name, directory=None):
+    """
+    Run the block under cProfile and dump the stats to a .prof file
+    (read it with `python -m pstats` or snakeviz).
+
+    Args:
+        name (str): Used in the file name, e.g. the username
+        directory (str): Target directory (default: PROFILE_DIR env variable or ./profiles)
+
+    Yields:
+        dict: Gets the dump's 'path' once the block has exited
+    """
+    directory = directory or os.getenv('PROFILE_DIR', DEFAULT_PROFILE_DIR)
+    os.makedirs(directory, exist_ok=True)
+    result = {'path': None}
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield result
+    finally:
+        profiler.disable()
+        safe_name = re.sub(r'[^A-Za-z0-9_.-]', '_', name)
+        path = os.path.join(directory, f"{safe_name}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.prof")
+        profiler.dump_stats(path)
+        result['path'] = path
+        active = current_trace()
+        if active is not None:
+            active.profile_file = path
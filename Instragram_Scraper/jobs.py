@@ -0,0 +1,300 @@
+"""
+Job Queue
+
+A persistent, SQLite-backed queue for long scrape and analytics runs. HTTP
+handlers only submit jobs and read their state, so they return immediately
+however slow Instagram is; a local pool of worker threads runs the jobs.
+Jobs have priorities, are retried with exponential backoff, and identical
+jobs that are still pending are deduplicated. Every record a job produces is
+stored as soon as it is emitted, so clients can read partial results while
+the job is still running.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from rate_limiter import HIGH, NORMAL, LOW
+
+DEFAULT_DB_PATH = 'jobs.db'
+
+PRIORITIES = {'high': HIGH, 'normal': NORMAL, 'low': LOW}
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    dedup_key TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    run_after REAL NOT NULL,
+    error TEXT,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_by_queue ON jobs (status, priority, run_after);
+CREATE INDEX IF NOT EXISTS jobs_by_dedup_key ON jobs (dedup_key, status);
+CREATE TABLE IF NOT EXISTS job_results (
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    record TEXT NOT NULL,
+    PRIMARY KEY (job_id, seq)
+);
+"""
+
+
+class PermanentJobError(Exception):
+    """Raised by a job handler for failures that retrying cannot fix (e.g. the profile does not exist)."""
+
+
+class JobQueue:
+    def __init__(self, path=None, retry_backoff=30, recover=True):
+        """
+        Open (or create) the queue.
+
+        Args:
+            path (str): SQLite file (default: JOBS_DB env variable or jobs.db)
+            retry_backoff (float): Seconds before the first retry of a failed job (doubles per attempt)
+            recover (bool): Requeue jobs left running by a process that died. Only one
+                process may do this: other processes sharing the file may be running them.
+        """
+        self.path = path or os.getenv('JOBS_DB', DEFAULT_DB_PATH)
+        self.retry_backoff = retry_backoff
+        # Several worker processes may share the file: WAL lets readers run during
+        # a write, and the long timeout waits out another process's write lock
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+            if recover:
+                # Jobs that were running when the process died go back to the queue
+                self._conn.execute("UPDATE jobs SET status = ? WHERE status = ?", (QUEUED, RUNNING))
+
+    def submit(self, kind, params, priority=NORMAL, max_attempts=3):
+        """
+        Queue a job, unless an identical one is still queued or running.
+
+        Args:
+            kind (str): Handler name, e.g. 'profile' or 'analytics'
+            params (dict): JSON-serializable handler arguments
+            priority (int): HIGH, NORMAL or LOW (lower runs first)
+            max_attempts (int): Attempts before the job is marked failed
+
+        Returns:
+            tuple: (job dict, True if an existing job was returned instead)
+        """
+        dedup_key = f"{kind}:{json.dumps(params, sort_keys=True)}"
+
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT id FROM jobs WHERE dedup_key = ? AND status IN (?, ?)", (dedup_key, QUEUED, RUNNING)
+            ).fetchone()
+            if row is not None:
+                job_id, deduplicated = row['id'], True
+            else:
+                job_id, deduplicated = uuid.uuid4().hex, False
+                self._conn.execute(
+                    "INSERT INTO jobs (id, kind, params, dedup_key, priority, status, max_attempts, run_after, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (job_id, kind, json.dumps(params), dedup_key, priority, QUEUED, max_attempts,
+                     time.time(), datetime.now().isoformat())
+                )
+        return self.get(job_id), deduplicated
+
+    def claim(self):
+        """
+        Take the most urgent runnable job off the queue.
+
+        Returns:
+            dict or None: The job, now marked running
+        """
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT * FROM jobs WHERE status = ? AND run_after <= ? ORDER BY priority, created_at LIMIT 1",
+                (QUEUED, time.time())
+            ).fetchone()
+            if row is None:
+                return None
+            claimed = self._conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, started_at = ? WHERE id = ? AND status = ?",
+                (RUNNING, datetime.now().isoformat(), row['id'], QUEUED)
+            ).rowcount
+            if not claimed:
+                # A worker in another process took it first
+                return None
+            # Records of an earlier failed attempt would be duplicated by the retry
+            self._conn.execute("DELETE FROM job_results WHERE job_id = ?", (row['id'],))
+        return self.get(row['id'])
+
+    def append_result(self, job_id, seq, record):
+        """Store one record produced by a running job."""
+        with self._lock, self._conn:
+            self._conn.execute("INSERT INTO job_results (job_id, seq, record) VALUES (?, ?, ?)",
+                               (job_id, seq, json.dumps(record, default=str)))
+
+    def complete(self, job_id):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE jobs SET status = ?, error = NULL, finished_at = ? WHERE id = ?",
+                               (DONE, datetime.now().isoformat(), job_id))
+
+    def fail(self, job_id, error, retry=True):
+        """
+        Record a failed attempt; the job is requeued with backoff while attempts remain.
+
+        Returns:
+            bool: True if the job will be retried
+        """
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT attempts, max_attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            retry = retry and row['attempts'] < row['max_attempts']
+            if retry:
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, run_after = ? WHERE id = ?",
+                    (QUEUED, error, time.time() + self.retry_backoff * 2 ** (row['attempts'] - 1), job_id)
+                )
+            else:
+                self._conn.execute("UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                                   (FAILED, error, datetime.now().isoformat(), job_id))
+        return retry
+
+    def get(self, job_id):
+        """
+        Return a job's state, or None if it does not exist.
+
+        Returns:
+            dict: id, kind, params, priority, status, attempts, error, timestamps and result_count
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            count = self._conn.execute("SELECT COUNT(*) FROM job_results WHERE job_id = ?", (job_id,)).fetchone()[0]
+
+        return {
+            'id': row['id'],
+            'kind': row['kind'],
+            'params': json.loads(row['params']),
+            'priority': row['priority'],
+            'status': row['status'],
+            'attempts': row['attempts'],
+            'max_attempts': row['max_attempts'],
+            'error': row['error'],
+            'created_at': row['created_at'],
+            'started_at': row['started_at'],
+            'finished_at': row['finished_at'],
+            'result_count': count,
+        }
+
+    def results(self, job_id, after=0):
+        """
+        Return the records a job has produced so far.
+
+        Args:
+            job_id (str): Job to read
+            after (int): Only records with a sequence number above this (for incremental polling)
+
+        Returns:
+            list: (seq, record) tuples in order
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, record FROM job_results WHERE job_id = ? AND seq > ? ORDER BY seq", (job_id, after)
+            ).fetchall()
+        return [(row['seq'], json.loads(row['record'])) for row in rows]
+
+    def stats(self):
+        """
+        Report the number of jobs per state.
+
+        Returns:
+            dict: Counts of queued, running, done and failed jobs
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0, **{status: count for status, count in rows}}
+
+
+class JobWorkerPool:
+    def __init__(self, job_queue, handlers, workers=2, poll_interval=0.5):
+        """
+        Configure the workers (call start() to run them).
+
+        Args:
+            job_queue (JobQueue): Queue to take jobs from
+            handlers (dict): Job kind -> handler(params, emit); the handler calls
+                emit(record) for every result record it produces
+            workers (int): Number of jobs run at the same time
+            poll_interval (float): Seconds an idle worker waits before checking the queue again
+        """
+        self.job_queue = job_queue
+        self.handlers = handlers
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join()
+
+    def notify(self):
+        """Wake idle workers (call after submitting a job)."""
+        self._wakeup.set()
+
+    def _work(self):
+        while not self._stopped.is_set():
+            job = self.job_queue.claim()
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            self._run(job)
+
+    def _run(self, job):
+        seq = 0
+
+        def emit(record):
+            nonlocal seq
+            seq += 1
+            self.job_queue.append_result(job['id'], seq, record)
+
+        handler = self.handlers.get(job['kind'])
+        try:
+            if handler is None:
+                raise PermanentJobError(f"Unknown job kind: {job['kind']}")
+            handler(job['params'], emit)
+        except PermanentJobError as e:
+            self.job_queue.fail(job['id'], str(e), retry=False)
+        except Exception as e:
+            if self.job_queue.fail(job['id'], str(e) or type(e).__name__):
+                print(f"⚠️  Job {job['id']} failed ({e}), will retry")
+        else:
+            self.job_queue.complete(job['id'])
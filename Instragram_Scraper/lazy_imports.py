@@ -0,0 +1,43 @@
+"""
+Lazy Imports
+
+Defers importing heavy modules until one of their attributes is first used.
+instaloader alone (with requests and urllib3) takes most of a CLI's start-up
+time. Deferring it lets scripts print at once, and code paths that never
+reach Instagram never pay for it.
+"""
+
+import importlib
+import importlib.util
+import sys
+import types
+
+
+class LazyModule(types.ModuleType):
+    """Stand-in for a module that imports it on first attribute access."""
+
+    def __getattr__(self, attr):
+        # importlib's per-module locks make the first import thread-safe
+        module = importlib.import_module(self.__name__)
+        # Later lookups find the attributes here without going through __getattr__
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+
+def lazy_import(name, optional=False):
+    """
+    Return a module that is only imported when one of its attributes is used.
+
+    Args:
+        name (str): Module name, e.g. 'instaloader'
+        optional (bool): Return None if the module is not installed (checked
+            without importing it)
+
+    Returns:
+        module: The module itself if it was already imported, else a LazyModule
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    if optional and importlib.util.find_spec(name) is None:
+        return None
+    return LazyModule(name)
@@ -0,0 +1,179 @@
+"""
+Loader Pool
+
+A thread-safe pool of pre-authenticated instaloader objects. Loaders are
+created once at startup and leased per request, so a request never has to
+read the session file or log in again. A loader whose session has expired
+is evicted and replaced by a freshly logged-in one in the background. If the
+re-login fails for good (bad credentials, 2FA), the slot stays empty and is
+reported as dead in stats().
+"""
+
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+import instaloader
+
+from instrumentation import span
+
+# Exceptions that mean the session behind a loader is no longer usable
+SESSION_ERRORS = (
+    instaloader.exceptions.LoginRequiredException,
+    instaloader.exceptions.AbortDownloadException,
+)
+
+# Login errors that retrying cannot fix (wrong password, 2FA needs a human)
+PERMANENT_LOGIN_ERRORS = (
+    instaloader.exceptions.BadCredentialsException,
+    instaloader.exceptions.TwoFactorAuthRequiredException,
+)
+
+
+class PoolTimeout(Exception):
+    """Raised when no loader becomes available within the lease timeout."""
+
+
+class _PooledLoader:
+    def __init__(self, loader):
+        self.loader = loader
+        self.created_at = time.monotonic()
+        self.invalid = False
+
+    def invalidate(self):
+        """Mark this loader's session as expired so it is replaced on release."""
+        self.invalid = True
+
+
+class LoaderPool:
+    def __init__(self, factory, size=4, max_session_age=None, relogin_backoff=30):
+        """
+        Initialize the pool (call fill() to create the loaders).
+
+        Args:
+            factory (callable): factory(force_login=False) returning an authenticated Instaloader
+            size (int): Number of loaders kept in the pool
+            max_session_age (float): Seconds after which a loader is recreated on its next lease (None = never)
+            relogin_backoff (float): Seconds to wait before retrying a failed re-login
+        """
+        self.factory = factory
+        self.size = size
+        self.max_session_age = max_session_age
+        self.relogin_backoff = relogin_backoff
+
+        # LIFO keeps the most recently used (warm) sessions in rotation
+        self._available = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._leases = 0
+        self._evictions = 0
+        self._relogins = 0
+        self._dead = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def fill(self):
+        """Create loaders until the pool holds `size` of them."""
+        while self._created < self.size:
+            # Created one at a time so only the first one may need a fresh login
+            self._available.put(_PooledLoader(self.factory()))
+            with self._lock:
+                self._created += 1
+        return self
+
+    @contextmanager
+    def lease(self, timeout=None):
+        """
+        Lease a loader for the duration of a `with` block.
+
+        The yielded lease exposes `.loader` and `.invalidate()`. A loader is
+        also invalidated automatically when a session error escapes the block.
+
+        Args:
+            timeout (float): Seconds to wait for a free loader (None = wait forever)
+
+        Raises:
+            PoolTimeout: If no loader is released within the timeout, or at
+                once if every slot failed to log in for good
+        """
+        with self._lock:
+            if self._dead >= self.size:
+                raise PoolTimeout("No Instagram session can log in (check the credentials)")
+        started = time.monotonic()
+        try:
+            with span('session_lease'):
+                pooled = self._available.get(timeout=timeout)
+        except queue.Empty:
+            raise PoolTimeout(f"No Instagram session available after {timeout}s") from None
+        waited = time.monotonic() - started
+
+        with self._lock:
+            self._leases += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+
+        if self.max_session_age and time.monotonic() - pooled.created_at > self.max_session_age:
+            pooled.invalidate()
+            self._release(pooled)
+            with self.lease(timeout) as fresh:
+                yield fresh
+            return
+
+        try:
+            yield pooled
+        except SESSION_ERRORS:
+            pooled.invalidate()
+            raise
+        finally:
+            self._release(pooled)
+
+    def _release(self, pooled):
+        if not pooled.invalid:
+            self._available.put(pooled)
+            return
+
+        with self._lock:
+            self._evictions += 1
+        threading.Thread(target=self._replace, daemon=True).start()
+
+    def _replace(self):
+        """Log in again and put the new loader back (runs in the background)."""
+        while True:
+            try:
+                loader = self.factory(force_login=True)
+                break
+            except PERMANENT_LOGIN_ERRORS as e:
+                print(f"Re-login failed, not retrying: {e}")
+                with self._lock:
+                    self._dead += 1
+                return
+            except Exception as e:
+                print(f"Re-login failed, retrying in {self.relogin_backoff}s: {e}")
+                time.sleep(self.relogin_backoff)
+
+        with self._lock:
+            self._relogins += 1
+        self._available.put(_PooledLoader(loader))
+
+    def stats(self):
+        """
+        Report pool usage so the pool size can be tuned.
+
+        Returns:
+            dict: Pool size, availability, dead slots (permanent login failures),
+            lease counts and wait times
+        """
+        with self._lock:
+            available = self._available.qsize()
+            return {
+                'size': self.size,
+                'available': available,
+                'in_use': self._created - available - self._dead,
+                'dead': self._dead,
+                'leases': self._leases,
+                'evictions': self._evictions,
+                'relogins': self._relogins,
+                'wait_time_avg_ms': round(self._wait_total / self._leases * 1000, 2) if self._leases else 0,
+                'wait_time_max_ms': round(self._wait_max * 1000, 2),
+            }
@@ -4,111 +4,63 @@ Posts Analytics - Simplified Version
 A cleaner version focused on getting likes and comments from recent posts.
 """
 
-from instagram_scraper import InstagramFollowerScraper
-import instaloader
+from instagram_scraper import get_scraper
 import sys
-from datetime import datetime
+from itertools import islice
+from response_cache import get_response_cache
+from snapshot_store import SnapshotStore, sync_posts
+from records import ProfileRecord, PostRecord
+from engagement import EngagementAggregator, engagement_stats
+from lazy_imports import lazy_import
+
+# Imported on first network use (see lazy_imports.py)
+instaloader = lazy_import('instaloader')
 
 def get_basic_profile_data(profile):
     """Extract basic profile information."""
-    return {
-        'username': profile.username,
-        'full_name': profile.full_name,
-        'followers': profile.followers,
-        'following': profile.followees,
-        'total_posts': profile.mediacount,
-        'is_private': profile.is_private,
-        'is_verified': profile.is_verified,
-        'timestamp': datetime.now().isoformat()
-    }
+    return ProfileRecord.from_profile(profile, details=False).to_dict(details=False)
 
 def analyze_single_post(post, post_number):
     """Analyze a single Instagram post."""
-    return {
-        'post_number': post_number,
-        'shortcode': post.shortcode,
-        'url': f"https://www.instagram.com/p/{post.shortcode}/",
-        'date': post.date.isoformat()[:10],  # Just the date part
-        'likes': post.likes,
-        'comments': post.comments,
-        'is_video': post.is_video,
-        'caption_preview': post.caption[:100] + "..." if post.caption and len(post.caption) > 100 else (post.caption or "")
-    }
+    return PostRecord.from_post(post, post_number, caption_limit=100).to_report_dict()
+
+def iter_posts_data(profile, num_posts=None):
+    """
+    Yield analyze_single_post() results for a profile's posts, newest first.
+
+    Args:
+        profile (instaloader.Profile): Profile whose posts to read
+        num_posts (int): Maximum number of posts (None = all)
+    """
+    # islice stops without asking the iterator for one more post (which could cost a page request)
+    for i, post in enumerate(islice(profile.get_posts(), num_posts)):
+        yield analyze_single_post(post, i + 1)
+
+def analyze_stored_post(record, post_number):
+    """Shape a post record from the snapshot store like analyze_single_post()."""
+    return PostRecord.from_fields(record, post_number).to_report_dict()
 
 def calculate_engagement_stats(posts_data, followers):
-    """Calculate engagement statistics."""
-    if not posts_data:
-        return {}
-
-    total_likes = sum(post['likes'] for post in posts_data)
-    total_comments = sum(post['comments'] for post in posts_data)
-    post_count = len(posts_data)
-
-    avg_likes = total_likes / post_count
-    avg_comments = total_comments / post_count
-
-    # Calculate engagement rate (likes + comments) / followers
-    engagement_rate = 0
-    if followers > 0:
-        total_engagement = total_likes + total_comments
-        engagement_rate = (total_engagement / post_count) / followers * 100
-
-    return {
-        'total_likes': total_likes,
-        'total_comments': total_comments,
-        'average_likes': round(avg_likes, 1),
-        'average_comments': round(avg_comments, 1),
-        'engagement_rate': round(engagement_rate, 2)
-    }
+    """Calculate engagement statistics of a list of posts (streams use EngagementAggregator)."""
+    return engagement_stats(sum(post['likes'] for post in posts_data),
+                            sum(post['comments'] for post in posts_data),
+                            len(posts_data), followers)
 
-def scrape_posts_analytics(username, num_posts=3):
+def scrape_posts_analytics(username, num_posts=3, store=None):
     """
     Main function to scrape Instagram posts analytics.
 
     Args:
         username (str): Instagram username
         num_posts (int): Number of recent posts to analyze
+        store (SnapshotStore): Optional snapshot store; only posts published
+            since the last run are fetched, the rest is read from the store
 
     Returns:
         dict: Complete analytics data
     """
     try:
-        # Initialize scraper
-        scraper = InstagramFollowerScraper()
-        loader = scraper.loader
-
-        # Get profile
-        print(f"📊 Getting profile data for @{username}...")
-        profile = instaloader.Profile.from_username(loader.context, username)
-
-        # Basic profile data
-        profile_data = get_basic_profile_data(profile)
-
-        if profile.is_private:
-            print("⚠️  This is a private account. Post data may be limited.")
-            return {**profile_data, 'posts': [], 'engagement_stats': {}}
-
-        # Get recent posts
-        print(f"📱 Analyzing {num_posts} recent posts...")
-        posts = profile.get_posts()
-        posts_data = []
-
-        for i, post in enumerate(posts):
-            if i >= num_posts:
-                break
-
-            print(f"  ⏳ Post {i+1}/{num_posts}...")
-            post_data = analyze_single_post(post, i + 1)
-            posts_data.append(post_data)
-
-        # Calculate engagement statistics
-        engagement_stats = calculate_engagement_stats(posts_data, profile.followers)
-
-        return {
-            **profile_data,
-            'posts': posts_data,
-            'engagement_stats': engagement_stats
-        }
+        return lookup_posts_analytics(username, num_posts, store)
 
     except instaloader.exceptions.ProfileNotExistsException:
         print(f"❌ Profile '{username}' not found")
@@ -120,6 +72,58 @@ def scrape_posts_analytics(username, num_posts=3):
         print(f"❌ Error: {e}")
         return None
 
+def lookup_posts_analytics(username, num_posts=3, store=None):
+    """Like scrape_posts_analytics(), but raises instead of printing errors."""
+    return get_response_cache().get_or_fetch(
+        ('posts_analytics', username.lower(), num_posts),
+        lambda: _fetch_posts_analytics(username, num_posts, store)
+    )
+
+def _fetch_posts_analytics(username, num_posts, store=None):
+    """Fetch posts analytics from Instagram, bypassing the cache."""
+    # One scraper (and session) per process
+    loader = get_scraper().loader
+
+    # Get profile
+    print(f"📊 Getting profile data for @{username}...")
+    profile = instaloader.Profile.from_username(loader.context, username)
+
+    # Basic profile data
+    profile_data = get_basic_profile_data(profile)
+
+    if profile.is_private:
+        print("⚠️  This is a private account. Post data may be limited.")
+        return {**profile_data, 'posts': [], 'engagement_stats': {}}
+
+    # Get recent posts
+    print(f"📱 Analyzing {num_posts} recent posts...")
+    posts_data = []
+    # Engagement statistics are updated as each post arrives
+    aggregator = EngagementAggregator()
+
+    if store is not None:
+        # Only the delta since the last run is fetched; the rest comes from the store
+        sync_stats = sync_posts(store, profile, depth=num_posts)
+        print(f"  🗄️  {sync_stats['new_posts']} new, {sync_stats['refreshed_posts']} refreshed posts")
+        for i, record in enumerate(store.get_posts(profile.username, num_posts)):
+            post_data = analyze_stored_post(record, i + 1)
+            posts_data.append(post_data)
+            aggregator.add_post(post_data)
+    else:
+        for post_data in iter_posts_data(profile, num_posts):
+            print(f"  ⏳ Post {post_data['post_number']}/{num_posts}")
+            posts_data.append(post_data)
+            aggregator.add_post(post_data)
+
+    data = {
+        **profile_data,
+        'posts': posts_data,
+        'engagement_stats': aggregator.stats(profile.followers)
+    }
+    if store is not None:
+        store.save_profile(profile.username, data)
+    return data
+
 def display_results(data):
     """Display the analytics results in a clean format."""
     if not data:
@@ -201,9 +205,13 @@ def main():
     print("="*30)
     print("Get likes & comments for recent posts\n")
 
+    # --store keeps snapshots so later runs only fetch new posts
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    store = SnapshotStore() if '--store' in sys.argv else None
+
     # Get username
-    if len(sys.argv) > 1:
-        username = sys.argv[1].lstrip('@')
+    if args:
+        username = args[0].lstrip('@')
     else:
         username = input("Enter username: ").strip().lstrip('@')
         if not username:
@@ -214,13 +222,13 @@ def main():
     try:
         num_posts = input("Posts to analyze (1-10, default 3): ").strip()
         num_posts = int(num_posts) if num_posts else 3
-        num_posts = max(1, min(10, num_posts))  # Clamp between 1-10
+        num_posts = max(1, min(10, num_posts))  # Clamp between 1-10 (resumable_crawl.py handles full histories)
     except ValueError:
         num_posts = 3
 
     # Scrape data
     print(f"\n🔍 Analyzing @{username}...")
-    data = scrape_posts_analytics(username, num_posts)
+    data = scrape_posts_analytics(username, num_posts, store)
 
     if data:
         display_results(data)
@@ -0,0 +1,344 @@
+"""
+Rate Limiter
+
+A global rate controller shared by all scrapers. Every Instagram request
+waits for a token from its session's token bucket. The bucket's rate adapts
+to Instagram's answers: it creeps up while requests succeed and is cut in
+half (plus an exponential cooldown) on 429/401 responses, so each session
+settles near the highest rate that does not get it blocked. Waiting
+requests are served in priority order, so interactive lookups can jump
+ahead of batch jobs.
+"""
+
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from instrumentation import instrument_context, span
+from lazy_imports import lazy_import
+from transport import add_response_hook
+
+# Imported on first use, so importing the limiter stays cheap for CLI start-up
+asyncio = lazy_import('asyncio')
+instaloader = lazy_import('instaloader')
+
+# Request priorities (lower runs first)
+HIGH = 0
+NORMAL = 5
+LOW = 10
+
+# Status codes Instagram uses to tell us to slow down
+THROTTLE_STATUS_CODES = (401, 429)
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        """
+        Args:
+            rate (float): Tokens added per second
+            capacity (float): Maximum burst size
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now):
+        """Seconds until a token is available (0 if one is available now)."""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+
+class _SessionState:
+    def __init__(self, rate, burst, backoff):
+        self.bucket = TokenBucket(rate, burst)
+        self.blocked_until = 0.0
+        self.backoff = backoff
+        self.waiters = []
+        self.requests = 0
+        self.throttles = 0
+        self.wait_total = 0.0
+
+
+class RateLimiter:
+    def __init__(self, rate=0.5, burst=5, min_rate=0.02, max_rate=3.0,
+                 increase_step=0.01, decrease_factor=0.5, base_backoff=30, max_backoff=900):
+        """
+        Initialize the limiter.
+
+        Args:
+            rate (float): Starting requests per second for each session
+            burst (int): Requests a session may send back-to-back
+            min_rate (float): Lowest rate backoff can reduce a session to
+            max_rate (float): Highest rate a session may climb to
+            increase_step (float): Requests/second added after each successful request
+            decrease_factor (float): Rate multiplier applied on a 429/401
+            base_backoff (float): Seconds a session pauses after its first throttle
+            max_backoff (float): Upper bound for the exponential pause
+        """
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self._sessions = {}
+        self._cond = threading.Condition()
+        self._sequence = itertools.count()
+        self._local = threading.local()
+
+    def _session(self, key):
+        state = self._sessions.get(key)
+        if state is None:
+            state = self._sessions[key] = _SessionState(self.rate, self.burst, self.base_backoff)
+        return state
+
+    def _reserve(self, key, state, now, take=True):
+        """
+        Take a token if the session may send now (called with the lock held).
+
+        Returns:
+            float: 0 if a token is available (and was taken, with take=True),
+            otherwise seconds to wait
+        """
+        wait = max(state.blocked_until - now, state.bucket.wait_time(now))
+        if wait <= 0 and take:
+            state.bucket.take()
+        return wait
+
+    def _reserve_locked(self, key, state, now, take=True):
+        """Call _reserve() from acquire() or try_acquire(), which hold the lock (subclasses may release it)."""
+        return self._reserve(key, state, now, take)
+
+    @contextmanager
+    def priority(self, level):
+        """Run the requests made by this thread inside the block at the given priority."""
+        previous = getattr(self._local, 'priority', NORMAL)
+        self._local.priority = level
+        try:
+            yield
+        finally:
+            self._local.priority = previous
+
+    def acquire(self, key='anonymous', priority=None):
+        """
+        Block until the session may send its next request.
+
+        Args:
+            key (str): Session identifier (usually the logged-in username)
+            priority (int): HIGH, NORMAL or LOW (default: the thread's current priority)
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        if priority is None:
+            priority = getattr(self._local, 'priority', NORMAL)
+        started = time.monotonic()
+
+        with self._cond:
+            state = self._session(key)
+            ticket = (priority, next(self._sequence))
+            heapq.heappush(state.waiters, ticket)
+
+            while True:
+                now = time.monotonic()
+                if state.waiters[0] != ticket:
+                    self._cond.wait()
+                    continue
+
+                wait = self._reserve_locked(key, state, now)
+                if wait <= 0:
+                    # Not always the head any more: _reserve_locked() may release the lock
+                    state.waiters.remove(ticket)
+                    heapq.heapify(state.waiters)
+                    state.requests += 1
+                    waited = now - started
+                    state.wait_total += waited
+                    self._cond.notify_all()
+                    return waited
+
+                self._cond.wait(wait)
+
+    def try_acquire(self, key='anonymous'):
+        """
+        Take a token without blocking.
+
+        Args:
+            key (str): Session identifier
+
+        Returns:
+            float: 0 if a token was taken, otherwise seconds to wait before retrying
+        """
+        with self._cond:
+            state = self._session(key)
+            # Blocking callers already queued for this session go first
+            queued = bool(state.waiters)
+            wait = self._reserve_locked(key, state, time.monotonic(), take=not queued)
+            if wait > 0 or queued:
+                return max(wait, 0.01)
+            state.requests += 1
+            return 0.0
+
+    async def acquire_async(self, key='anonymous'):
+        """
+        Asyncio counterpart of acquire(); waits without blocking the event loop.
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        started = time.monotonic()
+        while True:
+            wait = self.try_acquire(key)
+            if not wait:
+                waited = time.monotonic() - started
+                with self._cond:
+                    self._session(key).wait_total += waited
+                return waited
+            await asyncio.sleep(wait)
+
+    def record_success(self, key='anonymous'):
+        """Additively increase the session's rate after a successful request."""
+        with self._cond:
+            state = self._session(key)
+            state.bucket.rate = min(self.max_rate, state.bucket.rate + self.increase_step)
+            state.backoff = self.base_backoff
+
+    def record_throttle(self, key='anonymous'):
+        """Halve the session's rate and pause it after a 429/401 response."""
+        with self._cond:
+            state = self._session(key)
+            state.throttles += 1
+            state.bucket.rate = max(self.min_rate, state.bucket.rate * self.decrease_factor)
+            state.bucket.tokens = min(state.bucket.tokens, 0)
+            state.blocked_until = time.monotonic() + state.backoff
+            state.backoff = min(self.max_backoff, state.backoff * 2)
+            self._cond.notify_all()
+
+    def observe(self, key, response):
+        """
+        Feed an HTTP response back into the limiter.
+
+        Args:
+            key (str): Session identifier
+            response (requests.Response): Response received from Instagram
+        """
+        redirected_to_login = response.is_redirect and 'accounts/login' in response.headers.get('location', '')
+        self.observe_status(key, 401 if redirected_to_login else response.status_code)
+
+    def observe_status(self, key, status_code):
+        """Feed a bare HTTP status code back into the limiter (for non-requests clients)."""
+        if status_code in THROTTLE_STATUS_CODES:
+            self.record_throttle(key)
+        elif status_code < 400:
+            self.record_success(key)
+
+    def stats(self):
+        """
+        Report the current state of every session.
+
+        Returns:
+            dict: Per-session rate, queue length, request and throttle counts
+        """
+        with self._cond:
+            now = time.monotonic()
+            return {
+                key: {
+                    'rate_per_second': round(state.bucket.rate, 3),
+                    'queued': len(state.waiters),
+                    'blocked_for_seconds': round(max(0.0, state.blocked_until - now), 1),
+                    'requests': state.requests,
+                    'throttles': state.throttles,
+                    'wait_time_avg_ms': round(state.wait_total / state.requests * 1000, 2) if state.requests else 0,
+                }
+                for key, state in self._sessions.items()
+            }
+
+
+def session_key(context):
+    """Identify the session behind an instaloader context."""
+    return context.username or 'anonymous'
+
+
+class LimiterRateController:
+    """
+    instaloader RateController that defers all pacing to a RateLimiter.
+
+    It implements the two methods InstaloaderContext calls (wait_before_query
+    and handle_429) instead of subclassing instaloader.RateController, so
+    defining it does not import instaloader.
+    """
+
+    def __init__(self, context, limiter):
+        self._context = context
+        self._limiter = limiter
+
+    def wait_before_query(self, query_type):
+        with span('rate_limit_wait'):
+            self._limiter.acquire(session_key(self._context))
+
+    def handle_429(self, query_type):
+        # The response hook has already backed the session off;
+        # the retry waits for the pause to end in wait_before_query().
+        self._context.error("Instagram responded with 429 Too Many Requests, backing off.", repeat_at_end=False)
+
+
+def rate_limited_loader(limiter=None, **kwargs):
+    """
+    Build an Instaloader whose requests all go through the rate limiter.
+    With HTTP_CACHE_DB set, its responses are also cached on disk (see http_cache.py).
+
+    Args:
+        limiter (RateLimiter): Limiter to use (default: the shared one)
+        **kwargs: Passed on to instaloader.Instaloader
+
+    Returns:
+        instaloader.Instaloader: The configured loader
+    """
+    limiter = limiter or get_rate_limiter()
+    loader = instaloader.Instaloader(rate_controller=lambda context: LimiterRateController(context, limiter), **kwargs)
+    context = loader.context
+    add_response_hook(context, lambda response, *args, **kw: limiter.observe(session_key(context), response))
+    instrument_context(context)
+    if os.getenv('HTTP_CACHE_DB'):
+        from http_cache import get_http_cache, install_http_cache
+        install_http_cache(context, get_http_cache())
+    return loader
+
+
+_default_limiter = None
+_default_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """
+    Return the process-wide limiter shared by all scrapers.
+    Rates can be tuned with RATE_LIMIT_* environment variables. With
+    SHARED_STATE_DB set, the buckets are shared with other processes (see shared_state.py).
+    """
+    global _default_limiter
+    with _default_limiter_lock:
+        if _default_limiter is None:
+            settings = dict(
+                rate=float(os.getenv('RATE_LIMIT_RPS', 0.5)),
+                burst=int(os.getenv('RATE_LIMIT_BURST', 5)),
+                max_rate=float(os.getenv('RATE_LIMIT_MAX_RPS', 3.0)),
+            )
+            if os.getenv('SHARED_STATE_DB'):
+                from shared_state import SharedRateLimiter
+                _default_limiter = SharedRateLimiter(**settings)
+            else:
+                _default_limiter = RateLimiter(**settings)
+    return _default_limiter
@@ -0,0 +1,252 @@
+"""
+Profile and Post Records
+
+Compact record types shared by all scrapers. A record keeps only the raw
+values (counters, flags, a numeric timestamp, the caption); derived fields
+such as the post URL, the date string, caption previews and hashtags are
+computed when the record is converted at the output edge. With __slots__ and
+no per-record dict, a cached post takes a fraction of the memory of the
+equivalent output dict.
+
+Each output shape the scrapers have always returned has its own conversion
+method, so the JSON they produce is unchanged.
+"""
+
+import calendar
+import sys
+import time
+from datetime import datetime
+
+from graphql_nodes import (caption_hashtags, node_caption, node_comments, node_likes, node_location_name,
+                           post_url, profile_counts)
+
+
+class ProfileRecord:
+    __slots__ = ('username', 'full_name', 'followers', 'following', 'post_count', 'is_private',
+                 'is_verified', 'biography', 'external_url', 'fetched_at', 'posts')
+
+    def __init__(self, username, full_name, followers, following, post_count, is_private=False,
+                 is_verified=False, biography=None, external_url=None, fetched_at=None, posts=None):
+        self.username = username
+        self.full_name = full_name
+        self.followers = followers
+        self.following = following
+        self.post_count = post_count
+        self.is_private = is_private
+        self.is_verified = is_verified
+        self.biography = biography
+        self.external_url = external_url
+        self.fetched_at = fetched_at if fetched_at is not None else time.time()
+        self.posts = posts
+
+    @classmethod
+    def from_profile(cls, profile, details=True):
+        """
+        Read a record from an instaloader Profile.
+
+        Args:
+            profile (instaloader.Profile): Profile to read
+            details (bool): Also read the biography and external URL
+        """
+        return cls(
+            profile.username,
+            profile.full_name,
+            profile.followers,
+            profile.followees,
+            profile.mediacount,
+            profile.is_private,
+            profile.is_verified,
+            profile.biography if details else None,
+            profile.external_url if details else None,
+        )
+
+    @classmethod
+    def from_node(cls, user, details=True):
+        """Read a record from a web_profile_info user node (see graphql_nodes)."""
+        counts = profile_counts(user)
+        return cls(
+            user['username'].lower(),
+            user['full_name'],
+            counts['followers'],
+            counts['following'],
+            counts['total_posts'],
+            user['is_private'],
+            user['is_verified'],
+            user['biography'] if details else None,
+            user['external_url'] if details else None,
+        )
+
+    @property
+    def timestamp(self):
+        """When the profile was fetched, as an ISO string (local time)."""
+        return datetime.fromtimestamp(self.fetched_at).isoformat()
+
+    def with_posts(self, posts):
+        """Copy of the record holding the given posts."""
+        return ProfileRecord(self.username, self.full_name, self.followers, self.following, self.post_count,
+                             self.is_private, self.is_verified, self.biography, self.external_url,
+                             self.fetched_at, posts)
+
+    def estimated_size(self):
+        """Approximate memory footprint in bytes, posts included (used by the response cache)."""
+        size = sys.getsizeof(self) + sum(sys.getsizeof(getattr(self, name)) for name in self.__slots__[:-1])
+        if self.posts is not None:
+            size += sys.getsizeof(self.posts) + sum(post.estimated_size() for post in self.posts)
+        return size
+
+    def to_dict(self, posts_key='total_posts', details=True):
+        """
+        Convert to the profile dict the scrapers return.
+
+        Args:
+            posts_key (str): Key of the post count ('posts' in follower data,
+                'total_posts' everywhere else)
+            details (bool): Include biography and external_url
+
+        Returns:
+            dict: Profile fields (the posts themselves are not included)
+        """
+        data = {
+            'username': self.username,
+            'full_name': self.full_name,
+            'followers': self.followers,
+            'following': self.following,
+            posts_key: self.post_count,
+            'is_private': self.is_private,
+            'is_verified': self.is_verified,
+        }
+        if details:
+            data['biography'] = self.biography
+            data['external_url'] = self.external_url
+        data['timestamp'] = self.timestamp
+        return data
+
+    def to_api_dict(self):
+        """Profile plus its posts, as returned by the API server's scrape_full_profile()."""
+        data = self.to_dict(details=False)
+        if self.posts is not None:
+            data['posts'] = [post.to_api_dict() for post in self.posts]
+        return data
+
+
+class PostRecord:
+    __slots__ = ('shortcode', 'taken_at', 'likes', 'comments', 'is_video', 'caption', 'location', 'post_number')
+
+    def __init__(self, shortcode, taken_at, likes, comments, is_video, caption=None, location=None,
+                 post_number=None):
+        self.shortcode = shortcode
+        self.taken_at = taken_at
+        self.likes = likes
+        self.comments = comments
+        self.is_video = is_video
+        self.caption = caption
+        self.location = location
+        self.post_number = post_number
+
+    @classmethod
+    def from_post(cls, post, post_number=None, caption_limit=None, with_location=False):
+        """
+        Read a record from an instaloader Post.
+
+        Args:
+            post (instaloader.Post): Post to read (lazy properties may trigger requests)
+            post_number (int): Position of the post in the analyzed list
+            caption_limit (int): Keep only enough of the caption for previews of
+                this length (None = the whole caption, e.g. for hashtags)
+            with_location (bool): Also read the location name (may cost a request)
+        """
+        caption = post.caption
+        if caption and caption_limit is not None:
+            # One extra character tells previews whether the caption was cut
+            caption = caption[:caption_limit + 1]
+        location = None
+        if with_location:
+            location = post.location.name if post.location else None
+        return cls(post.shortcode, calendar.timegm(post.date_utc.timetuple()), post.likes, post.comments,
+                   post.is_video, caption, location, post_number)
+
+    @classmethod
+    def from_node(cls, node, post_number=None, caption_limit=None):
+        """Read a record from a timeline post node (see graphql_nodes)."""
+        caption = node_caption(node)
+        if caption and caption_limit is not None:
+            caption = caption[:caption_limit + 1]
+        return cls(node['shortcode'], node.get('taken_at_timestamp') or node['date'], node_likes(node),
+                   node_comments(node), node['is_video'], caption, node_location_name(node), post_number)
+
+    @classmethod
+    def from_fields(cls, fields, post_number=None):
+        """
+        Build a record from post fields (graphql_nodes.post_fields() or a snapshot-store
+        record, whose 'date' is a UTC datetime or ISO string).
+        """
+        date = fields['date']
+        if isinstance(date, str):
+            date = datetime.fromisoformat(date)
+        return cls(fields['shortcode'], calendar.timegm(date.timetuple()), fields['likes'], fields['comments'],
+                   fields['is_video'], fields.get('caption'), fields.get('location'), post_number)
+
+    def estimated_size(self):
+        """Approximate memory footprint in bytes."""
+        return sys.getsizeof(self) + sum(sys.getsizeof(getattr(self, name)) for name in self.__slots__)
+
+    @property
+    def url(self):
+        return post_url(self.shortcode)
+
+    @property
+    def date(self):
+        """Creation time (UTC), like instaloader's Post.date."""
+        return datetime.utcfromtimestamp(self.taken_at)
+
+    @property
+    def caption_hashtags(self):
+        return caption_hashtags(self.caption)
+
+    def caption_preview(self, limit):
+        """The caption cut to `limit` characters, with '...' if it was longer (None stays None)."""
+        caption = self.caption
+        return caption[:limit] + "..." if caption and len(caption) > limit else caption
+
+    def to_api_dict(self):
+        """
+        Post dict of the API server (scrape_full_profile, streams and jobs).
+        The date is a datetime.date, written as YYYY-MM-DD by the serializers.
+        """
+        return {
+            'shortcode': self.shortcode,
+            'url': self.url,
+            'likes': self.likes,
+            'comments': self.comments,
+            'caption': self.caption[:100] if self.caption else "",
+            'is_video': self.is_video,
+            'date': self.date.date()
+        }
+
+    def to_analytics_dict(self):
+        """Post dict of get_post_analytics()['posts_analyzed']."""
+        return {
+            'post_number': self.post_number,
+            'shortcode': self.shortcode,
+            'url': self.url,
+            'date': self.date.isoformat(),
+            'likes': self.likes,
+            'comments': self.comments,
+            'is_video': self.is_video,
+            'caption': self.caption_preview(200),
+            'caption_hashtags': self.caption_hashtags,
+            'location': self.location
+        }
+
+    def to_report_dict(self):
+        """Post dict of posts_analytics.py reports."""
+        return {
+            'post_number': self.post_number,
+            'shortcode': self.shortcode,
+            'url': self.url,
+            'date': self.date.isoformat()[:10],
+            'likes': self.likes,
+            'comments': self.comments,
+            'is_video': self.is_video,
+            'caption_preview': self.caption_preview(100) or ""
+        }
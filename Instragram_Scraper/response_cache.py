@@ -0,0 +1,195 @@
+"""
+Response Cache
+
+A shared TTL + LRU cache for profile and post lookups. Entries past their
+TTL are still served for a grace period (stale-while-revalidate) while a
+background thread fetches a fresh copy, so hot accounts are answered from
+memory without ever waiting on Instagram.
+
+Callers get their own copy of a cached dict or list, so changing a returned
+value never changes the cache or another caller's result. Records (see
+records.py) are read-only and are shared as they are.
+"""
+
+import copy
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class _Entry:
+    __slots__ = ('value', 'size', 'fetched_at', 'ttl', 'refreshing')
+
+    def __init__(self, value, size, ttl):
+        self.value = value
+        self.size = size
+        self.fetched_at = time.monotonic()
+        self.ttl = ttl
+        self.refreshing = False
+
+
+def _is_cacheable(value):
+    """Failed lookups (None or an error dict) are never cached."""
+    if value is None:
+        return False
+    return not (isinstance(value, dict) and 'error' in value)
+
+
+def detached(value):
+    """Copy of a value for one caller (records are read-only and returned as they are)."""
+    if isinstance(value, (dict, list)):
+        return copy.deepcopy(value)
+    return value
+
+
+def _estimate_size(value):
+    """Approximate memory footprint of a cached value in bytes."""
+    if hasattr(value, 'estimated_size'):
+        # Records (see records.py) measure themselves
+        return value.estimated_size()
+    return len(json.dumps(value, default=str))
+
+
+class ResponseCache:
+    def __init__(self, profile_ttl=300, posts_ttl=900, stale_ttl=3600,
+                 max_entries=1024, max_bytes=64 * 1024 * 1024):
+        """
+        Initialize the cache.
+
+        Args:
+            profile_ttl (float): Seconds profile counters stay fresh
+            posts_ttl (float): Seconds post lists stay fresh
+            stale_ttl (float): Extra seconds an expired entry may be served while it is refreshed
+            max_entries (int): Maximum number of cached lookups
+            max_bytes (int): Approximate memory cap for all cached values
+        """
+        self.ttls = {'profile': profile_ttl, 'posts': posts_ttl}
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'evictions': 0, 'refreshes': 0}
+
+    def get_or_fetch(self, key, fetch, kind='posts'):
+        """
+        Return the cached value for `key`, calling `fetch()` on a miss.
+
+        Args:
+            key (tuple): Cache key, e.g. ('followers', username)
+            fetch (callable): Function returning a fresh value
+            kind (str): 'profile' or 'posts', selects the TTL
+
+        Returns:
+            The cached or freshly fetched value (a copy of it if it is a dict or list)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            value = None
+            if entry is not None:
+                age = time.monotonic() - entry.fetched_at
+                if age < entry.ttl:
+                    self._counters['hits'] += 1
+                    self._entries.move_to_end(key)
+                    value = entry.value
+                elif age < entry.ttl + self.stale_ttl:
+                    self._counters['stale_hits'] += 1
+                    self._entries.move_to_end(key)
+                    if not entry.refreshing:
+                        entry.refreshing = True
+                        threading.Thread(target=self._refresh, args=(key, fetch, kind), daemon=True).start()
+                    value = entry.value
+            if value is None:
+                self._counters['misses'] += 1
+
+        if value is not None:
+            return detached(value)
+
+        value = fetch()
+        self.put(key, value, kind)
+        return detached(value)
+
+    def _refresh(self, key, fetch, kind):
+        try:
+            value = fetch()
+        except Exception as e:
+            print(f"Background refresh of {key} failed: {e}")
+            value = None
+
+        if _is_cacheable(value):
+            with self._lock:
+                self._counters['refreshes'] += 1
+            self.put(key, value, kind)
+            return
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.refreshing = False
+
+    def put(self, key, value, kind='posts'):
+        """Store a value, evicting least recently used entries over the limits."""
+        if not _is_cacheable(value):
+            return
+
+        entry = _Entry(value, _estimate_size(value), self.ttls[kind])
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.size
+            self._entries[key] = entry
+            self._bytes += entry.size
+
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self._counters['evictions'] += 1
+
+    def invalidate(self, key):
+        """Drop a single entry."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry.size
+
+    def stats(self):
+        """
+        Report cache counters.
+
+        Returns:
+            dict: Hits, stale hits, misses, evictions, refreshes, entries and bytes
+        """
+        with self._lock:
+            return {**self._counters, 'entries': len(self._entries), 'bytes': self._bytes}
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """
+    Return the process-wide cache shared by all scrapers.
+    Limits can be tuned with CACHE_* environment variables. With
+    SHARED_STATE_DB set, the cache is shared with other processes (see shared_state.py).
+    """
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            limits = dict(
+                profile_ttl=float(os.getenv('CACHE_PROFILE_TTL', 300)),
+                posts_ttl=float(os.getenv('CACHE_POSTS_TTL', 900)),
+                stale_ttl=float(os.getenv('CACHE_STALE_TTL', 3600)),
+                max_entries=int(os.getenv('CACHE_MAX_ENTRIES', 1024)),
+                max_bytes=int(float(os.getenv('CACHE_MAX_MB', 64)) * 1024 * 1024),
+            )
+            if os.getenv('SHARED_STATE_DB'):
+                from shared_state import SharedResponseCache
+                _default_cache = SharedResponseCache(**limits)
+            else:
+                _default_cache = ResponseCache(**limits)
+    return _default_cache
@@ -0,0 +1,237 @@
+"""
+Resumable Post Crawl
+
+Crawls the full post history of a profile and survives crashes, rate-limit
+blocks and network errors. After every page of profile.get_posts(), the
+post records are appended to an NDJSON file and the iterator position
+(instaloader's frozen NodeIterator, which holds the GraphQL end_cursor) is
+saved next to it. Running the crawl again resumes from the last checkpoint
+instead of refetching pages that are already on disk.
+
+Usage:
+    python resumable_crawl.py <username> [max_posts] [--restart]
+"""
+
+import json
+import os
+import shutil
+import sys
+import time
+from datetime import datetime
+
+import instaloader
+from instaloader import FrozenNodeIterator
+
+from graphql_nodes import post_fields
+from streaming import ndjson_line, read_ndjson
+
+DEFAULT_CRAWL_DIRECTORY = 'crawls'
+
+# Errors after which the crawl waits and resumes from its checkpoint
+RETRYABLE_ERRORS = (
+    instaloader.exceptions.ConnectionException,
+    instaloader.exceptions.TooManyRequestsException,
+)
+
+
+class PostCrawl:
+    def __init__(self, username, directory=None):
+        """
+        Open the crawl state of a profile (created on first run).
+
+        Args:
+            username (str): Profile to crawl
+            directory (str): Parent directory of crawl states (default: CRAWL_DIR env variable or ./crawls)
+        """
+        self.username = username.lstrip('@').lower()
+        self.path = os.path.join(directory or os.getenv('CRAWL_DIR', DEFAULT_CRAWL_DIRECTORY), self.username)
+        self.posts_file = os.path.join(self.path, 'posts.ndjson')
+        self.checkpoint_file = os.path.join(self.path, 'checkpoint.json')
+        os.makedirs(self.path, exist_ok=True)
+        self.checkpoint = self._load_checkpoint()
+
+    def _load_checkpoint(self):
+        if not os.path.exists(self.checkpoint_file):
+            return {'records': 0, 'bytes': 0, 'iterator': None, 'complete': False}
+        with open(self.checkpoint_file, encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save_checkpoint(self, frozen, records, size, complete=False):
+        self.checkpoint = {
+            'username': self.username,
+            'records': records,
+            'bytes': size,
+            'iterator': frozen._asdict() if frozen is not None and not complete else None,
+            'complete': complete,
+            'updated_at': datetime.now().isoformat(),
+        }
+        tmp_file = self.checkpoint_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.checkpoint, f)
+        os.replace(tmp_file, self.checkpoint_file)
+
+    def reset(self):
+        """Forget all progress and start the next run from the newest post."""
+        shutil.rmtree(self.path, ignore_errors=True)
+        os.makedirs(self.path, exist_ok=True)
+        self.checkpoint = self._load_checkpoint()
+
+    @property
+    def records(self):
+        """Number of post records crawled so far."""
+        return self.checkpoint['records']
+
+    @property
+    def complete(self):
+        """True once the whole post history has been crawled."""
+        return self.checkpoint['complete']
+
+    def iter_records(self):
+        """Yield the crawled post records (newest first)."""
+        if os.path.exists(self.posts_file):
+            yield from read_ndjson(self.posts_file)
+
+    def run(self, loader, max_posts=None, retries=3, retry_delay=60):
+        """
+        Crawl (or continue crawling) the profile's posts.
+
+        Args:
+            loader (instaloader.Instaloader): Loader to fetch with; if the crawl
+                is resumed it must be logged in as the same account as before
+            max_posts (int): Stop once this many posts are on disk (None = full history)
+            retries (int): Times to wait and resume after a network error or rate-limit block
+            retry_delay (float): Seconds to wait before the first retry (doubles each time)
+
+        Returns:
+            dict: 'status' ('complete', 'limit_reached' or 'interrupted'), 'records'
+            on disk, 'new_records' fetched by this run and 'error' if interrupted
+        """
+        started_with = self.records
+
+        for attempt in range(retries + 1):
+            try:
+                status = self._crawl(loader, max_posts)
+                return {'status': status, 'records': self.records, 'new_records': self.records - started_with}
+            except RETRYABLE_ERRORS as e:
+                if attempt == retries:
+                    error = e
+                    break
+                delay = retry_delay * 2 ** attempt
+                print(f"⚠️  {e} - resuming from post {self.records} in {delay:.0f}s...")
+                time.sleep(delay)
+            except (instaloader.exceptions.InstaloaderException, KeyboardInterrupt) as e:
+                error = e
+                break
+
+        return {'status': 'interrupted', 'records': self.records,
+                'new_records': self.records - started_with, 'error': str(error) or type(error).__name__}
+
+    def _crawl(self, loader, max_posts):
+        if self.complete:
+            return 'complete'
+        if max_posts is not None and self.records >= max_posts:
+            return 'limit_reached'
+
+        profile = instaloader.Profile.from_username(loader.context, self.username)
+        iterator = profile.get_posts()
+        records = self.records
+
+        if self.checkpoint['iterator'] is not None:
+            frozen = FrozenNodeIterator(**self.checkpoint['iterator'])
+            try:
+                iterator.thaw(frozen)
+            except instaloader.exceptions.InvalidArgumentException as e:
+                raise instaloader.exceptions.InvalidArgumentException(
+                    f"Cannot resume crawl of @{self.username} ({e}); log in as {frozen.context_username or 'nobody'} "
+                    f"or start over with --restart"
+                )
+            print(f"↩️  Resuming @{self.username} after {records} posts")
+
+        with open(self.posts_file, 'a+', encoding='utf-8') as f:
+            # Drop records written after the last checkpoint (crash between write and checkpoint)
+            f.truncate(self.checkpoint['bytes'])
+            f.seek(self.checkpoint['bytes'])
+
+            for post in iterator:
+                # A thawed iterator yields the post it was frozen at once more
+                if iterator.total_index <= records:
+                    continue
+
+                fields = post_fields(post)
+                # Same ISO dates as the snapshot store (ndjson_line would write str(datetime))
+                f.write(ndjson_line({**fields, 'date': fields['date'].isoformat()}))
+                records += 1
+
+                # The frozen state keeps the current post plus the rest of its page,
+                # so a single remaining edge means the page is done
+                frozen = iterator.freeze()
+                end_of_page = len(frozen.remaining_data['edges']) <= 1
+                limit_reached = max_posts is not None and records >= max_posts
+                if end_of_page or limit_reached:
+                    f.flush()
+                    os.fsync(f.fileno())
+                    self._save_checkpoint(frozen, records, f.tell())
+                    print(f"  💾 {records} posts saved")
+                if limit_reached:
+                    return 'limit_reached'
+
+            f.flush()
+            os.fsync(f.fileno())
+            self._save_checkpoint(None, records, f.tell(), complete=True)
+
+        return 'complete'
+
+
+def crawl_posts(loader, username, max_posts=None, directory=None, restart=False, **kwargs):
+    """
+    Crawl a profile's post history, resuming from the last checkpoint if there is one.
+
+    Args:
+        loader (instaloader.Instaloader): Loader to fetch with
+        username (str): Profile to crawl
+        max_posts (int): Stop once this many posts are on disk (None = full history)
+        directory (str): Parent directory of crawl states
+        restart (bool): Discard earlier progress first
+        **kwargs: Passed on to PostCrawl.run() (retries, retry_delay)
+
+    Returns:
+        tuple: (PostCrawl, result dict of PostCrawl.run())
+    """
+    crawl = PostCrawl(username, directory)
+    if restart:
+        crawl.reset()
+    return crawl, crawl.run(loader, max_posts, **kwargs)
+
+
+def main():
+    """Crawl the full post history of a profile from the command line."""
+    from instagram_scraper import InstagramFollowerScraper
+
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    if not args:
+        print("Usage: python resumable_crawl.py <username> [max_posts] [--restart]")
+        sys.exit(1)
+
+    username = args[0].lstrip('@')
+    max_posts = int(args[1]) if len(args) > 1 else None
+
+    scraper = InstagramFollowerScraper()
+    if scraper.username and scraper.password:
+        scraper.login()
+
+    print(f"🔍 Crawling posts of @{username}...")
+    crawl, result = crawl_posts(scraper.loader, username, max_posts, restart='--restart' in sys.argv)
+
+    if result['status'] == 'interrupted':
+        print(f"❌ Interrupted: {result['error']}")
+        print("   Progress is saved; run the same command again to resume.")
+    elif result['status'] == 'limit_reached':
+        print(f"⏸️  Stopped at {max_posts} posts; run again with a higher limit to continue.")
+    else:
+        print("✅ Full post history crawled.")
+
+    print(f"📄 {result['records']} posts ({result['new_records']} new) in {crawl.posts_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+"""
+Watchlist Scheduler
+
+Polls a watchlist of accounts with a per-account interval that follows how
+fast each account actually changes. After every check the follower and post
+deltas since the previous snapshot update a smoothed change rate, and the
+next check is scheduled for when a meaningful change is expected: fast-growing
+or frequently posting accounts are polled often, dormant ones rarely. A
+global hourly request budget caps the total; when the watchlist wants more
+than the budget allows, every interval is stretched by the same factor, so
+the budget still goes where the data changes. Due accounts come off a
+priority heap.
+
+Usage:
+    python scheduler.py <watchlist file, one username per line>
+"""
+
+import atexit
+import heapq
+import json
+import os
+import signal
+import sys
+import threading
+import time
+
+DEFAULT_WATCHLIST_PATH = 'watchlist.json'
+
+# Smoothing factor of the change-rate moving averages
+RATE_SMOOTHING = 0.5
+
+
+class _Account:
+    def __init__(self, username, state=None):
+        state = state or {}
+        self.username = username
+        self.followers = state.get('followers')
+        self.posts = state.get('posts')
+        self.checked_at = state.get('checked_at')
+        self.follower_rate = state.get('follower_rate', 0.0)  # relative follower change per second
+        self.post_rate = state.get('post_rate', 0.0)  # new posts per second
+        self.interval = state.get('interval')
+        self.next_due = state.get('next_due', 0.0)
+        self.checks = state.get('checks', 0)
+        self.failures = state.get('failures', 0)
+
+    def to_dict(self):
+        return {name: value for name, value in vars(self).items() if name != 'username'}
+
+
+class WatchlistScheduler:
+    def __init__(self, fetch, path=None, budget_per_hour=500, min_interval=900, max_interval=86400,
+                 target_follower_change=0.002, target_new_posts=0.5, timeseries=None):
+        """
+        Configure the scheduler.
+
+        Args:
+            fetch (callable): fetch(username) returning current follower data (see
+                InstagramFollowerScraper.get_follower_count(fresh=True)) or None on failure
+            path (str): JSON file the watchlist is kept in (default: WATCHLIST_FILE env variable or watchlist.json)
+            budget_per_hour (int): Maximum checks per hour across the whole watchlist
+            min_interval (float): Shortest time between two checks of an account (seconds)
+            max_interval (float): Longest time between two checks of an account (seconds)
+            target_follower_change (float): Relative follower change worth a new check (0.002 = 0.2%)
+            target_new_posts (float): Expected new posts worth a new check
+            timeseries (TimeSeriesStore): Optional history; seeds the change rates of
+                newly added accounts and receives every new sample
+        """
+        self.fetch = fetch
+        self.path = path or os.getenv('WATCHLIST_FILE', DEFAULT_WATCHLIST_PATH)
+        self.budget_per_hour = budget_per_hour
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.target_follower_change = target_follower_change
+        self.target_new_posts = target_new_posts
+        self.timeseries = timeseries
+
+        self._accounts = {}
+        self._heap = []
+        self._lock = threading.Lock()
+        self._burst = max(1.0, budget_per_hour / 60)  # up to a minute's worth of checks at once
+        self._tokens = self._burst
+        self._tokens_updated = time.time()
+        self._checks = 0
+
+        if os.path.exists(self.path):
+            with open(self.path, encoding='utf-8') as f:
+                for username, state in json.load(f).items():
+                    self._accounts[username] = _Account(username, state)
+                    self._push(self._accounts[username])
+
+    def _push(self, account):
+        heapq.heappush(self._heap, (account.next_due, account.username))
+
+    def save(self):
+        """Write the watchlist and each account's schedule to disk."""
+        with self._lock:
+            data = {username: account.to_dict() for username, account in self._accounts.items()}
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def add(self, username):
+        """Add an account to the watchlist; it is checked as soon as the budget allows."""
+        username = username.lstrip('@').lower()
+        with self._lock:
+            if username in self._accounts:
+                return
+            account = self._accounts[username] = _Account(username)
+            self._seed_from_history(account)
+            self._push(account)
+
+    def remove(self, username):
+        """Stop watching an account."""
+        with self._lock:
+            self._accounts.pop(username.lstrip('@').lower(), None)
+
+    def _seed_from_history(self, account):
+        """Start with the change rates observed in earlier snapshots, if there are any."""
+        if self.timeseries is None:
+            return
+        samples = self.timeseries.query(account.username, columns=['followers', 'posts'])
+        if len(samples['timestamp']) < 2:
+            return
+
+        elapsed = float(samples['timestamp'][-1] - samples['timestamp'][0])
+        if elapsed <= 0:
+            return
+        first_followers = int(samples['followers'][0])
+        account.followers = int(samples['followers'][-1])
+        account.posts = int(samples['posts'][-1])
+        account.checked_at = float(samples['timestamp'][-1])
+        account.follower_rate = abs(account.followers - first_followers) / max(first_followers, 1) / elapsed
+        account.post_rate = max(0, account.posts - int(samples['posts'][0])) / elapsed
+        account.interval = self._ideal_interval(account)
+        account.next_due = account.checked_at + account.interval
+
+    def _ideal_interval(self, account):
+        """Time until the account is expected to have changed enough to be worth a check."""
+        if account.checks < 2 and account.follower_rate == 0 and account.post_rate == 0:
+            # No change rate observed yet: look again soon to measure one
+            return self.min_interval
+        candidates = [self.max_interval]
+        if account.follower_rate > 0:
+            candidates.append(self.target_follower_change / account.follower_rate)
+        if account.post_rate > 0:
+            candidates.append(self.target_new_posts / account.post_rate)
+        return max(self.min_interval, min(candidates))
+
+    def budget_factor(self):
+        """How much every interval is stretched so the watchlist fits into the hourly budget (>= 1)."""
+        with self._lock:
+            return self._budget_factor_locked()
+
+    def _budget_factor_locked(self):
+        demand = sum(3600 / (account.interval or self.min_interval) for account in self._accounts.values())
+        return max(1.0, demand / self.budget_per_hour)
+
+    def _take_token(self, now):
+        rate = self.budget_per_hour / 3600
+        self._tokens = min(self._burst, self._tokens + (now - self._tokens_updated) * rate)
+        self._tokens_updated = now
+        if self._tokens >= 1 - 1e-9:  # tolerate float rounding of the refill
+            self._tokens = max(0.0, self._tokens - 1)
+            return 0.0
+        return (1 - self._tokens) / rate
+
+    def _next_due(self, now):
+        """Pop the most overdue account, or return how long to wait for one (lock held)."""
+        while self._heap:
+            due, username = self._heap[0]
+            account = self._accounts.get(username)
+            if account is None or account.next_due != due:
+                heapq.heappop(self._heap)  # removed account or outdated heap entry
+                continue
+            if due > now:
+                return None, due - now
+            heapq.heappop(self._heap)
+            return account, 0.0
+        return None, None
+
+    def run_pending(self, now=None):
+        """
+        Check every account that is due, as far as the budget allows.
+
+        Returns:
+            tuple: (number of accounts checked, seconds until the next check is possible or None)
+        """
+        checked = 0
+        while True:
+            current = time.time() if now is None else now
+            with self._lock:
+                account, wait = self._next_due(current)
+                if account is None:
+                    return checked, wait
+                wait = self._take_token(current)
+                if wait:
+                    # Over budget: the account stays first in line
+                    self._push(account)
+                    return checked, wait
+
+            self._check(account, current)
+            checked += 1
+
+    def _check(self, account, now):
+        data = self.fetch(account.username)
+
+        with self._lock:
+            self._checks += 1
+            if data is None:
+                account.failures += 1
+                account.next_due = now + min(self.max_interval, self.min_interval * 2 ** account.failures)
+            else:
+                account.failures = 0
+                self._update_rates(account, data, now)
+                account.interval = self._ideal_interval(account)
+                account.next_due = now + account.interval * self._budget_factor_locked()
+
+            if account.username in self._accounts:
+                self._push(account)
+
+        if data is not None and self.timeseries is not None:
+            # Skipped by the store if the fetch already recorded this sample (a scraper with its own timeseries)
+            self.timeseries.add_sample(data)
+
+    def _update_rates(self, account, data, now):
+        followers, posts = data['followers'], data.get('posts', 0)
+        if account.checked_at is not None and now > account.checked_at:
+            elapsed = now - account.checked_at
+            follower_rate = abs(followers - account.followers) / max(account.followers, 1) / elapsed
+            post_rate = max(0, posts - account.posts) / elapsed
+            account.follower_rate += RATE_SMOOTHING * (follower_rate - account.follower_rate)
+            account.post_rate += RATE_SMOOTHING * (post_rate - account.post_rate)
+
+        account.followers, account.posts = followers, posts
+        account.checked_at = now
+        account.checks += 1
+
+    def run_forever(self, save_every=10, flush_every=900):
+        """
+        Keep checking due accounts, sleeping in between.
+
+        Args:
+            save_every (int): Checks between two saves of the watchlist
+            flush_every (float): Seconds between two flushes of the timeseries
+                buffer, which bounds the samples a crash can lose
+        """
+        since_save = 0
+        flushed_at = time.monotonic()
+        while True:
+            checked, wait = self.run_pending()
+            since_save += checked
+            if since_save >= save_every:
+                self.save()
+                since_save = 0
+            if self.timeseries is not None and time.monotonic() - flushed_at >= flush_every:
+                self.timeseries.flush()
+                flushed_at = time.monotonic()
+            time.sleep(min(wait if wait is not None else 60, 60))
+
+    def stats(self):
+        """
+        Report the schedule.
+
+        Returns:
+            dict: Watchlist size, checks so far, budget factor and each account's interval
+        """
+        factor = self.budget_factor()
+        with self._lock:
+            now = time.time()
+            return {
+                'accounts': len(self._accounts),
+                'checks': self._checks,
+                'budget_per_hour': self.budget_per_hour,
+                'budget_factor': round(factor, 2),
+                'schedule': {
+                    username: {
+                        'interval_seconds': round((account.interval or self.min_interval) * factor),
+                        'due_in_seconds': round(max(0.0, account.next_due - now)),
+                        'followers': account.followers,
+                        'checks': account.checks,
+                    }
+                    for username, account in self._accounts.items()
+                },
+            }
+
+
+def main():
+    """Watch the accounts listed in a file, recording every sample in the time-series store."""
+    from instagram_scraper import InstagramFollowerScraper
+    from timeseries import TimeSeriesStore
+
+    if len(sys.argv) < 2:
+        print("Usage: python scheduler.py <watchlist file>")
+        sys.exit(1)
+
+    history = TimeSeriesStore()
+    # Buffered samples are written however the process ends; SIGTERM exits through the finally below
+    atexit.register(history.close)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    scraper = InstagramFollowerScraper()
+    scheduler = WatchlistScheduler(
+        # Every check must see current counters, never a cached copy from the previous check
+        lambda username: scraper.get_follower_count(username, fresh=True),
+        budget_per_hour=int(os.getenv('WATCHLIST_BUDGET_PER_HOUR', 500)),
+        timeseries=history,
+    )
+    with open(sys.argv[1], encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                scheduler.add(line.strip())
+
+    print(f"👀 Watching {scheduler.stats()['accounts']} accounts "
+          f"(budget: {scheduler.budget_per_hour} checks/hour)")
+    try:
+        scheduler.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        scheduler.save()
+        history.close()
+        print("💾 Watchlist saved")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Serializers
+
+One place to turn results into JSON bytes. The fastest installed backend is
+used: orjson, then msgspec, then the standard library. Every backend writes
+UTF-8 (non-ASCII characters are not escaped), encodes datetime and date
+values natively as ISO strings, and falls back to str() for anything else
+it cannot encode. Each call picks compact or pretty (2-space indent) output.
+
+API responses are negotiated per request with encode_response(): the client
+can ask for pretty output, or for MessagePack via its Accept header when
+msgspec is installed.
+
+The backend can be forced with the SERIALIZER environment variable
+(auto, orjson, msgspec or json).
+"""
+
+import json
+import os
+import threading
+from datetime import date, datetime
+
+from lazy_imports import lazy_import
+
+# Optional backends (None when not installed), imported on first use
+orjson = lazy_import('orjson', optional=True)
+msgspec = lazy_import('msgspec', optional=True)
+
+JSON_MIMETYPE = 'application/json'
+MSGPACK_MIMETYPE = 'application/msgpack'
+MSGPACK_MIMETYPES = (MSGPACK_MIMETYPE, 'application/x-msgpack')
+
+
+def json_default(value):
+    """Encode what json cannot: datetimes and dates as ISO strings, anything else with str()."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+class StdlibSerializer:
+    name = 'json'
+
+    def dumps(self, value, pretty=False):
+        """
+        Encode a value as JSON.
+
+        Args:
+            value: Dicts, lists, strings, numbers, datetimes, ...
+            pretty (bool): Indent by 2 spaces instead of the compact form
+
+        Returns:
+            bytes: UTF-8 encoded JSON
+        """
+        if pretty:
+            text = json.dumps(value, indent=2, ensure_ascii=False, default=json_default)
+        else:
+            text = json.dumps(value, separators=(',', ':'), ensure_ascii=False, default=json_default)
+        return text.encode('utf-8')
+
+
+class OrjsonSerializer:
+    name = 'orjson'
+
+    def dumps(self, value, pretty=False):
+        # Non-string keys (e.g. posting hours) are written as strings, as json does
+        option = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(value, default=str, option=option)
+
+
+class MsgspecSerializer:
+    name = 'msgspec'
+
+    def dumps(self, value, pretty=False):
+        encoded = msgspec.json.encode(value, enc_hook=str)
+        return msgspec.json.format(encoded, indent=2) if pretty else encoded
+
+    def dumps_msgpack(self, value):
+        """Encode a value as MessagePack."""
+        return msgspec.msgpack.encode(value, enc_hook=str)
+
+
+SERIALIZERS = {
+    'orjson': (OrjsonSerializer, orjson),
+    'msgspec': (MsgspecSerializer, msgspec),
+    'json': (StdlibSerializer, json),
+}
+
+_serializers = {}
+_serializers_lock = threading.Lock()
+
+
+def available_serializers():
+    """Names of the backends that can be used here, fastest first."""
+    return [name for name, (_, module) in SERIALIZERS.items() if module is not None]
+
+
+def get_serializer(name=None):
+    """
+    Return a shared serializer.
+
+    Args:
+        name (str): 'orjson', 'msgspec', 'json' or 'auto' (default: SERIALIZER
+            env variable, else 'auto' = the fastest installed backend)
+
+    Returns:
+        Serializer with dumps(value, pretty=False) -> bytes
+    """
+    name = (name or os.getenv('SERIALIZER') or 'auto').lower()
+    if name == 'auto':
+        name = available_serializers()[0]
+    if name not in SERIALIZERS:
+        raise ValueError(f"Unknown serializer '{name}' (choose from: auto, {', '.join(SERIALIZERS)})")
+    serializer_class, module = SERIALIZERS[name]
+    if module is None:
+        raise ValueError(f"Serializer '{name}' is not installed (pip install {name})")
+
+    with _serializers_lock:
+        if name not in _serializers:
+            _serializers[name] = serializer_class()
+        return _serializers[name]
+
+
+def _accepted(accept):
+    # Media types of an Accept header with their q-values
+    for part in (accept or '').split(','):
+        mimetype, *params = [piece.strip() for piece in part.split(';')]
+        quality = 1.0
+        for param in params:
+            if param.startswith('q='):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if mimetype:
+            yield mimetype.lower(), quality
+
+
+def wants_msgpack(accept):
+    """Whether an Accept header prefers MessagePack over JSON."""
+    msgpack_quality = json_quality = 0.0
+    for mimetype, quality in _accepted(accept):
+        if mimetype in MSGPACK_MIMETYPES:
+            msgpack_quality = max(msgpack_quality, quality)
+        elif mimetype in (JSON_MIMETYPE, 'application/*', '*/*'):
+            json_quality = max(json_quality, quality)
+    return msgpack_quality > json_quality
+
+
+def encode_response(value, accept=None, pretty=False):
+    """
+    Encode an API response the way the client asked for it.
+
+    Args:
+        value: Response data
+        accept (str): The request's Accept header; MessagePack is used when it
+            prefers application/msgpack and msgspec is installed
+        pretty (bool): Indented JSON (ignored for MessagePack)
+
+    Returns:
+        tuple: (body bytes, mimetype)
+    """
+    if msgspec is not None and wants_msgpack(accept):
+        return get_serializer('msgspec').dumps_msgpack(value), MSGPACK_MIMETYPE
+    return get_serializer().dumps(value, pretty=pretty), JSON_MIMETYPE
@@ -0,0 +1,300 @@
+"""
+Session Manager
+
+Rotates requests across several Instagram accounts. Each account keeps its
+own logged-in loader (and so its own rate-limiter bucket); every lease goes
+to the healthy account with the most hourly request budget left. An account
+that runs into a checkpoint or gets logged out is quarantined for a cooldown
+that doubles with each repeat offence, then logged in again and put back
+into rotation. An account whose login fails for good (bad password, 2FA) is
+marked dead and skipped. Throughput grows with the number of accounts.
+
+Leases work like LoaderPool leases (`.loader`, `.invalidate()`), so the
+manager can stand in for the pool in app.py.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from instrumentation import span
+from loader_pool import PERMANENT_LOGIN_ERRORS, SESSION_ERRORS, PoolTimeout
+from rate_limiter import rate_limited_loader
+from shared_state import session_file_lock, session_saved_since
+from transport import add_response_hook
+
+# Response fragments Instagram uses when an account must pass a security checkpoint
+CHECKPOINT_MARKERS = ('checkpoint_required', '/challenge/')
+
+BUDGET_WINDOW = 3600
+
+
+def accounts_from_env():
+    """
+    Read the accounts to rotate from the environment.
+
+    INSTAGRAM_ACCOUNTS lists them as "user1:pass1,user2:pass2"; without it the
+    single INSTA_USERNAME/INSTA_PASSWORD (or INSTAGRAM_USERNAME/INSTAGRAM_PASSWORD)
+    account is used.
+
+    Returns:
+        list: (username, password) tuples
+    """
+    accounts = []
+    for entry in os.getenv('INSTAGRAM_ACCOUNTS', '').split(','):
+        username, _, password = entry.strip().partition(':')
+        if username:
+            accounts.append((username, password))
+
+    if not accounts:
+        username = os.getenv('INSTA_USERNAME') or os.getenv('INSTAGRAM_USERNAME')
+        password = os.getenv('INSTA_PASSWORD') or os.getenv('INSTAGRAM_PASSWORD')
+        if username:
+            accounts.append((username, password))
+    return accounts
+
+
+def login_loader(username, password, force_login=False):
+    """
+    Build a rate-limited loader logged in as the given account.
+    The account's session file is reused unless force_login is set.
+    """
+    loader = rate_limited_loader(
+        download_pictures=False,
+        download_videos=False,
+        download_video_thumbnails=False,
+        download_geotags=False,
+        download_comments=False,
+        save_metadata=False,
+        compress_json=False
+    )
+
+    requested_at = time.time()
+    # Worker processes (serve.py) share the session file; a session another
+    # worker saved while we waited for the lock is fresh enough to reuse
+    with session_file_lock(username):
+        if not force_login or session_saved_since(username, requested_at):
+            try:
+                with span('session_load'):
+                    loader.load_session_from_file(username)
+                return loader
+            except Exception:
+                pass
+
+        print(f"🔐 Logging in as {username}...")
+        with span('login'):
+            loader.login(username, password)
+            loader.save_session_to_file()
+    return loader
+
+
+class _Session:
+    def __init__(self, username, password):
+        self.username = username
+        self.password = password
+        self.loader = None
+        self.in_use = False
+        self.request_times = deque()
+        self.quarantined_until = 0.0
+        self.strikes = 0
+        self.checkpointed = False
+        self.needs_login = False
+        self.leases = 0
+        self.quarantines = 0
+        # Login failed for good (bad credentials, 2FA): never leased again
+        self.dead = False
+
+    def invalidate(self):
+        """Mark the session as logged out; it is quarantined and logged in again."""
+        self.needs_login = True
+
+    def quarantine(self):
+        """Take the session out of rotation for a cooldown once the lease ends."""
+        self.checkpointed = True
+
+    def used_budget(self, now):
+        while self.request_times and self.request_times[0] <= now - BUDGET_WINDOW:
+            self.request_times.popleft()
+        return len(self.request_times)
+
+
+class SessionManager:
+    def __init__(self, accounts, factory=login_loader, hourly_budget=200, cooldown=1800,
+                 max_cooldown=6 * 3600, relogin_backoff=30):
+        """
+        Initialize the manager (call fill() to log the accounts in).
+
+        Args:
+            accounts (list): (username, password) tuples
+            factory (callable): factory(username, password, force_login=False) returning a loader
+            hourly_budget (int): Requests each account may send per rolling hour
+            cooldown (float): Seconds a session is quarantined after its first checkpoint
+            max_cooldown (float): Upper bound for the doubling cooldown
+            relogin_backoff (float): Seconds to wait before retrying a failed re-login
+        """
+        self.factory = factory
+        self.hourly_budget = hourly_budget
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.relogin_backoff = relogin_backoff
+
+        self._sessions = [_Session(username, password) for username, password in accounts]
+        self._cond = threading.Condition()
+
+    @property
+    def size(self):
+        return len(self._sessions)
+
+    def fill(self):
+        """Log every account in; accounts that fail are quarantined and retried later."""
+        for session in self._sessions:
+            try:
+                self._attach(session, self.factory(session.username, session.password))
+            except PERMANENT_LOGIN_ERRORS as e:
+                print(f"❌ Could not log in as {session.username}, not retrying: {e}")
+                with self._cond:
+                    session.dead = True
+            except Exception as e:
+                print(f"⚠️  Could not log in as {session.username}: {e}")
+                with self._cond:
+                    session.needs_login = True
+                    self._quarantine(session)
+        return self
+
+    def _attach(self, session, loader):
+        def on_response(response, *args, **kwargs):
+            checkpoint = (
+                any(marker in response.headers.get('location', '') for marker in CHECKPOINT_MARKERS)
+                or (response.status_code == 400 and any(marker in response.text for marker in CHECKPOINT_MARKERS))
+            )
+            with self._cond:
+                session.request_times.append(time.monotonic())
+                if checkpoint:
+                    session.checkpointed = True
+
+        add_response_hook(loader.context, on_response)
+        with self._cond:
+            session.loader = loader
+            session.needs_login = False
+            self._cond.notify_all()
+
+    @contextmanager
+    def lease(self, timeout=None):
+        """
+        Lease the healthiest account for the duration of a `with` block.
+
+        Raises:
+            PoolTimeout: If no account becomes available within the timeout,
+                or at once if every account failed to log in for good
+        """
+        with span('session_lease'):
+            session = self._acquire(timeout)
+        try:
+            yield session
+        except SESSION_ERRORS:
+            session.invalidate()
+            raise
+        finally:
+            self._release(session)
+
+    def _acquire(self, timeout):
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                alive = [s for s in self._sessions if not s.dead]
+                if not alive:
+                    raise PoolTimeout("No Instagram account can log in (check the credentials)")
+                ready = [s for s in alive
+                         if not s.in_use and s.loader is not None and not s.needs_login
+                         and s.quarantined_until <= now]
+                # Most remaining budget first
+                ready.sort(key=lambda s: s.used_budget(now))
+                if ready and ready[0].used_budget(now) < self.hourly_budget:
+                    session = ready[0]
+                    session.in_use = True
+                    session.leases += 1
+                    return session
+
+                # Wake up when a quarantine or a budget slot expires (or a lease ends)
+                wakeups = [s.quarantined_until for s in alive if s.quarantined_until > now]
+                wakeups += [s.request_times[0] + BUDGET_WINDOW for s in ready if s.request_times]
+                wait = min(wakeups) - now if wakeups else None
+                if deadline is not None:
+                    if now >= deadline:
+                        raise PoolTimeout(f"No Instagram account available after {timeout}s")
+                    wait = min(wait, deadline - now) if wait is not None else deadline - now
+                self._cond.wait(wait)
+
+    def _release(self, session):
+        with self._cond:
+            session.in_use = False
+            if session.checkpointed or session.needs_login:
+                self._quarantine(session)
+            else:
+                session.strikes = 0
+            self._cond.notify_all()
+
+    def _quarantine(self, session):
+        """Bench a session for a cooldown that doubles with each consecutive quarantine (lock held)."""
+        cooldown = min(self.max_cooldown, self.cooldown * 2 ** session.strikes)
+        session.strikes += 1
+        session.quarantines += 1
+        session.quarantined_until = time.monotonic() + cooldown
+        session.checkpointed = False
+        print(f"🚧 Session {session.username} quarantined for {cooldown:.0f}s")
+
+        if session.needs_login:
+            threading.Thread(target=self._relogin, args=(session, cooldown), daemon=True).start()
+
+    def _relogin(self, session, delay):
+        """Log a quarantined session in again once its cooldown is over (runs in the background)."""
+        time.sleep(delay)
+        while True:
+            try:
+                loader = self.factory(session.username, session.password, force_login=True)
+                break
+            except PERMANENT_LOGIN_ERRORS as e:
+                print(f"Re-login of {session.username} failed, not retrying: {e}")
+                with self._cond:
+                    session.dead = True
+                    # Waiting leases re-check whether any account is left
+                    self._cond.notify_all()
+                return
+            except Exception as e:
+                print(f"Re-login of {session.username} failed, retrying in {self.relogin_backoff}s: {e}")
+                time.sleep(self.relogin_backoff)
+        self._attach(session, loader)
+
+    def stats(self):
+        """
+        Report the state of every account.
+
+        Returns:
+            dict: Account count, availability, dead accounts (permanent login
+            failures) and per-account budget and health
+        """
+        with self._cond:
+            now = time.monotonic()
+            accounts = {
+                s.username: {
+                    'in_use': s.in_use,
+                    'requests_last_hour': s.used_budget(now),
+                    'remaining_budget': max(0, self.hourly_budget - s.used_budget(now)),
+                    'quarantined_for_seconds': round(max(0.0, s.quarantined_until - now), 1),
+                    'quarantines': s.quarantines,
+                    'leases': s.leases,
+                    'dead': s.dead,
+                }
+                for s in self._sessions
+            }
+            return {
+                'size': self.size,
+                'available': sum(1 for s in self._sessions if not s.in_use and s.loader is not None
+                                 and not s.dead and s.quarantined_until <= now),
+                'dead': sum(1 for s in self._sessions if s.dead),
+                'accounts': accounts,
+            }
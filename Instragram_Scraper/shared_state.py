@@ -0,0 +1,417 @@
+"""
+Shared State
+
+Cross-process versions of the response cache and the rate limiter, for
+running the API server as several worker processes (see serve.py in the
+repository root). Both keep their state in one local SQLite file in WAL mode.
+Every worker therefore sees the same cached lookups and the same per-account
+token buckets. Adding workers uses more cores without sending Instagram more
+requests than a single process would.
+
+They are used instead of the in-process versions when SHARED_STATE_DB names
+the SQLite file. Cached values are pickled, so the file must only be writable
+by the user running the server.
+
+Session files are guarded by an exclusive file lock, so workers never log in
+to the same account at the same time or read a half-written session file.
+"""
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from instaloader.instaloader import get_default_session_filename
+
+from rate_limiter import RateLimiter
+from response_cache import ResponseCache, _is_cacheable
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows, where serve.py cannot run anyway
+    fcntl = None
+
+DEFAULT_DB_PATH = 'shared_state.db'
+
+# A background refresh claimed longer ago than this is assumed lost (e.g. its worker died)
+REFRESH_TIMEOUT = 120
+
+# Cache hits only note their key; last-use times are written in one batch this often (seconds)
+TOUCH_INTERVAL = 5
+
+# Rate increases from successful requests are counted in memory and written this often (seconds)
+RATE_FLUSH_INTERVAL = 5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    ttl REAL NOT NULL,
+    used_at REAL NOT NULL,
+    refresh_claimed_at REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS cache_by_use ON cache (used_at);
+CREATE TABLE IF NOT EXISTS rate_buckets (
+    key TEXT PRIMARY KEY,
+    rate REAL NOT NULL,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL,
+    blocked_until REAL NOT NULL,
+    backoff REAL NOT NULL,
+    requests INTEGER NOT NULL DEFAULT 0,
+    throttles INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+class SharedStore:
+    def __init__(self, path=None):
+        """
+        Open (or create) the shared SQLite file.
+
+        Args:
+            path (str): SQLite file (default: SHARED_STATE_DB env variable or shared_state.db)
+        """
+        self.path = path or os.getenv('SHARED_STATE_DB') or DEFAULT_DB_PATH
+        # Autocommit mode: transactions are opened explicitly with BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+
+    @contextmanager
+    def read(self):
+        """
+        Run a block of reads. No write lock is taken, so readers in every
+        process proceed while another process writes (WAL mode).
+
+        Yields:
+            sqlite3.Connection: The connection to use inside the block
+        """
+        with self._lock:
+            yield self._conn
+
+    @contextmanager
+    def transaction(self):
+        """
+        Run a block as one write transaction. The write lock is taken up front,
+        so read-modify-write sequences are atomic across processes.
+
+        Yields:
+            sqlite3.Connection: The connection to use inside the block
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_shared_store():
+    """Return this process's connection to the shared state file."""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = SharedStore()
+    return _default_store
+
+
+class SharedResponseCache(ResponseCache):
+    """
+    ResponseCache whose entries live in the shared SQLite file. TTLs,
+    stale-while-revalidate and LRU eviction work as in ResponseCache; only one
+    process refreshes a stale entry. Hit/miss counters are per process.
+
+    Hits are plain reads. Their last-use times are written in batches (every
+    TOUCH_INTERVAL seconds and before each eviction), so a fresh hit never
+    waits for SQLite's write lock.
+    """
+
+    def __init__(self, store=None, **limits):
+        """
+        Args:
+            store (SharedStore): Shared file to use (default: get_shared_store())
+            **limits: profile_ttl, posts_ttl, stale_ttl, max_entries, max_bytes (see ResponseCache)
+        """
+        super().__init__(**limits)
+        self.store = store or get_shared_store()
+        # Key -> last use not yet written to the shared file (see _flush_touches)
+        self._touched = {}
+        self._touches_flushed_at = time.monotonic()
+
+    def get_or_fetch(self, key, fetch, kind='posts'):
+        now = time.time()
+        with self.store.read() as conn:
+            row = conn.execute("SELECT value, fetched_at, ttl, refresh_claimed_at FROM cache WHERE key = ?",
+                               (repr(key),)).fetchone()
+        if row is not None and now - row['fetched_at'] >= row['ttl'] + self.stale_ttl:
+            row = None
+
+        refresh = False
+        if row is not None:
+            with self._lock:
+                self._touched[repr(key)] = now
+            if now - row['fetched_at'] >= row['ttl'] and row['refresh_claimed_at'] < now - REFRESH_TIMEOUT:
+                # Only stale entries take the write lock: one process wins the refresh claim
+                with self.store.transaction() as conn:
+                    refresh = conn.execute(
+                        "UPDATE cache SET refresh_claimed_at = ? WHERE key = ? AND fetched_at = ? "
+                        "AND refresh_claimed_at < ?",
+                        (now, repr(key), row['fetched_at'], now - REFRESH_TIMEOUT)
+                    ).rowcount == 1
+            elif time.monotonic() - self._touches_flushed_at >= TOUCH_INTERVAL:
+                with self.store.transaction() as conn:
+                    self._flush_touches(conn)
+
+        with self._lock:
+            if row is None:
+                self._counters['misses'] += 1
+            else:
+                self._counters['hits' if now - row['fetched_at'] < row['ttl'] else 'stale_hits'] += 1
+
+        if row is not None:
+            if refresh:
+                threading.Thread(target=self._refresh, args=(key, fetch, kind), daemon=True).start()
+            return pickle.loads(row['value'])
+
+        value = fetch()
+        self.put(key, value, kind)
+        return value
+
+    def _refresh(self, key, fetch, kind):
+        try:
+            value = fetch()
+        except Exception as e:
+            print(f"Background refresh of {key} failed: {e}")
+            value = None
+
+        if _is_cacheable(value):
+            with self._lock:
+                self._counters['refreshes'] += 1
+            self.put(key, value, kind)
+            return
+
+        with self.store.transaction() as conn:
+            conn.execute("UPDATE cache SET refresh_claimed_at = 0 WHERE key = ?", (repr(key),))
+
+    def put(self, key, value, kind='posts'):
+        """Store a value, evicting least recently used entries over the limits."""
+        if not _is_cacheable(value):
+            return
+
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        evictions = 0
+        with self.store.transaction() as conn:
+            # Eviction below picks the least recently used entries, so pending uses are written first
+            self._flush_touches(conn)
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, size, fetched_at, ttl, used_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (repr(key), blob, len(blob), now, self.ttls[kind], now)
+            )
+            count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache").fetchone()
+            if count > self.max_entries or total > self.max_bytes:
+                for old_key, size in conn.execute("SELECT key, size FROM cache ORDER BY used_at").fetchall():
+                    if count <= self.max_entries and total <= self.max_bytes:
+                        break
+                    conn.execute("DELETE FROM cache WHERE key = ?", (old_key,))
+                    count -= 1
+                    total -= size
+                    evictions += 1
+
+        if evictions:
+            with self._lock:
+                self._counters['evictions'] += evictions
+
+    def _flush_touches(self, conn):
+        """Write the last-use times of cache hits since the previous flush (write transaction held)."""
+        with self._lock:
+            touched, self._touched = self._touched, {}
+            self._touches_flushed_at = time.monotonic()
+        if touched:
+            conn.executemany("UPDATE cache SET used_at = MAX(used_at, ?) WHERE key = ?",
+                             [(used_at, key) for key, used_at in touched.items()])
+
+    def invalidate(self, key):
+        """Drop a single entry."""
+        with self.store.transaction() as conn:
+            conn.execute("DELETE FROM cache WHERE key = ?", (repr(key),))
+
+    def stats(self):
+        """
+        Report cache counters.
+
+        Returns:
+            dict: This process's hits, stale hits, misses, evictions and refreshes,
+            plus the entries and bytes of the shared cache
+        """
+        with self.store.read() as conn:
+            count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache").fetchone()
+        with self._lock:
+            return {**self._counters, 'entries': count, 'bytes': total}
+
+
+class SharedRateLimiter(RateLimiter):
+    """
+    RateLimiter whose per-session buckets, adaptive rates and backoff pauses
+    live in the shared SQLite file, so every process draws from the same
+    budget per account. Priorities order the waiters within a process.
+
+    Successful requests only count in memory; the additive rate increases
+    are written in one batch every RATE_FLUSH_INTERVAL seconds (and before
+    a throttle), so a success never waits for SQLite's write lock.
+    """
+
+    def __init__(self, store=None, **settings):
+        """
+        Args:
+            store (SharedStore): Shared file to use (default: get_shared_store())
+            **settings: rate, burst, min_rate, max_rate, ... (see RateLimiter)
+        """
+        super().__init__(**settings)
+        self.store = store or get_shared_store()
+        # Key -> successful requests not yet written to the shared file (see _flush_successes)
+        self._successes = {}
+        self._successes_flushed_at = time.monotonic()
+
+    def _bucket(self, conn, key):
+        row = conn.execute("SELECT * FROM rate_buckets WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            conn.execute(
+                "INSERT INTO rate_buckets (key, rate, tokens, updated, blocked_until, backoff) VALUES (?, ?, ?, ?, 0, ?)",
+                (key, self.rate, self.burst, time.time(), self.base_backoff)
+            )
+            row = conn.execute("SELECT * FROM rate_buckets WHERE key = ?", (key,)).fetchone()
+        return row
+
+    def _reserve(self, key, state, now, take=True):
+        # Wall-clock time: the buckets are shared between processes
+        now = time.time()
+        with self.store.transaction() as conn:
+            bucket = self._bucket(conn, key)
+            tokens = min(self.burst, bucket['tokens'] + (now - bucket['updated']) * bucket['rate'])
+            wait = max(bucket['blocked_until'] - now, 0.0 if tokens >= 1 else (1 - tokens) / bucket['rate'])
+            taken = wait <= 0 and take
+            conn.execute("UPDATE rate_buckets SET tokens = ?, updated = ?, requests = requests + ? WHERE key = ?",
+                         (tokens - 1 if taken else tokens, now, int(taken), key))
+        return wait
+
+    def _reserve_locked(self, key, state, now, take=True):
+        # The write transaction may wait for another process: release the lock
+        # meanwhile, so this process's other sessions are not held up
+        self._cond.release()
+        try:
+            return self._reserve(key, state, now, take)
+        finally:
+            self._cond.acquire()
+
+    def record_success(self, key='anonymous'):
+        """Additively increase the session's rate after a successful request (written in batches)."""
+        with self._cond:
+            self._successes[key] = self._successes.get(key, 0) + 1
+            due = time.monotonic() - self._successes_flushed_at >= RATE_FLUSH_INTERVAL
+        if due:
+            with self.store.transaction() as conn:
+                self._flush_successes(conn)
+
+    def record_throttle(self, key='anonymous'):
+        """Halve the session's rate and pause it (in every process) after a 429/401 response."""
+        now = time.time()
+        with self._cond:
+            self._session(key).throttles += 1
+        with self.store.transaction() as conn:
+            # Successes before the throttle count first (they also reset the backoff)
+            self._flush_successes(conn)
+            bucket = self._bucket(conn, key)
+            conn.execute(
+                "UPDATE rate_buckets SET rate = ?, tokens = MIN(tokens, 0), blocked_until = ?, backoff = ?, "
+                "throttles = throttles + 1 WHERE key = ?",
+                (max(self.min_rate, bucket['rate'] * self.decrease_factor), now + bucket['backoff'],
+                 min(self.max_backoff, bucket['backoff'] * 2), key)
+            )
+        with self._cond:
+            self._cond.notify_all()
+
+    def _flush_successes(self, conn):
+        """Write the rate increases of successful requests since the previous flush (write transaction held)."""
+        with self._cond:
+            successes, self._successes = self._successes, {}
+            self._successes_flushed_at = time.monotonic()
+        for key, count in successes.items():
+            self._bucket(conn, key)
+            conn.execute("UPDATE rate_buckets SET rate = MIN(?, rate + ?), backoff = ? WHERE key = ?",
+                         (self.max_rate, self.increase_step * count, self.base_backoff, key))
+
+    def stats(self):
+        """
+        Report the current state of every session.
+
+        Returns:
+            dict: Per-session rate, pause, request and throttle counts of all
+            processes, plus this process's queue length and average wait
+        """
+        now = time.time()
+        with self.store.transaction() as conn:
+            self._flush_successes(conn)
+            buckets = conn.execute("SELECT * FROM rate_buckets").fetchall()
+        with self._cond:
+            local = {key: (len(state.waiters), state.wait_total, state.requests) for key, state in self._sessions.items()}
+
+        stats = {}
+        for bucket in buckets:
+            queued, wait_total, requests = local.get(bucket['key'], (0, 0.0, 0))
+            stats[bucket['key']] = {
+                'rate_per_second': round(bucket['rate'], 3),
+                'queued': queued,
+                'blocked_for_seconds': round(max(0.0, bucket['blocked_until'] - now), 1),
+                'requests': bucket['requests'],
+                'throttles': bucket['throttles'],
+                'wait_time_avg_ms': round(wait_total / requests * 1000, 2) if requests else 0,
+            }
+        return stats
+
+
+@contextmanager
+def session_file_lock(username):
+    """
+    Hold an exclusive lock on an account's session file for the duration of
+    a `with` block (blocks while another process or thread holds it).
+
+    Args:
+        username (str): Instagram account whose session file is read or written
+    """
+    if fcntl is None or not username:
+        yield
+        return
+
+    path = get_default_session_filename(username) + '.lock'
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def session_saved_since(username, timestamp):
+    """Whether the account's session file was written after `timestamp` (e.g. by another worker)."""
+    try:
+        return os.path.getmtime(get_default_session_filename(username)) > timestamp
+    except OSError:
+        return False
@@ -5,7 +5,7 @@ A minimal script that demonstrates scraping public Instagram profiles
 without any login requirements.
 """
 
-from instagram_scraper import InstagramFollowerScraper
+from instagram_scraper import get_scraper
 import sys
 
 def simple_scrape(username):
@@ -24,8 +24,8 @@ def simple_scrape(username):
     print(f"Fetching data for @{username}...")
     print("(Public profiles only - no login required)\n")
 
-    # Initialize scraper (no login)
-    scraper = InstagramFollowerScraper()
+    # Scraper shared by the whole process (no login)
+    scraper = get_scraper()
 
     # Get follower data
     follower_data = scraper.get_follower_count(username)
@@ -73,8 +73,7 @@ def main():
         # Offer to save data
         save = input("\nSave data to file? (y/n): ").lower().strip()
         if save == 'y':
-            scraper = InstagramFollowerScraper()
-            scraper.save_to_file(follower_data)
+            get_scraper().save_to_file(follower_data)
 
 if __name__ == "__main__":
     main()
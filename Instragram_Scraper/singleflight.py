@@ -0,0 +1,106 @@
+"""
+Single-Flight Request Coalescing
+
+When many threads ask for the same lookup at once, only the first one
+fetches; the others wait for its result. A lookup can also ride along on an
+in-flight fetch for a larger result (e.g. 3 posts from a fetch of 10), which
+is cut down to size for it. Each waiter gets its own copy of a dict or list
+result (see response_cache.detached). Counters report how many upstream
+calls were saved.
+"""
+
+import threading
+
+from response_cache import detached
+
+
+class _Call:
+    __slots__ = ('size', 'done', 'result', 'error', 'waiters')
+
+    def __init__(self, size):
+        self.size = size
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._counters = {'upstream_calls': 0, 'coalesced': 0, 'coalesced_from_larger': 0}
+
+    def do(self, key, fetch, size=0, derive=None):
+        """
+        Run fetch() for `key`, or share the result of an in-flight fetch.
+
+        Args:
+            key: Identity of the lookup, e.g. the lowercased username
+            fetch (callable): Function performing the upstream call
+            size (int): How much the caller needs (e.g. number of posts); an
+                in-flight fetch of at least this size is shared
+            derive (callable): derive(result, size) cuts a larger result down
+                to `size` (default: results are shared unchanged)
+
+        Returns:
+            The fetched (or shared) result; exceptions of the fetch are re-raised
+            in every caller sharing it
+        """
+        with self._lock:
+            calls = self._calls.setdefault(key, [])
+            call = next((c for c in calls if c.size >= size), None)
+            leader = call is None
+            if leader:
+                call = _Call(size)
+                calls.append(call)
+                self._counters['upstream_calls'] += 1
+            else:
+                call.waiters += 1
+                self._counters['coalesced'] += 1
+                if call.size > size:
+                    self._counters['coalesced_from_larger'] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return detached(derive(call.result, size) if derive is not None and call.size != size else call.result)
+
+        try:
+            call.result = fetch()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                calls = self._calls[key]
+                calls.remove(call)
+                if not calls:
+                    del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        """
+        Report coalescing counters.
+
+        Returns:
+            dict: Upstream calls made, calls saved by coalescing (and how many of
+            those were served from a larger fetch) and fetches in flight
+        """
+        with self._lock:
+            return {**self._counters, 'in_flight': sum(len(calls) for calls in self._calls.values())}
+
+
+_default_single_flight = None
+_default_single_flight_lock = threading.Lock()
+
+
+def get_single_flight():
+    """Return the process-wide coalescer shared by all scrapers."""
+    global _default_single_flight
+    with _default_single_flight_lock:
+        if _default_single_flight is None:
+            _default_single_flight = SingleFlight()
+    return _default_single_flight
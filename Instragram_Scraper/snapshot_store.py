@@ -0,0 +1,221 @@
+"""
+Snapshot Store
+
+An embedded SQLite store of profile and post snapshots, keyed by username
+and shortcode. A re-scrape only pages profile.get_posts() until it reaches
+a post that is already stored, refreshing like/comment counters on the most
+recent posts along the way, so polling an account turns a full scan into a
+one-page delta.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from itertools import islice
+
+from graphql_nodes import node_comments, node_likes, post_fields
+
+DEFAULT_DB_PATH = 'snapshots.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    username TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS posts (
+    username TEXT NOT NULL,
+    shortcode TEXT NOT NULL,
+    taken_at TEXT NOT NULL,
+    likes INTEGER NOT NULL,
+    comments INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    change_seq INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (username, shortcode)
+);
+CREATE INDEX IF NOT EXISTS posts_by_date ON posts (username, taken_at DESC);
+CREATE TABLE IF NOT EXISTS change_counter (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    seq INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO change_counter (id, seq) VALUES (0, 0);
+"""
+
+# Stores created before posts had a change sequence: number the existing posts in rowid order
+MIGRATE_CHANGE_SEQ = """
+ALTER TABLE posts ADD COLUMN change_seq INTEGER NOT NULL DEFAULT 0;
+UPDATE posts SET change_seq = rowid;
+UPDATE change_counter SET seq = (SELECT COALESCE(MAX(rowid), 0) FROM posts);
+"""
+
+
+class SnapshotStore:
+    def __init__(self, path=None):
+        """
+        Open (or create) the store.
+
+        Args:
+            path (str): SQLite file (default: SNAPSHOT_DB env variable or snapshots.db)
+        """
+        self.path = path or os.getenv('SNAPSHOT_DB', DEFAULT_DB_PATH)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(posts)")}
+            if 'change_seq' not in columns:
+                self._conn.executescript(MIGRATE_CHANGE_SEQ)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS posts_by_change ON posts (change_seq)")
+
+    def _next_change_seq(self):
+        """
+        Take the next change sequence number. Called inside the write
+        transaction, so numbers follow commit order, even across processes.
+        """
+        self._conn.execute("UPDATE change_counter SET seq = seq + 1 WHERE id = 0")
+        return self._conn.execute("SELECT seq FROM change_counter WHERE id = 0").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+    def save_profile(self, username, data):
+        """Store the latest profile snapshot."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO profiles (username, data, updated_at) VALUES (?, ?, ?)",
+                (username.lower(), json.dumps(data, default=str), datetime.now().isoformat())
+            )
+
+    def get_profile(self, username):
+        """Return the latest profile snapshot, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM profiles WHERE username = ?",
+                                     (username.lower(),)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def known_shortcodes(self, username):
+        """Shortcodes of all stored posts of a profile."""
+        with self._lock:
+            rows = self._conn.execute("SELECT shortcode FROM posts WHERE username = ?",
+                                      (username.lower(),)).fetchall()
+        return {row[0] for row in rows}
+
+    def save_post(self, username, fields):
+        """
+        Insert or replace a post snapshot.
+
+        Args:
+            username (str): Owner of the post
+            fields (dict): Post fields as returned by graphql_nodes.post_fields()
+        """
+        record = {**fields, 'date': fields['date'].isoformat()}
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO posts (username, shortcode, taken_at, likes, comments, data, updated_at, "
+                "change_seq) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (username.lower(), record['shortcode'], record['date'], record['likes'], record['comments'],
+                 json.dumps(record), datetime.now().isoformat(), self._next_change_seq())
+            )
+
+    def update_counters(self, username, shortcode, likes, comments):
+        """Refresh the like/comment counters of a stored post."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE posts SET likes = ?, comments = ?, updated_at = ?, change_seq = ? "
+                "WHERE username = ? AND shortcode = ?",
+                (likes, comments, datetime.now().isoformat(), self._next_change_seq(), username.lower(), shortcode)
+            )
+
+    def get_posts(self, username, limit=None):
+        """
+        Return stored posts of a profile, newest first.
+
+        Args:
+            username (str): Profile username
+            limit (int): Maximum number of posts (None = all)
+
+        Returns:
+            list: Post records (dicts with an ISO 'date' and current counters)
+        """
+        query = "SELECT data, likes, comments FROM posts WHERE username = ? ORDER BY taken_at DESC"
+        params = [username.lower()]
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [{**json.loads(data), 'likes': likes, 'comments': comments} for data, likes, comments in rows]
+
+    def changed_posts(self, after=0, batch_size=5000):
+        """
+        Yield every post stored or updated after a position, oldest change first.
+
+        Positions are change sequence numbers, taken in the write transaction,
+        so they never go backwards (unlike wall-clock timestamps). Rows are
+        read in batches, so the store stays usable while a large scan is running.
+        Posts are never deleted from the store, so a scan reports no deletions.
+
+        Args:
+            after (int): Position returned with an earlier post (0 = all posts)
+            batch_size (int): Rows read per query
+
+        Yields:
+            tuple: (position, record); record is a post record as in get_posts()
+            plus 'username'. Pass the last position to a later call to read
+            only what changed since.
+        """
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT change_seq, username, likes, comments, data FROM posts "
+                    "WHERE change_seq > ? ORDER BY change_seq LIMIT ?",
+                    (after, batch_size)
+                ).fetchall()
+            for after, username, likes, comments, data in rows:
+                yield after, {**json.loads(data), 'username': username, 'likes': likes, 'comments': comments}
+            if len(rows) < batch_size:
+                return
+
+
+def sync_posts(store, profile, depth=None, refresh_recent=12):
+    """
+    Bring the stored posts of a profile up to date with as few pages as possible.
+
+    New posts are stored; already stored posts among the `refresh_recent`
+    most recent ones get their counters refreshed. Paging stops at the
+    first stored post past that window, once the store holds at least
+    `depth` posts of the profile.
+
+    Args:
+        store (SnapshotStore): Target store
+        profile (instaloader.Profile): Profile to sync
+        depth (int): Never page deeper than this many posts (None = full history on the first run)
+        refresh_recent (int): Number of most recent posts whose counters are refreshed
+
+    Returns:
+        dict: Number of new and refreshed posts
+    """
+    known = store.known_shortcodes(profile.username)
+    new = refreshed = 0
+
+    # islice stops at `depth` without requesting the page after it
+    for i, post in enumerate(islice(profile.get_posts(), depth)):
+        if post.shortcode not in known:
+            store.save_post(profile.username, post_fields(post))
+            new += 1
+        elif i < refresh_recent:
+            # Counters straight from the page's node: post_fields() may look up the location separately
+            likes, comments = node_likes(post._node), node_comments(post._node)
+            store.update_counters(profile.username, post.shortcode,
+                                  post.likes if likes is None else likes,
+                                  post.comments if comments is None else comments)
+            refreshed += 1
+        elif depth is None or len(known) + new >= depth:
+            # Everything older is already stored
+            break
+
+    return {'new_posts': new, 'refreshed_posts': refreshed}
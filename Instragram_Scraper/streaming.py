@@ -0,0 +1,69 @@
+"""
+NDJSON Streaming
+
+Helpers for writing records as newline-delimited JSON, one line per record,
+as soon as each record is produced. Used for post histories that are too
+large to collect into a list before writing.
+"""
+
+import json
+
+
+def ndjson_line(record):
+    """Serialize one record as an NDJSON line (datetimes are written as strings)."""
+    return json.dumps(record, ensure_ascii=False, default=str) + "\n"
+
+
+def ndjson_lines(records):
+    """Lazily turn an iterable of records into NDJSON lines (e.g. for a streaming HTTP response)."""
+    for record in records:
+        yield ndjson_line(record)
+
+
+class NDJSONWriter:
+    def __init__(self, target, append=False):
+        """
+        Open an NDJSON output.
+
+        Args:
+            target (str or file): Path to write to, or an open text file (e.g. sys.stdout)
+            append (bool): Add to the end of an existing file instead of replacing it
+        """
+        self._owns_file = isinstance(target, str)
+        self._file = open(target, 'a' if append else 'w', encoding='utf-8') if self._owns_file else target
+        self.count = 0
+
+    def write(self, record):
+        """Write one record and flush it, so readers see it immediately."""
+        self._file.write(ndjson_line(record))
+        self._file.flush()
+        self.count += 1
+
+    def write_all(self, records):
+        """
+        Write every record of an iterable as it arrives.
+
+        Returns:
+            int: Number of records written
+        """
+        for record in records:
+            self.write(record)
+        return self.count
+
+    def close(self):
+        if self._owns_file:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_ndjson(path):
+    """Yield the records of an NDJSON file one at a time."""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
@@ -0,0 +1,59 @@
+"""
+Shared fixtures: a fake Instagram backend (fake_instagram.py) and loaders
+routed to it, so the tests run offline.
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+# The modules under test are imported the way the scrapers import them
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_instagram import FakeInstagramServer, route_to_fake
+from rate_limiter import RateLimiter, rate_limited_loader
+
+
+@pytest.fixture
+def fake_server():
+    """Start fake backends with fake_server(**settings); they are stopped after the test."""
+    servers = []
+
+    def start(**settings):
+        server = FakeInstagramServer(**settings).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+@pytest.fixture
+def make_loader():
+    """
+    Build rate-limited loaders whose requests go to a fake backend: make_loader(server, limiter=None).
+    The default limiter only slows down when the backend answers 429.
+    """
+    def make(server, limiter=None):
+        limiter = limiter or RateLimiter(rate=1000, burst=1000, max_rate=1000)
+        loader = rate_limited_loader(limiter, quiet=True)
+        loader.context.sleep = False
+        route_to_fake(loader.context, server)
+        return loader
+
+    return make
+
+
+@pytest.fixture
+def wait_until():
+    """Poll wait_until(condition, timeout=5) until condition() is true (for work done by background threads)."""
+    def wait(condition, timeout=5):
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return condition()
+
+    return wait
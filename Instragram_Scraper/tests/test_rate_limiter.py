@@ -0,0 +1,30 @@
+import instaloader
+import pytest
+
+from rate_limiter import RateLimiter
+
+
+def lookup(loader, count, prefix):
+    for i in range(count):
+        instaloader.Profile.from_username(loader.context, f"{prefix}{i}")
+
+
+def test_limiter_backs_off_on_429_and_recovers(fake_server, make_loader):
+    # The backend allows 5 requests per second; the limiter starts well above that.
+    # A pause as long as the backend's one-second window lets the retry through.
+    server = fake_server(rate_limit=5)
+    limiter = RateLimiter(rate=20, burst=1, max_rate=100, increase_step=1, base_backoff=1, max_backoff=1)
+    loader = make_loader(server, limiter)
+
+    lookup(loader, 12, 'throttled')
+    throttled = limiter.stats()['anonymous']
+    assert server.throttled > 0
+    assert throttled['throttles'] == server.throttled
+    assert throttled['rate_per_second'] < 20
+
+    # Once Instagram stops answering 429, every success raises the rate again
+    server.rate_limit = None
+    lookup(loader, 5, 'recovered')
+    recovered = limiter.stats()['anonymous']
+    assert recovered['throttles'] == throttled['throttles']
+    assert recovered['rate_per_second'] == pytest.approx(throttled['rate_per_second'] + 5)
@@ -0,0 +1,85 @@
+import instaloader
+import pytest
+
+from loader_pool import LoaderPool, PoolTimeout
+from session_manager import SessionManager
+
+
+def test_pool_stops_relogin_on_bad_credentials(fake_server, make_loader, wait_until):
+    server = fake_server()
+    attempts = []
+
+    def factory(force_login=False):
+        if force_login:
+            attempts.append(1)
+            raise instaloader.exceptions.BadCredentialsException("Wrong password.")
+        return make_loader(server)
+
+    pool = LoaderPool(factory, size=1, relogin_backoff=0).fill()
+    with pytest.raises(instaloader.exceptions.LoginRequiredException):
+        with pool.lease(timeout=1) as lease:
+            instaloader.Profile.from_username(lease.loader.context, 'alice')
+            raise instaloader.exceptions.LoginRequiredException("Session expired")
+
+    assert wait_until(lambda: pool.stats()['dead'] == 1)
+    assert len(attempts) == 1
+    # Every slot is dead: leases fail at once instead of waiting out the timeout
+    with pytest.raises(PoolTimeout):
+        with pool.lease(timeout=60):
+            pass
+
+
+def test_pool_retries_transient_relogin_errors(fake_server, make_loader, wait_until):
+    server = fake_server()
+    failures = [instaloader.exceptions.ConnectionException("Connection reset")]
+
+    def factory(force_login=False):
+        if force_login and failures:
+            raise failures.pop()
+        return make_loader(server)
+
+    pool = LoaderPool(factory, size=1, relogin_backoff=0).fill()
+    with pool.lease(timeout=1) as lease:
+        lease.invalidate()
+
+    assert wait_until(lambda: pool.stats()['relogins'] == 1)
+    assert pool.stats()['dead'] == 0
+    with pool.lease(timeout=1) as lease:
+        assert instaloader.Profile.from_username(lease.loader.context, 'alice').username == 'alice'
+
+
+def test_session_manager_retires_accounts_with_bad_credentials(fake_server, make_loader, wait_until):
+    server = fake_server()
+
+    def factory(username, password, force_login=False):
+        if force_login and password == 'changed':
+            raise instaloader.exceptions.BadCredentialsException("Wrong password.")
+        return make_loader(server)
+
+    manager = SessionManager([('alice', 'secret'), ('bob', 'changed')], factory, cooldown=0, relogin_backoff=0).fill()
+    with manager.lease(timeout=1) as first, manager.lease(timeout=1) as second:
+        bob = first if first.username == 'bob' else second
+        bob.invalidate()
+
+    assert wait_until(lambda: manager.stats()['dead'] == 1)
+    stats = manager.stats()
+    assert stats['accounts']['bob']['dead']
+    assert not stats['accounts']['alice']['dead']
+
+    # Only the working account is leased from now on
+    for _ in range(3):
+        with manager.lease(timeout=1) as session:
+            assert session.username == 'alice'
+            instaloader.Profile.from_username(session.loader.context, 'carol')
+    assert manager.stats()['accounts']['alice']['requests_last_hour'] == 3
+
+
+def test_session_manager_fails_fast_without_working_accounts():
+    def factory(username, password, force_login=False):
+        raise instaloader.exceptions.BadCredentialsException("Wrong password.")
+
+    manager = SessionManager([('alice', 'wrong')], factory).fill()
+    assert manager.stats()['dead'] == 1
+    with pytest.raises(PoolTimeout):
+        with manager.lease(timeout=60):
+            pass
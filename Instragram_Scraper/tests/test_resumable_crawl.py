@@ -0,0 +1,43 @@
+from resumable_crawl import PostCrawl, crawl_posts
+
+
+def shortcodes(crawl):
+    return [record['shortcode'] for record in crawl.iter_records()]
+
+
+def test_crawl_resumes_from_checkpoint(fake_server, make_loader, tmp_path):
+    server = fake_server(posts_per_profile=40, page_size=12, timeline_page_size=12)
+    loader = make_loader(server)
+
+    crawl, result = crawl_posts(loader, 'alice', max_posts=17, directory=str(tmp_path / 'resumed'))
+    assert result['status'] == 'limit_reached'
+    assert result['records'] == 17
+    assert crawl.checkpoint['iterator'] is not None
+
+    # A crash after writing a record but before the checkpoint leaves a partial line behind
+    with open(crawl.posts_file, 'a', encoding='utf-8') as f:
+        f.write('{"shortcode": "half-writ')
+
+    resumed = PostCrawl('alice', str(tmp_path / 'resumed'))
+    result = resumed.run(loader)
+    assert result == {'status': 'complete', 'records': 40, 'new_records': 23}
+    assert resumed.complete
+
+    _, uninterrupted = crawl_posts(loader, 'alice', directory=str(tmp_path / 'uninterrupted'))
+    assert uninterrupted['records'] == 40
+    expected = shortcodes(PostCrawl('alice', str(tmp_path / 'uninterrupted')))
+    assert shortcodes(resumed) == expected
+    assert len(set(expected)) == 40
+
+
+def test_finished_crawl_makes_no_requests(fake_server, make_loader, tmp_path):
+    server = fake_server(posts_per_profile=15, page_size=12, timeline_page_size=12)
+    loader = make_loader(server)
+
+    _, result = crawl_posts(loader, 'bob', directory=str(tmp_path))
+    assert result['status'] == 'complete'
+    requests = server.requests
+
+    _, result = crawl_posts(loader, 'bob', directory=str(tmp_path))
+    assert result == {'status': 'complete', 'records': 15, 'new_records': 0}
+    assert server.requests == requests
@@ -0,0 +1,478 @@
+"""
+Time-Series Store
+
+Follower and engagement history for many accounts, kept as NumPy columns.
+Samples are buffered in memory and written as immutable segments (one .npy
+file per column, sorted by account and time) that are memory-mapped on
+read, so range queries, downsampling and growth deltas run on arrays and
+tens of millions of samples never become Python dicts.
+
+Buffered samples are lost if the process dies before flush(); long-running
+writers flush periodically (see scheduler.py). The small segments this
+leaves are merged once there are more than max_segments. A directory has
+one writing process at a time, since account ids are assigned by the writer.
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+DEFAULT_DIRECTORY = 'timeseries'
+DEFAULT_SEGMENT_SIZE = 1_000_000
+# Segments kept before small ones are merged (see TimeSeriesStore._compact)
+DEFAULT_MAX_SEGMENTS = 16
+
+# Column name -> dtype; engagement columns are NaN for follower-only samples
+COLUMNS = {
+    'account': np.uint32,
+    'timestamp': np.int64,
+    'followers': np.int64,
+    'following': np.int64,
+    'posts': np.int64,
+    'average_likes': np.float32,
+    'average_comments': np.float32,
+    'engagement_rate': np.float32,
+}
+VALUE_COLUMNS = [name for name in COLUMNS if name not in ('account', 'timestamp')]
+
+INTERVALS = {
+    'hourly': 3600,
+    'daily': 86400,
+    'weekly': 7 * 86400,
+}
+
+
+def to_epoch(value):
+    """Convert a datetime, ISO string or epoch number to epoch seconds (naive = local time)."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    return int(value)
+
+
+def _interval_seconds(interval):
+    return INTERVALS[interval] if isinstance(interval, str) else int(interval)
+
+
+def _empty_columns():
+    return {name: np.empty(0, dtype) for name, dtype in COLUMNS.items()}
+
+
+class TimeSeriesStore:
+    def __init__(self, directory=None, segment_size=DEFAULT_SEGMENT_SIZE, max_segments=DEFAULT_MAX_SEGMENTS):
+        """
+        Open (or create) a store.
+
+        Args:
+            directory (str): Store directory (default: TIMESERIES_DIR env variable or ./timeseries)
+            segment_size (int): Buffered samples that trigger writing a segment
+            max_segments (int): Segments beyond which segments smaller than
+                segment_size are merged into full ones
+        """
+        self.directory = directory or os.getenv('TIMESERIES_DIR', DEFAULT_DIRECTORY)
+        self.segment_size = segment_size
+        self.max_segments = max_segments
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._buffer = {name: [] for name in COLUMNS}
+        self._segments = []
+        # Account id -> timestamp of the last sample appended by this process
+        self._last_appended = {}
+
+        accounts_file = os.path.join(self.directory, 'accounts.json')
+        if os.path.exists(accounts_file):
+            with open(accounts_file, encoding='utf-8') as f:
+                self._accounts = json.load(f)
+        else:
+            self._accounts = []
+        self._account_ids = {name: i for i, name in enumerate(self._accounts)}
+
+        for name in sorted(os.listdir(self.directory)):
+            path = os.path.join(self.directory, name)
+            if name.startswith('segment-') and name.endswith('.tmp'):
+                # Left behind by a write that crashed before the segment was moved into place
+                shutil.rmtree(path, ignore_errors=True)
+            elif name.startswith('segment-'):
+                self._segments.append(self._open_segment(path))
+
+        # Segments a compaction merged, but that a crash kept it from deleting
+        replaced = set()
+        for segment in self._segments:
+            replaces_file = os.path.join(segment['path'], 'replaces.json')
+            if os.path.exists(replaces_file):
+                with open(replaces_file, encoding='utf-8') as f:
+                    replaced.update(os.path.join(self.directory, name) for name in json.load(f))
+        for segment in [s for s in self._segments if s['path'] in replaced]:
+            self._segments.remove(segment)
+            shutil.rmtree(segment['path'], ignore_errors=True)
+
+        if len(self._segments) > self.max_segments:
+            self._compact()
+
+    def _open_segment(self, path):
+        columns = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r') for name in COLUMNS}
+        ts = columns['timestamp']
+        return {'path': path, 'columns': columns, 'rows': len(ts), 'start': int(ts.min()), 'end': int(ts.max())}
+
+    def _account_id(self, username):
+        username = username.lower()
+        account = self._account_ids.get(username)
+        if account is None:
+            account = self._account_ids[username] = len(self._accounts)
+            self._accounts.append(username)
+        return account
+
+    def append(self, username, followers, following=0, posts=0, average_likes=None,
+               average_comments=None, engagement_rate=None, timestamp=None):
+        """
+        Append one sample.
+
+        Args:
+            username (str): Account the sample belongs to
+            followers (int): Follower count
+            following (int): Following count
+            posts (int): Number of posts
+            average_likes (float): Average likes per post (None = not measured)
+            average_comments (float): Average comments per post (None = not measured)
+            engagement_rate (float): Engagement rate in percent (None = not measured)
+            timestamp: datetime, ISO string or epoch seconds (default: now)
+
+        Returns:
+            bool: False if the sample was skipped because it repeats the
+            account's previous sample (same timestamp)
+        """
+        values = {
+            'timestamp': to_epoch(timestamp) if timestamp is not None else int(datetime.now().timestamp()),
+            'followers': followers,
+            'following': following,
+            'posts': posts,
+            'average_likes': np.nan if average_likes is None else average_likes,
+            'average_comments': np.nan if average_comments is None else average_comments,
+            'engagement_rate': np.nan if engagement_rate is None else engagement_rate,
+        }
+        with self._lock:
+            account = self._account_id(username)
+            if self._last_appended.get(account) == values['timestamp']:
+                return False
+            self._last_appended[account] = values['timestamp']
+            self._buffer['account'].append(account)
+            for name, value in values.items():
+                self._buffer[name].append(value)
+            if len(self._buffer['account']) >= self.segment_size:
+                self._flush()
+        return True
+
+    def add_sample(self, data):
+        """
+        Append a sample from a scraper result.
+
+        Args:
+            data (dict): follower_data from get_follower_count() or profile data
+                from get_post_analytics() (its analytics_summary is recorded too)
+
+        Returns:
+            bool: False if the same result was already recorded
+        """
+        summary = data.get('analytics_summary') or {}
+        return self.append(
+            data['username'],
+            data['followers'],
+            following=data.get('following', 0),
+            posts=data.get('posts', data.get('total_posts', 0)),
+            average_likes=summary.get('average_likes_per_post'),
+            average_comments=summary.get('average_comments_per_post'),
+            engagement_rate=summary.get('engagement_rate_percentage'),
+            timestamp=data.get('timestamp'),
+        )
+
+    def append_many(self, usernames, timestamps, **columns):
+        """
+        Append many samples at once (e.g. when importing history).
+
+        Args:
+            usernames (sequence): Account of each sample
+            timestamps (array-like): Epoch seconds of each sample
+            **columns: Arrays for followers, following, posts, average_likes,
+                average_comments and engagement_rate (missing = 0 / NaN)
+        """
+        with self._lock:
+            accounts = np.array([self._account_id(u) for u in usernames], dtype=COLUMNS['account'])
+        count = len(accounts)
+        data = {'account': accounts, 'timestamp': np.asarray(timestamps, dtype=np.int64)}
+        for name in VALUE_COLUMNS:
+            default = np.nan if COLUMNS[name] is np.float32 else 0
+            data[name] = np.asarray(columns.get(name, np.full(count, default)), dtype=COLUMNS[name])
+
+        for start in range(0, count, self.segment_size):
+            chunk = {name: values[start:start + self.segment_size] for name, values in data.items()}
+            with self._lock:
+                self._write_segment(chunk)
+
+    def flush(self):
+        """Write buffered samples to a new segment."""
+        with self._lock:
+            self._flush()
+
+    close = flush
+
+    def _flush(self):
+        if not self._buffer['account']:
+            return
+        columns = {name: np.asarray(values, dtype=COLUMNS[name]) for name, values in self._buffer.items()}
+        self._buffer = {name: [] for name in COLUMNS}
+        self._write_segment(columns)
+
+    def _write_segment(self, columns):
+        # Account names first: a segment must never refer to an account id accounts.json doesn't list
+        with open(os.path.join(self.directory, 'accounts.json.tmp'), 'w', encoding='utf-8') as f:
+            json.dump(self._accounts, f)
+        os.replace(os.path.join(self.directory, 'accounts.json.tmp'),
+                   os.path.join(self.directory, 'accounts.json'))
+
+        self._segments.append(self._save_segment(columns))
+        if len(self._segments) > self.max_segments:
+            self._compact()
+
+    def _save_segment(self, columns, replaces=()):
+        """Write columns as a new segment and open it; `replaces` names the segments it merges."""
+        # Sort by account, then time, so one account's samples are a contiguous slice
+        order = np.lexsort((columns['timestamp'], columns['account']))
+        # Time + pid names sort in write order and never collide with another writer's segment
+        path = os.path.join(self.directory, f"segment-{time.time_ns():020d}-{os.getpid()}")
+        tmp_path = path + '.tmp'
+        os.makedirs(tmp_path, exist_ok=True)
+        for name, values in columns.items():
+            np.save(os.path.join(tmp_path, f"{name}.npy"), values[order])
+        if replaces:
+            with open(os.path.join(tmp_path, 'replaces.json'), 'w', encoding='utf-8') as f:
+                json.dump([os.path.basename(path) for path in replaces], f)
+        os.replace(tmp_path, path)
+        return self._open_segment(path)
+
+    def _compact(self):
+        """
+        Merge segments smaller than segment_size into as few sorted segments of
+        at most segment_size samples as possible (lock held). Periodic flushes of
+        a long-running poller write many tiny segments; without this, every
+        query would open and scan each of them.
+        """
+        small = [s for s in self._segments if s['rows'] < self.segment_size]
+        groups, group, rows = [], [], 0
+        for segment in small:
+            if group and rows + segment['rows'] > self.segment_size:
+                groups.append(group)
+                group, rows = [], 0
+            group.append(segment)
+            rows += segment['rows']
+        groups.append(group)
+
+        for group in groups:
+            if len(group) < 2:
+                continue
+            columns = {name: np.concatenate([np.asarray(s['columns'][name]) for s in group]) for name in COLUMNS}
+            merged = self._save_segment(columns, replaces=[s['path'] for s in group])
+            # The merged segment lists what it replaces, so a crash here is cleaned up on the next open
+            for segment in group:
+                self._segments.remove(segment)
+                shutil.rmtree(segment['path'], ignore_errors=True)
+            self._segments.append(merged)
+
+    def _sources(self):
+        """Segments plus a sorted snapshot of the in-memory buffer."""
+        with self._lock:
+            segments = list(self._segments)
+            if self._buffer['account']:
+                columns = {name: np.asarray(values, dtype=COLUMNS[name]) for name, values in self._buffer.items()}
+                order = np.lexsort((columns['timestamp'], columns['account']))
+                columns = {name: values[order] for name, values in columns.items()}
+                ts = columns['timestamp']
+                segments.append({'columns': columns, 'start': int(ts.min()), 'end': int(ts.max())})
+        return segments
+
+    def query(self, username, start=None, end=None, columns=None):
+        """
+        Return an account's samples in [start, end), oldest first.
+
+        Args:
+            username (str): Account to read
+            start: Range start (datetime, ISO string or epoch seconds; None = open)
+            end: Range end, exclusive (None = open)
+            columns (list): Value columns to return (default: all)
+
+        Returns:
+            dict: 'timestamp' plus one NumPy array per requested column
+        """
+        columns = columns or VALUE_COLUMNS
+        account = self._account_ids.get(username.lower())
+        if account is None:
+            return {name: np.empty(0, COLUMNS[name]) for name in ['timestamp'] + list(columns)}
+
+        start, end = to_epoch(start), to_epoch(end)
+        parts = {name: [] for name in ['timestamp'] + list(columns)}
+        for segment in self._sources():
+            if (start is not None and segment['end'] < start) or (end is not None and segment['start'] >= end):
+                continue
+            data = segment['columns']
+            lo, hi = np.searchsorted(data['account'], [account, account + 1])
+            ts = data['timestamp'][lo:hi]
+            first = lo + (np.searchsorted(ts, start) if start is not None else 0)
+            last = lo + (np.searchsorted(ts, end) if end is not None else len(ts))
+            for name in parts:
+                parts[name].append(np.asarray(data[name][first:last]))
+
+        if not parts['timestamp']:
+            return {name: np.empty(0, COLUMNS[name]) for name in parts}
+        result = {name: np.concatenate(values) for name, values in parts.items()}
+        order = np.argsort(result['timestamp'], kind='stable')
+        return {name: values[order] for name, values in result.items()}
+
+    def downsample(self, username, interval='daily', column='followers', how='last', start=None, end=None):
+        """
+        Aggregate an account's samples into fixed time buckets (UTC).
+
+        Args:
+            username (str): Account to read
+            interval (str or int): 'hourly', 'daily', 'weekly' or a bucket width in seconds
+            column (str): Value column to aggregate
+            how (str): 'last', 'first', 'min', 'max' or 'mean' (mean ignores NaN)
+            start, end: Optional range, as in query()
+
+        Returns:
+            tuple: (bucket start timestamps, aggregated values) as NumPy arrays
+        """
+        width = _interval_seconds(interval)
+        samples = self.query(username, start, end, [column])
+        ts, values = samples['timestamp'], samples[column]
+        if not len(ts):
+            return ts, values
+
+        buckets = ts // width * width
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        ends = np.r_[starts[1:], len(ts)]
+
+        if how == 'last':
+            aggregated = values[ends - 1]
+        elif how == 'first':
+            aggregated = values[starts]
+        elif how == 'min':
+            aggregated = np.minimum.reduceat(values, starts)
+        elif how == 'max':
+            aggregated = np.maximum.reduceat(values, starts)
+        elif how == 'mean':
+            valid = ~np.isnan(values) if values.dtype.kind == 'f' else np.ones(len(values), bool)
+            totals = np.add.reduceat(np.where(valid, values, 0).astype(np.float64), starts)
+            counts = np.add.reduceat(valid.astype(np.int64), starts)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                aggregated = totals / counts
+        else:
+            raise ValueError(f"Unknown aggregation: {how}")
+
+        return buckets[starts], aggregated
+
+    def growth(self, username, interval='daily', start=None, end=None):
+        """
+        Follower growth of an account per time bucket.
+
+        Returns:
+            dict: 'timestamp', 'followers' (last value per bucket), 'delta'
+            (change from the previous bucket) and 'growth_rate' (percent)
+        """
+        ts, followers = self.downsample(username, interval, 'followers', 'last', start, end)
+        delta = np.diff(followers, prepend=followers[:1])
+        previous = np.r_[followers[:1], followers[:-1]].astype(np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rate = np.where(previous > 0, delta / previous * 100, 0.0)
+        return {'timestamp': ts, 'followers': followers, 'delta': delta, 'growth_rate': rate}
+
+    def growth_all(self, start=None, end=None):
+        """
+        Follower change of every account over a time range, in one vectorized pass.
+
+        Returns:
+            dict: 'username', 'first', 'last', 'delta' and 'growth_rate' arrays,
+            one entry per account with samples in the range
+        """
+        start, end = to_epoch(start), to_epoch(end)
+        accounts, timestamps, followers = [], [], []
+        for segment in self._sources():
+            if (start is not None and segment['end'] < start) or (end is not None and segment['start'] >= end):
+                continue
+            data = segment['columns']
+            ts = np.asarray(data['timestamp'])
+            mask = np.ones(len(ts), bool)
+            if start is not None:
+                mask &= ts >= start
+            if end is not None:
+                mask &= ts < end
+            accounts.append(np.asarray(data['account'])[mask])
+            timestamps.append(ts[mask])
+            followers.append(np.asarray(data['followers'])[mask])
+
+        if not accounts:
+            return {'username': np.empty(0, object), 'first': np.empty(0, np.int64), 'last': np.empty(0, np.int64),
+                    'delta': np.empty(0, np.int64), 'growth_rate': np.empty(0)}
+
+        account, ts, values = np.concatenate(accounts), np.concatenate(timestamps), np.concatenate(followers)
+        order = np.lexsort((ts, account))
+        account, values = account[order], values[order]
+
+        ids, first_index = np.unique(account, return_index=True)
+        last_index = np.r_[first_index[1:], len(account)] - 1
+        first, last = values[first_index], values[last_index]
+        delta = last - first
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rate = np.where(first > 0, delta / first.astype(np.float64) * 100, 0.0)
+        names = np.array(self._accounts, dtype=object)[ids]
+        return {'username': names, 'first': first, 'last': last, 'delta': delta, 'growth_rate': rate}
+
+    def stats(self):
+        """
+        Report the size of the store.
+
+        Returns:
+            dict: Number of accounts, segments, stored and buffered samples
+        """
+        with self._lock:
+            return {
+                'accounts': len(self._accounts),
+                'segments': len(self._segments),
+                'samples': sum(len(s['columns']['account']) for s in self._segments),
+                'buffered': len(self._buffer['account']),
+            }
+
+
+def main():
+    """Print the daily follower growth of an account."""
+    import sys
+
+    if len(sys.argv) < 2:
+        print("Usage: python timeseries.py <username> [hourly|daily|weekly]")
+        sys.exit(1)
+
+    username = sys.argv[1].lstrip('@')
+    interval = sys.argv[2] if len(sys.argv) > 2 else 'daily'
+    growth = TimeSeriesStore().growth(username, interval)
+
+    if not len(growth['timestamp']):
+        print(f"❌ No samples recorded for @{username}")
+        return
+
+    print(f"\n📈 {interval.title()} follower growth for @{username}")
+    print("=" * 50)
+    for ts, followers, delta, rate in zip(growth['timestamp'], growth['followers'],
+                                          growth['delta'], growth['growth_rate']):
+        when = datetime.fromtimestamp(int(ts), timezone.utc).strftime('%Y-%m-%d %H:%M')
+        print(f"{when}  {followers:>12,}  {delta:>+10,}  {rate:>+7.2f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Transport Hooks
+
+instaloader copies its requests.Session for most queries, so adapters and
+hooks mounted on the context's own session never see those requests. These
+helpers wrap InstaloaderContext.get_json (the single entry point for every
+JSON request) and apply them to whichever session is about to be used.
+"""
+
+import threading
+
+
+def on_session(context, setup):
+    """
+    Call setup(session) on every requests.Session before it sends a JSON request.
+
+    Args:
+        context: instaloader.InstaloaderContext (e.g. loader.context)
+        setup (callable): Idempotent function receiving the session
+    """
+    setups = context.__dict__.get('_session_setups')
+    if setups is None:
+        setups = context._session_setups = []
+        original = context.get_json
+
+        def get_json(path, params, host='www.instagram.com', session=None, **kwargs):
+            sess = session if session is not None else context._session
+            for apply in setups:
+                apply(sess)
+            return original(path, params, host=host, session=session, **kwargs)
+
+        context.get_json = get_json
+
+    setups.append(setup)
+
+
+def add_response_hook(context, hook):
+    """
+    Register a requests response hook for every request made through the context.
+
+    Args:
+        context: instaloader.InstaloaderContext
+        hook (callable): hook(response, *args, **kwargs), as used by requests
+    """
+    def setup(session):
+        if hook not in session.hooks['response']:
+            session.hooks['response'].append(hook)
+
+    on_session(context, setup)
+
+
+def mount_adapter(context, prefix, adapter):
+    """
+    Mount a requests transport adapter on every session used by the context.
+
+    Args:
+        context: instaloader.InstaloaderContext
+        prefix (str): URL prefix, e.g. 'https://'
+        adapter (requests.adapters.BaseAdapter): Adapter to mount
+    """
+    def setup(session):
+        if session.adapters.get(prefix) is not adapter:
+            session.mount(prefix, adapter)
+
+    on_session(context, setup)
+
+
+class RequestCounter:
+    """
+    Count the HTTP requests a context sends, per thread.
+
+    Counts are kept per thread, so concurrent lookups sharing one loader
+    each see only their own requests.
+    """
+
+    def __init__(self, context):
+        self._local = threading.local()
+        add_response_hook(context, self._on_response)
+
+    def _on_response(self, response, *args, **kwargs):
+        self._local.count = self.count + 1
+
+    @property
+    def count(self):
+        """Requests sent so far by the current thread."""
+        return getattr(self._local, 'count', 0)
@@ -1,24 +1,234 @@
-from flask import Flask, jsonify, request
-from instagram_scraper import scrape_full_profile  # replace with actual filename
+import os
+import time
+from flask import Flask, Response, request
+from instagram_scraper import scrape_full_profile, scrape_profiles, stream_full_profile, init_loader_pool, get_loader_pool, JOB_HANDLERS  # replace with actual filename
+from response_cache import get_response_cache
+from http_cache import get_http_cache
+from rate_limiter import get_rate_limiter, HIGH
+from streaming import ndjson_line, ndjson_lines
+from singleflight import get_single_flight
+from jobs import JobQueue, JobWorkerPool, PRIORITIES, DONE, FAILED
+from instrumentation import trace, span, profiled, profiling_enabled, recent_traces, get_metrics
+from serializers import encode_response
 
 app = Flask(__name__)
 
+# Log in once at startup; requests lease a ready loader from the pool
+init_loader_pool()
+
+# Long runs go through the persistent job queue, worked off in the background
+# Under serve.py the supervisor requeues interrupted jobs once, before the workers start
+job_queue = JobQueue(recover=os.getenv("SERVE_WORKER") is None)
+job_workers = JobWorkerPool(job_queue, JOB_HANDLERS, workers=int(os.getenv("JOB_WORKERS", 2))).start()
+
+
+def json_response(data):
+    """
+    Encode a response with the fast serializer. ?pretty=1 indents it, and
+    clients sending Accept: application/msgpack get MessagePack.
+    """
+    pretty = request.args.get('pretty', '').lower() in ('1', 'true', 'yes')
+    body, mimetype = encode_response(data, request.headers.get('Accept'), pretty)
+    return Response(body, mimetype=mimetype)
+
+
 @app.route('/instaData', methods=['GET'])
 def get_insta_data():
     username = request.args.get('username')
     number_of_posts = request.args.get('number_of_posts', default=3)
 
     if not username:
-        return jsonify({"error": "Username is required"}), 400
+        return json_response({"error": "Username is required"}), 400
 
     try:
         number_of_posts = int(number_of_posts)
     except:
-        return jsonify({"error": "number_of_posts must be an integer"}), 400
+        return json_response({"error": "number_of_posts must be an integer"}), 400
+
+    # ?stream=1 sends the profile and then each post as an NDJSON line as soon as it is fetched
+    if request.args.get('stream', '').lower() in ('1', 'true', 'yes'):
+        def generate():
+            with get_rate_limiter().priority(HIGH):
+                yield from ndjson_lines(stream_full_profile(username, number_of_posts))
+
+        return Response(generate(), mimetype='application/x-ndjson')
+
+    # ?profile=1 dumps a cProfile of this request (only when PROFILING_ENABLED is set)
+    profile_request = profiling_enabled() and request.args.get('profile', '').lower() in ('1', 'true', 'yes')
+
+    with trace('instaData') as request_trace:
+        if profile_request:
+            with profiled(username) as profile_dump:
+                response = _insta_data_response(username, number_of_posts)
+        else:
+            response = _insta_data_response(username, number_of_posts)
+
+    # Per-phase timings, readable in the browser's network panel
+    response.headers['Server-Timing'] = request_trace.server_timing()
+    if profile_request:
+        response.headers['X-Profile-File'] = profile_dump['path']
+    return response
+
+
+def _insta_data_response(username, number_of_posts):
+    # Interactive lookups jump ahead of queued batch requests
+    with get_rate_limiter().priority(HIGH):
+        data = scrape_full_profile(username, number_of_posts)
+    with span('serialize'):
+        return json_response(data)
+
+
+@app.route('/instaData/batch', methods=['GET', 'POST'])
+def get_insta_data_batch():
+    """
+    Scrape many usernames at once. Results are streamed back as NDJSON,
+    one line per username, in the order they finish.
+    """
+    if request.method == 'POST':
+        body = request.get_json(silent=True) or {}
+        usernames = body.get('usernames') or []
+        number_of_posts = body.get('number_of_posts', 3)
+    else:
+        usernames = [name for name in request.args.get('usernames', '').split(',') if name]
+        number_of_posts = request.args.get('number_of_posts', default=3)
+
+    if not usernames:
+        return json_response({"error": "usernames is required"}), 400
+
+    try:
+        number_of_posts = int(number_of_posts)
+    except (TypeError, ValueError):
+        return json_response({"error": "number_of_posts must be an integer"}), 400
+
+    results = ({"username": username, **data} for username, data in scrape_profiles(usernames, number_of_posts))
+    return Response(ndjson_lines(results), mimetype='application/x-ndjson')
+
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """
+    Queue a scrape ('profile') or analytics ('analytics') job and return at once.
+    An identical job that is still pending is returned instead of a new one.
+    """
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        body = {}
+    kind = body.get('kind', 'profile')
+    username = body.get('username')
+
+    if not isinstance(kind, str) or kind not in JOB_HANDLERS:
+        return json_response({"error": f"kind must be one of: {', '.join(JOB_HANDLERS)}"}), 400
+    if not isinstance(username, str) or not username.lstrip('@'):
+        return json_response({"error": "Username is required"}), 400
+    username = username.lstrip('@').lower()
+
+    try:
+        number_of_posts = int(body.get('number_of_posts', 3))
+    except (TypeError, ValueError):
+        return json_response({"error": "number_of_posts must be an integer"}), 400
+
+    priority = PRIORITIES.get(str(body.get('priority', 'normal')).lower())
+    if priority is None:
+        return json_response({"error": f"priority must be one of: {', '.join(PRIORITIES)}"}), 400
+
+    job, deduplicated = job_queue.submit(kind, {'username': username, 'number_of_posts': number_of_posts}, priority)
+    job_workers.notify()
+    return json_response({**job, "deduplicated": deduplicated}), 200 if deduplicated else 202
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return json_response({"error": "Job not found"}), 404
+    return json_response(job)
+
+
+@app.route('/jobs/<job_id>/results', methods=['GET'])
+def get_job_results(job_id):
+    """
+    Results produced so far, as NDJSON lines carrying a 'seq' number
+    (pass ?after=<seq> to get only newer ones). With ?follow=1 the response
+    stays open and streams new results until the job finishes.
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        return json_response({"error": "Job not found"}), 404
+
+    try:
+        after = int(request.args.get('after', 0))
+    except ValueError:
+        return json_response({"error": "after must be an integer"}), 400
+    follow = request.args.get('follow', '').lower() in ('1', 'true', 'yes')
+
+    def generate():
+        seq, attempts = after, job['attempts']
+        while True:
+            current = job_queue.get(job_id)
+            if current['attempts'] != attempts:
+                # A retry starts its results over
+                seq, attempts = 0, current['attempts']
+            for seq, record in job_queue.results(job_id, seq):
+                yield ndjson_line({"seq": seq, **record})
+            if not follow or current['status'] in (DONE, FAILED):
+                return
+            time.sleep(0.5)
+
+    return Response(generate(), mimetype='application/x-ndjson')
+
+
+@app.route('/instaData/stats', methods=['GET'])
+def get_stats():
+    stats = {
+        "loader_pool": get_loader_pool().stats(),
+        "cache": get_response_cache().stats(),
+        "rate_limiter": get_rate_limiter().stats(),
+        "single_flight": get_single_flight().stats(),
+        "jobs": job_queue.stats(),
+    }
+    http_cache = get_http_cache()
+    if http_cache is not None:
+        stats["http_cache"] = http_cache.stats()
+    return json_response(stats)
+
+
+@app.route('/instaData/traces', methods=['GET'])
+def get_traces():
+    """
+    Timing breakdown (spans, HTTP requests and bytes) of the most recent requests.
+    """
+    try:
+        limit = int(request.args.get('limit', 20))
+    except ValueError:
+        return json_response({"error": "limit must be an integer"}), 400
+    return json_response(recent_traces(limit))
+
+
+@app.route('/metrics', methods=['GET'])
+def get_prometheus_metrics():
+    """
+    Prometheus metrics: call and phase durations, Instagram requests and bytes,
+    plus the current pool, cache, HTTP cache, single-flight and job counters.
+    """
+    metrics = get_metrics()
+    for key, value in get_loader_pool().stats().items():
+        if key in ('size', 'available', 'in_use', 'dead', 'leases', 'evictions', 'relogins'):
+            metrics.set('loader_pool', value, help_text='Loader pool state', stat=key)
+    for key, value in get_response_cache().stats().items():
+        metrics.set('response_cache', value, help_text='Response cache counters', stat=key)
+    http_cache = get_http_cache()
+    if http_cache is not None:
+        for key, value in http_cache.stats().items():
+            metrics.set('http_cache', value, help_text='On-disk HTTP cache counters', stat=key)
+    for key, value in get_single_flight().stats().items():
+        metrics.set('single_flight', value, help_text='Single-flight coalescing counters', stat=key)
+    for status, count in job_queue.stats().items():
+        metrics.set('jobs', count, help_text='Jobs by status', status=status)
 
-    data = scrape_full_profile(username, number_of_posts)
-    return jsonify(data)
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 
 if __name__ == '__main__':
-    app.run(debug=True)
+    # No reloader: it would import this module twice, logging in twice and starting a second
+    # job worker pool whose recovery requeues the jobs the first one is running
+    app.run(debug=True, use_reloader=False)
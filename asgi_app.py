@@ -0,0 +1,88 @@
+"""
+Async variant of the /instaData endpoint.
+
+Runs on any ASGI server, e.g.:
+
+    uvicorn asgi_app:app
+
+Every lookup is a coroutine sharing one pooled HTTP client, so a single
+process can keep hundreds of lookups in flight instead of one per thread.
+"""
+
+import os
+import sys
+from urllib.parse import parse_qs
+
+from dotenv import load_dotenv
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "Instragram_Scraper"))
+
+from async_scraper import AsyncInstagramScraper, load_session_cookies
+from serializers import encode_response
+
+load_dotenv()
+
+INSTA_USERNAME = os.getenv("INSTA_USERNAME")
+
+scraper = AsyncInstagramScraper(
+    cookies=load_session_cookies(INSTA_USERNAME) if INSTA_USERNAME else None,
+    session_key=INSTA_USERNAME or 'anonymous',
+    max_connections=int(os.getenv("ASYNC_MAX_CONNECTIONS", 100)),
+)
+
+
+async def send_json(send, status, body, scope=None):
+    # Negotiated like the Flask app: ?pretty=1, or MessagePack via the Accept header
+    accept, pretty = None, False
+    if scope is not None:
+        accept = dict(scope['headers']).get(b'accept', b'').decode('latin-1')
+        pretty = parse_qs(scope['query_string'].decode()).get('pretty', [''])[0].lower() in ('1', 'true', 'yes')
+    payload, mimetype = encode_response(body, accept, pretty)
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', mimetype.encode()), (b'content-length', str(len(payload)).encode())],
+    })
+    await send({'type': 'http.response.body', 'body': payload})
+
+
+async def get_insta_data(scope, send):
+    query = parse_qs(scope['query_string'].decode())
+    username = query.get('username', [None])[0]
+    number_of_posts = query.get('number_of_posts', [3])[0]
+
+    if not username:
+        return await send_json(send, 400, {"error": "Username is required"}, scope)
+
+    try:
+        number_of_posts = int(number_of_posts)
+    except ValueError:
+        return await send_json(send, 400, {"error": "number_of_posts must be an integer"}, scope)
+
+    if scraper._session is None:
+        await scraper.start()
+
+    data = await scraper.scrape_full_profile(username, number_of_posts)
+    await send_json(send, 200, data, scope)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await scraper.start()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await scraper.close()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+
+    if scope['type'] == 'http' and scope['method'] == 'GET' and scope['path'] == '/instaData':
+        return await get_insta_data(scope, send)
+
+    await send_json(send, 404, {"error": "Not found"}, scope)
@@ -1,86 +1,230 @@
 import instaloader
 import os
-from datetime import datetime;
+import sys
+import threading
+from contextlib import ExitStack
 from dotenv import load_dotenv
 
+# Shared helpers (loader pool, response cache, rate limiter, ...) live next to the CLI scrapers
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "Instragram_Scraper"))
+
+from loader_pool import LoaderPool, PoolTimeout
+from session_manager import SessionManager, accounts_from_env, login_loader
+from singleflight import get_single_flight
+from engagement import EngagementAggregator
+from instrumentation import trace, span, timed_iter
+from records import ProfileRecord, PostRecord
+from jobs import PermanentJobError
+from response_cache import get_response_cache
+from batch import run_concurrently
+from rate_limiter import get_rate_limiter, LOW
+
 load_dotenv()
 
 INSTA_USERNAME = os.getenv("INSTA_USERNAME")
 INSTA_PASSWORD = os.getenv("INSTA_PASSWORD")
+LOADER_POOL_SIZE = int(os.getenv("LOADER_POOL_SIZE", 4))
+# Seconds a request waits for a free session before it fails with an error
+LOADER_LEASE_TIMEOUT = float(os.getenv("LOADER_LEASE_TIMEOUT", 30))
+
+_loader_pool = None
+_loader_pool_lock = threading.Lock()
 
 
-def get_authenticated_loader():
+def get_authenticated_loader(force_login=False):
     """
     Returns an Instaloader object that's logged in using environment variables.
-    If session file exists, reuse it.
-    """
-    loader = instaloader.Instaloader(
-        download_pictures=False,
-        download_videos=False,
-        download_video_thumbnails=False,
-        download_geotags=False,
-        download_comments=False,
-        save_metadata=False,
-        compress_json=False
-    )
+    If session file exists, reuse it (unless force_login is set).
+    """
+    return login_loader(INSTA_USERNAME, INSTA_PASSWORD, force_login)
 
-    try:
-        # Try to load existing session file
-        loader.load_session_from_file(INSTA_USERNAME)
-    except Exception:
-        # Fallback to login if session file doesn't exist
-        print("🔐 Logging in fresh with username and password...")
-        loader.login(INSTA_USERNAME, INSTA_PASSWORD)
-        loader.save_session_to_file()
+def init_loader_pool(size=None):
+    """
+    Creates the process-wide pool of authenticated loaders.
+    Call once at app startup; later calls return the existing pool.
+    With INSTAGRAM_ACCOUNTS set, requests rotate across those accounts instead.
+    """
+    global _loader_pool
+    with _loader_pool_lock:
+        if _loader_pool is None:
+            if os.getenv("INSTAGRAM_ACCOUNTS"):
+                _loader_pool = SessionManager(
+                    accounts_from_env(),
+                    hourly_budget=int(os.getenv("SESSION_HOURLY_BUDGET", 200)),
+                    cooldown=float(os.getenv("SESSION_COOLDOWN", 1800)),
+                ).fill()
+            else:
+                _loader_pool = LoaderPool(get_authenticated_loader, size=size or LOADER_POOL_SIZE).fill()
+    return _loader_pool
 
-    return loader
+def get_loader_pool():
+    """
+    Returns the loader pool, creating it on first use.
+    """
+    return _loader_pool or init_loader_pool()
 
 def scrape_full_profile(username, number_of_posts=3):
     """
     Uses authenticated session to fetch full post + profile data.
     """
     username = username.lstrip('@')
-    loader = get_authenticated_loader()
+
+    with trace('scrape_full_profile'):
+        # The cache holds compact records; the dict is only built for the caller
+        data = get_response_cache().get_or_fetch(
+            ('full_profile', username.lower(), number_of_posts),
+            lambda: _scrape_coalesced(username, number_of_posts),
+            kind='posts' if number_of_posts > 0 else 'profile'
+        )
+        return data.to_api_dict() if isinstance(data, ProfileRecord) else data
+
+def scrape_profiles(usernames, number_of_posts=3, max_workers=None):
+    """
+    Scrapes many profiles concurrently, sharing the loader pool.
+    Yields (username, data) as each one finishes; failures come back as
+    an error dict for that username only.
+    """
+    max_workers = max_workers or get_loader_pool().size
+
+    def scrape_in_background(name):
+        # Batch lookups yield to interactive requests at the rate limiter
+        with get_rate_limiter().priority(LOW):
+            return scrape_full_profile(name, number_of_posts)
+
+    for username, data, error in run_concurrently(scrape_in_background, usernames, max_workers):
+        yield username, data if error is None else {"error": str(error)}
+
+def run_profile_job(params, emit):
+    """
+    Job handler: emits the profile info, then one record per post.
+    """
+    _run_scrape_job(params, emit, with_summary=False)
+
+def run_analytics_job(params, emit):
+    """
+    Job handler: like run_profile_job, plus a final record with the
+    analytics_summary and the engagement_distribution (engagement.py).
+    """
+    _run_scrape_job(params, emit, with_summary=True)
+
+# Handlers for JobWorkerPool, by job kind
+JOB_HANDLERS = {
+    'profile': run_profile_job,
+    'analytics': run_analytics_job,
+}
+
+# Scrape errors a retry cannot fix
+PERMANENT_SCRAPE_ERRORS = (
+    "Profile does not exist",
+    "Private profile. You must follow the account to access posts.",
+)
+
+def _run_scrape_job(params, emit, with_summary):
+    followers = 0
+    aggregator = EngagementAggregator()
+
+    # Jobs yield to interactive requests at the rate limiter
+    with get_rate_limiter().priority(LOW):
+        for record in stream_full_profile(params['username'], int(params.get('number_of_posts', 3))):
+            if "error" in record:
+                if record["error"] in PERMANENT_SCRAPE_ERRORS:
+                    raise PermanentJobError(record["error"])
+                raise RuntimeError(record["error"])
+
+            emit(record)
+            if "shortcode" in record:
+                aggregator.add_post(record)
+            else:
+                followers = record['followers']
+
+    if with_summary:
+        emit({"analytics_summary": aggregator.summary(followers),
+              "engagement_distribution": aggregator.distribution()})
+
+def _scrape_coalesced(username, number_of_posts):
+    # Concurrent lookups of the same username share one fetch; a lookup for
+    # fewer posts is served from an in-flight fetch for more
+    return get_single_flight().do(
+        username.lower(),
+        lambda: _scrape_uncached(username, number_of_posts),
+        size=number_of_posts,
+        derive=_first_posts
+    )
+
+def _first_posts(data, number_of_posts):
+    if not isinstance(data, ProfileRecord):
+        return data
+    return data.with_posts(data.posts[:number_of_posts])
+
+def _scrape_uncached(username, number_of_posts):
+    try:
+        with get_loader_pool().lease(LOADER_LEASE_TIMEOUT) as lease:
+            return _scrape_with_loader(lease, username, number_of_posts)
+    except PoolTimeout as e:
+        return {"error": str(e)}
+
+def stream_full_profile(username, number_of_posts=3):
+    """
+    Streaming variant of scrape_full_profile: yields the profile info dict,
+    then one dict per post as soon as it is fetched (or a single error dict).
+    Nothing is collected or cached, so memory stays flat for any number of posts.
+    """
+    username = username.lstrip('@')
+
+    with trace('stream_full_profile'), ExitStack() as stack:
+        try:
+            lease = stack.enter_context(get_loader_pool().lease(LOADER_LEASE_TIMEOUT))
+        except PoolTimeout as e:
+            yield {"error": str(e)}
+            return
+        for record in _iter_profile(lease, username, number_of_posts):
+            yield record if isinstance(record, dict) else record.to_api_dict()
+
+def _scrape_with_loader(lease, username, number_of_posts):
+    records = _iter_profile(lease, username, number_of_posts)
+    profile = next(records)
+    if isinstance(profile, dict):
+        return profile
+
+    posts = []
+    for post in records:
+        if isinstance(post, dict):
+            return post
+        posts.append(post)
+
+    profile.posts = posts
+    return profile
+
+def _iter_profile(lease, username, number_of_posts):
+    # Yields a ProfileRecord, then PostRecords, or a single error dict
+    loader = lease.loader
 
     try:
-        profile = instaloader.Profile.from_username(loader.context, username)
+        with span('profile'):
+            profile = instaloader.Profile.from_username(loader.context, username)
 
         if profile.is_private and not profile.followed_by_viewer:
-            return {"error": "Private profile. You must follow the account to access posts."}
+            yield {"error": "Private profile. You must follow the account to access posts."}
+            return
 
         # Profile info
-        data = {
-            'username': profile.username,
-            'full_name': profile.full_name,
-            'followers': profile.followers,
-            'following': profile.followees,
-            'total_posts': profile.mediacount,
-            'is_private': profile.is_private,
-            'is_verified': profile.is_verified,
-            'timestamp': datetime.now().isoformat(),
-        }
-
-        # Post analytics
-        posts_data = []
-        for i, post in enumerate(profile.get_posts()):
-            if i >= number_of_posts:
+        yield ProfileRecord.from_profile(profile, details=False)
+
+        # Post analytics (paging requests happen inside the get_posts iterator)
+        if number_of_posts <= 0:
+            return
+        for i, post in enumerate(timed_iter(profile.get_posts(), 'get_posts')):
+            with span('post_properties'):
+                record = PostRecord.from_post(post, caption_limit=100)
+            yield record
+            if i + 1 >= number_of_posts:
                 break
-            posts_data.append({
-                'shortcode': post.shortcode,
-                'url': f"https://www.instagram.com/p/{post.shortcode}/",
-                'likes': post.likes,
-                'comments': post.comments,
-                'caption': post.caption[:100] if post.caption else "",
-                'is_video': post.is_video,
-                'date': post.date.isoformat()[:10]
-            })
-
-        data["posts"] = posts_data
-        return data
 
     except instaloader.exceptions.ProfileNotExistsException:
-        return {"error": "Profile does not exist"}
+        yield {"error": "Profile does not exist"}
     except instaloader.exceptions.LoginRequiredException:
-        return {"error": "Login required. Credentials may be invalid or blocked."}
+        # Session expired: the pool logs this loader in again
+        lease.invalidate()
+        yield {"error": "Login required. Credentials may be invalid or blocked."}
     except Exception as e:
-        return {"error": str(e)}
\ No newline at end of file
+        yield {"error": str(e)}
@@ -0,0 +1,140 @@
+"""
+Multi-process API server.
+
+Runs app.py in several worker processes, so JSON decoding, analytics and
+serialization can use every core instead of sharing one GIL:
+
+    python serve.py --workers=4 --host=0.0.0.0 --port=5000
+
+Every worker binds the port with SO_REUSEPORT, and the kernel spreads
+connections across them. The workers share the response cache and the
+per-account rate limiter through a SQLite file (SHARED_STATE_DB, default
+shared_state.db), so adding workers does not add load on Instagram. Each
+worker has its own loader pool and job workers. Session files are locked while
+they are read or written. SESSION_HOURLY_BUDGET is split between the workers.
+
+The supervisor restarts workers that die and stops them all on Ctrl+C or
+SIGTERM. Linux, macOS and the BSDs only.
+"""
+
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+
+from dotenv import load_dotenv
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(ROOT_DIR, "Instragram_Scraper"))
+
+load_dotenv()
+
+DEFAULTS = {
+    'workers': int(os.getenv("SERVE_WORKERS", os.cpu_count() or 2)),
+    'host': os.getenv("SERVE_HOST", "127.0.0.1"),
+    'port': int(os.getenv("SERVE_PORT", 5000)),
+}
+
+# A worker that dies this soon after starting is broken (port taken, login failed, ...)
+STARTUP_GRACE = 10
+
+
+def parse_options(argv):
+    """Read --name=value options (see DEFAULTS)."""
+    options = dict(DEFAULTS)
+    for arg in argv:
+        name, _, value = arg.lstrip('-').partition('=')
+        if name not in DEFAULTS:
+            raise SystemExit(f"Unknown option: {arg} (options: {', '.join('--' + name for name in DEFAULTS)})")
+        options[name] = type(DEFAULTS[name])(value)
+    return options
+
+
+def run_worker(index, host, port):
+    """Worker process: bind the shared port and serve app.py until terminated."""
+    from werkzeug.serving import make_server
+
+    os.environ["SERVE_WORKER"] = str(index)
+    signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(128)
+
+    # Imported only now: app.py logs in and starts its job workers at import time
+    sys.path.insert(0, ROOT_DIR)
+    import app
+
+    server = make_server(host, port, app.app, threaded=True, fd=sock.fileno())
+    print(f"✅ Worker {index} (pid {os.getpid()}) serving on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+def main():
+    options = parse_options(sys.argv[1:])
+    workers = max(1, options['workers'])
+    if not hasattr(socket, 'SO_REUSEPORT'):
+        raise SystemExit("❌ SO_REUSEPORT is not available on this platform; run app.py instead")
+
+    # Inherited by the workers
+    os.environ.setdefault("SHARED_STATE_DB", os.path.join(ROOT_DIR, "shared_state.db"))
+    budget = int(os.getenv("SESSION_HOURLY_BUDGET", 200))
+    os.environ["SESSION_HOURLY_BUDGET"] = str(max(1, budget // workers))
+
+    # Jobs interrupted by an earlier run go back to the queue once, before any worker claims jobs
+    from jobs import JobQueue
+    JobQueue(recover=True)
+
+    context = multiprocessing.get_context('spawn')
+    processes = {}
+
+    def start(index):
+        process = context.Process(target=run_worker, args=(index, options['host'], options['port']),
+                                  name=f"serve-worker-{index}", daemon=True)
+        process.start()
+        processes[index] = (process, time.monotonic())
+
+    def stop(*args):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, stop)
+    print(f"🚀 Starting {workers} workers on http://{options['host']}:{options['port']} "
+          f"(shared state: {os.environ['SHARED_STATE_DB']})")
+    for index in range(workers):
+        start(index)
+
+    exit_code = 0
+    try:
+        while True:
+            time.sleep(1)
+            for index, (process, started) in list(processes.items()):
+                if process.is_alive():
+                    continue
+                if time.monotonic() - started < STARTUP_GRACE:
+                    print(f"❌ Worker {index} exited during startup (code {process.exitcode}), stopping")
+                    exit_code = 1
+                    raise KeyboardInterrupt
+                print(f"⚠️  Worker {index} died (code {process.exitcode}), restarting")
+                start(index)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process, _ in processes.values():
+            if process.is_alive():
+                process.terminate()
+        for process, _ in processes.values():
+            process.join(timeout=10)
+    print("👋 All workers stopped")
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()